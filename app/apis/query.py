@@ -2,7 +2,11 @@ from fastapi import APIRouter, Depends, HTTPException, status
 from fastapi.responses import JSONResponse
 
 from app.controllers.query_controller import QueryController
-from app.models.schemas.query_schema import QueryEndPointRequest
+from app.models.schemas.query_schema import (
+    BatchQueryEndPointRequest,
+    MatrixQueryEndPointRequest,
+    QueryEndPointRequest,
+)
 
 router = APIRouter()
 
@@ -34,3 +38,63 @@ async def make_query(
                 "error": str(e),
             },
         )
+
+
+@router.post("/query/batch")
+async def make_batch_query(
+    request: BatchQueryEndPointRequest,
+    query_controller: QueryController = Depends(),
+):
+    try:
+        response_data = await query_controller.make_batch_query(request)
+
+        return JSONResponse(
+            content={
+                "data": response_data,
+                "statuscode": 200,
+                "detail": "Batch query execution successful!",
+                "error": "",
+            },
+            status_code=status.HTTP_200_OK,
+        )
+
+    except Exception as e:
+        raise HTTPException(
+            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            detail={
+                "data": {},
+                "statuscode": 500,
+                "detail": "Batch query execution failed!",
+                "error": str(e),
+            },
+        )
+
+
+@router.post("/query/matrix")
+async def make_matrix_query(
+    request: MatrixQueryEndPointRequest,
+    query_controller: QueryController = Depends(),
+):
+    try:
+        response_data = await query_controller.make_matrix_query(request)
+
+        return JSONResponse(
+            content={
+                "data": response_data,
+                "statuscode": 200,
+                "detail": "Matrix query execution successful!",
+                "error": "",
+            },
+            status_code=status.HTTP_200_OK,
+        )
+
+    except Exception as e:
+        raise HTTPException(
+            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            detail={
+                "data": {},
+                "statuscode": 500,
+                "detail": "Matrix query execution failed!",
+                "error": str(e),
+            },
+        )
@@ -0,0 +1,184 @@
+from fastapi import APIRouter, Depends, status
+from fastapi.responses import JSONResponse
+
+from app.config.container import (
+    get_embedding_cache,
+    get_embedding_coalescer,
+    get_embedding_concurrency_limiters,
+    get_lexical_indexes,
+    get_local_vector_store,
+    get_query_result_cache,
+    get_semantic_cache,
+    get_sparse_encoders,
+)
+from app.config.database import db_helper
+from app.services.embedding_cache import EmbeddingCache
+from app.services.embedding_coalescer import EmbeddingCoalescer
+from app.services.lexical_index_service import LexicalIndexManager
+from app.services.local_vector_store import LocalVectorStore
+from app.services.query_result_cache import QueryResultCache
+from app.services.semantic_cache import SemanticQueryCache
+from app.services.sparse_encoder_service import SparseEncoderManager
+
+router = APIRouter(prefix="/stats", tags=["stats"])
+
+
+@router.get("/embedding-cache")
+async def embedding_cache_stats(
+    embedding_cache: EmbeddingCache = Depends(get_embedding_cache),
+):
+    return JSONResponse(
+        content={
+            "data": embedding_cache.stats() if embedding_cache else {},
+            "statuscode": 200,
+            "detail": (
+                "Embedding cache statistics"
+                if embedding_cache
+                else "Embedding cache is disabled"
+            ),
+            "error": "",
+        },
+        status_code=status.HTTP_200_OK,
+    )
+
+
+@router.get("/embedding-coalescer")
+async def embedding_coalescer_stats(
+    embedding_coalescer: EmbeddingCoalescer = Depends(get_embedding_coalescer),
+):
+    return JSONResponse(
+        content={
+            "data": embedding_coalescer.stats(),
+            "statuscode": 200,
+            "detail": "Embedding coalescer statistics",
+            "error": "",
+        },
+        status_code=status.HTTP_200_OK,
+    )
+
+
+@router.get("/embedding-concurrency")
+async def embedding_concurrency_stats(
+    concurrency_limiters: dict = Depends(get_embedding_concurrency_limiters),
+):
+    return JSONResponse(
+        content={
+            "data": {
+                provider: limiter.stats()
+                for provider, limiter in concurrency_limiters.items()
+            },
+            "statuscode": 200,
+            "detail": "Embedding concurrency statistics",
+            "error": "",
+        },
+        status_code=status.HTTP_200_OK,
+    )
+
+
+@router.get("/sparse-encoder")
+async def sparse_encoder_stats(
+    sparse_encoders: SparseEncoderManager = Depends(get_sparse_encoders),
+):
+    return JSONResponse(
+        content={
+            "data": sparse_encoders.stats(),
+            "statuscode": 200,
+            "detail": "Sparse encoder statistics",
+            "error": "",
+        },
+        status_code=status.HTTP_200_OK,
+    )
+
+
+@router.get("/index-resolution")
+async def index_resolution_stats():
+    return JSONResponse(
+        content={
+            "data": db_helper.index_resolution_cache.stats(),
+            "statuscode": 200,
+            "detail": "Index resolution cache statistics",
+            "error": "",
+        },
+        status_code=status.HTTP_200_OK,
+    )
+
+
+@router.get("/chunk-text-cache")
+async def chunk_text_cache_stats():
+    return JSONResponse(
+        content={
+            "data": db_helper.chunk_text_cache.stats(),
+            "statuscode": 200,
+            "detail": "Chunk text cache statistics",
+            "error": "",
+        },
+        status_code=status.HTTP_200_OK,
+    )
+
+
+@router.get("/local-vector-store")
+async def local_vector_store_stats(
+    local_vector_store: LocalVectorStore = Depends(get_local_vector_store),
+):
+    return JSONResponse(
+        content={
+            "data": local_vector_store.stats(),
+            "statuscode": 200,
+            "detail": "Local vector store statistics",
+            "error": "",
+        },
+        status_code=status.HTTP_200_OK,
+    )
+
+
+@router.get("/lexical-index")
+async def lexical_index_stats(
+    lexical_indexes: LexicalIndexManager = Depends(get_lexical_indexes),
+):
+    return JSONResponse(
+        content={
+            "data": lexical_indexes.stats(),
+            "statuscode": 200,
+            "detail": "Lexical index statistics",
+            "error": "",
+        },
+        status_code=status.HTTP_200_OK,
+    )
+
+
+@router.get("/query-result-cache")
+async def query_result_cache_stats(
+    query_result_cache: QueryResultCache = Depends(get_query_result_cache),
+):
+    return JSONResponse(
+        content={
+            "data": query_result_cache.stats() if query_result_cache else {},
+            "statuscode": 200,
+            "detail": (
+                "Query result cache statistics"
+                if query_result_cache
+                else "Query result cache is disabled"
+            ),
+            "error": "",
+        },
+        status_code=status.HTTP_200_OK,
+    )
+
+
+@router.get("/semantic-cache")
+async def semantic_cache_stats(
+    semantic_cache: SemanticQueryCache = Depends(get_semantic_cache),
+):
+    return JSONResponse(
+        content={
+            "data": semantic_cache.stats() if semantic_cache else {},
+            "statuscode": 200,
+            "detail": (
+                "Semantic cache statistics"
+                if semantic_cache
+                else "Semantic cache is disabled"
+            ),
+            "error": "",
+        },
+        status_code=status.HTTP_200_OK,
+    )
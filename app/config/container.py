@@ -0,0 +1,226 @@
+import multiprocessing
+import os
+from concurrent.futures import ProcessPoolExecutor
+
+from app.config.http_client import http_client_helper
+from app.config.settings import settings
+from app.repositories.index_upsert_repository import IndexUpsertRepository
+from app.services.embedding_cache import EmbeddingCache
+from app.services.embedding_coalescer import EmbeddingCoalescer
+from app.services.embedding_service import EmbeddingService
+from app.services.index_lifecycle import IndexLifecycleManager
+from app.services.index_warm_pool import IndexWarmPool
+from app.services.lexical_index_service import LexicalIndexManager
+from app.services.local_vector_store import LocalVectorStore
+from app.services.pinecone_service import PineconeService
+from app.services.query_result_cache import QueryResultCache
+from app.services.reranking_service import RerankerService
+from app.services.semantic_cache import SemanticQueryCache
+from app.services.sparse_encoder_service import SparseEncoderManager
+from app.services.vector_store_router import VectorStoreRouter
+from app.utils.concurrency import AIMDConcurrencyLimiter
+from app.utils.llm_utils import LLMUtils
+
+
+class ServiceContainer:
+    """
+    Application-scoped owner of the provider services, their HTTP clients
+    and their caches. Built once in the lifespan hook and shared by every
+    request, so nothing on the hot path constructs SDK clients or re-reads
+    settings.
+    """
+
+    def __init__(self):
+        self.http_clients = http_client_helper
+        self.embedding_cache = None
+        self.query_result_cache = None
+        self.semantic_cache = None
+        self.sparse_executor = None
+        self.sparse_encoders = None
+        self.lexical_indexes = None
+        self.embedding_service = None
+        self.embedding_coalescer = None
+        self.embedding_concurrency_limiters = {}
+        self.index_lifecycle = None
+        self.index_warm_pool = None
+        self.pinecone_service = None
+        self.local_vector_store = None
+        self.vector_store = None
+        self.reranker_service = None
+        self.llm_utils = None
+        self.is_built = False
+
+    def build(self):
+        if settings.EMBEDDING_CACHE_ENABLED:
+            self.embedding_cache = EmbeddingCache(
+                max_items=settings.EMBEDDING_CACHE_MAX_ITEMS,
+                cache_dir=settings.EMBEDDING_CACHE_DIR or None,
+                disk_max_rows=settings.EMBEDDING_CACHE_DISK_MAX_ROWS,
+            )
+        if settings.QUERY_RESULT_CACHE_ENABLED:
+            self.query_result_cache = QueryResultCache(
+                max_items=settings.QUERY_RESULT_CACHE_MAX_ITEMS,
+                ttl_seconds=settings.QUERY_RESULT_CACHE_TTL_SECONDS,
+            )
+        if settings.SEMANTIC_CACHE_ENABLED:
+            self.semantic_cache = SemanticQueryCache(
+                threshold=settings.SEMANTIC_CACHE_THRESHOLD,
+                max_entries_per_group=settings.SEMANTIC_CACHE_GROUP_SIZE,
+                max_groups=settings.SEMANTIC_CACHE_MAX_GROUPS,
+                ttl_seconds=settings.SEMANTIC_CACHE_TTL_SECONDS,
+            )
+        # spawn rather than fork: the parent holds an event loop, the Mongo
+        # driver's threads and open sockets, none of which survive a fork.
+        self.sparse_executor = ProcessPoolExecutor(
+            max_workers=settings.SPARSE_ENCODER_WORKERS or os.cpu_count(),
+            mp_context=multiprocessing.get_context("spawn"),
+        )
+        self.sparse_encoders = SparseEncoderManager(
+            params_dir=settings.SPARSE_ENCODER_DIR,
+            max_loaded=settings.SPARSE_ENCODER_MAX_LOADED,
+            executor=self.sparse_executor,
+            shard_size=settings.SPARSE_ENCODER_SHARD_SIZE,
+            token_cache_size=settings.SPARSE_TOKEN_CACHE_MAX_ITEMS,
+            prune_top_n=settings.SPARSE_PRUNE_TOP_N,
+            prune_mass=settings.SPARSE_PRUNE_MASS,
+        )
+        self.lexical_indexes = LexicalIndexManager(
+            self.sparse_encoders,
+            index_dir=settings.LEXICAL_INDEX_DIR,
+            max_loaded=settings.LEXICAL_INDEX_MAX_LOADED,
+            block_size=settings.LEXICAL_INDEX_BLOCK_SIZE,
+        )
+        self.embedding_service = EmbeddingService(
+            self.http_clients, self.sparse_encoders, self.embedding_cache
+        )
+        self.embedding_coalescer = EmbeddingCoalescer(
+            self.embedding_service,
+            window_ms=settings.EMBEDDING_COALESCE_WINDOW_MS,
+            max_batch_size=settings.EMBEDDING_COALESCE_MAX_BATCH,
+        )
+        self.embedding_concurrency_limiters = {
+            provider: AIMDConcurrencyLimiter(
+                initial_limit=settings.EMBEDDING_CONCURRENCY_INITIAL,
+                min_limit=settings.EMBEDDING_CONCURRENCY_MIN,
+                max_limit=settings.EMBEDDING_CONCURRENCY_MAX,
+                latency_target=settings.EMBEDDING_LATENCY_TARGET_SECONDS,
+            )
+            for provider in settings.EMBEDDING_BATCH_LIMITS
+        }
+        self.index_lifecycle = IndexLifecycleManager(self.http_clients)
+        self.pinecone_service = PineconeService(
+            self.http_clients, self.index_lifecycle
+        )
+        self.local_vector_store = LocalVectorStore(
+            root_dir=settings.LOCAL_VECTOR_STORE_DIR,
+            block_rows=settings.LOCAL_SEARCH_BLOCK_ROWS,
+            ann_params=(
+                {
+                    "min_rows": settings.LOCAL_ANN_MIN_ROWS,
+                    "M": settings.HNSW_M,
+                    "ef_construction": settings.HNSW_EF_CONSTRUCTION,
+                    "ef_search": settings.HNSW_EF_SEARCH,
+                    "threads": settings.HNSW_BUILD_THREADS,
+                }
+                if settings.LOCAL_ANN_ENABLED
+                else None
+            ),
+            codec_params={
+                "kind": settings.LOCAL_VECTOR_CODEC,
+                "min_rows": settings.LOCAL_CODEC_MIN_ROWS,
+                "pq_subvector_dims": settings.LOCAL_PQ_SUBVECTOR_DIMS,
+                "rerank_factor": settings.LOCAL_CODEC_RERANK_FACTOR,
+            },
+            filter_params={
+                "fields": settings.LOCAL_FILTER_FIELDS,
+                "bitmap_max_cardinality": (
+                    settings.LOCAL_FILTER_BITMAP_MAX_CARDINALITY
+                ),
+            },
+        )
+        self.vector_store = VectorStoreRouter(
+            self.pinecone_service,
+            self.local_vector_store,
+            settings.LOCAL_VECTOR_INDEXES,
+        )
+        self.index_warm_pool = IndexWarmPool(
+            self.vector_store,
+            IndexUpsertRepository(),
+            settings.INDEX_WARM_POOL,
+        )
+        self.reranker_service = RerankerService(self.http_clients)
+        self.llm_utils = LLMUtils(self.http_clients)
+        self.is_built = True
+
+    def get(self) -> "ServiceContainer":
+        if not self.is_built:
+            self.build()
+        return self
+
+    async def startup(self):
+        await self.http_clients.connect()
+        self.get()
+        self.index_warm_pool.start()
+
+    async def shutdown(self):
+        await self.index_warm_pool.stop()
+        if self.local_vector_store is not None:
+            await self.local_vector_store.close()
+        await self.http_clients.disconnect()
+        if self.sparse_executor is not None:
+            self.sparse_executor.shutdown(wait=False, cancel_futures=True)
+
+
+service_container = ServiceContainer()
+
+
+def get_embedding_service() -> EmbeddingService:
+    return service_container.get().embedding_service
+
+
+def get_embedding_cache() -> EmbeddingCache:
+    return service_container.get().embedding_cache
+
+
+def get_query_result_cache() -> QueryResultCache:
+    return service_container.get().query_result_cache
+
+
+def get_semantic_cache() -> SemanticQueryCache:
+    return service_container.get().semantic_cache
+
+
+def get_sparse_encoders() -> SparseEncoderManager:
+    return service_container.get().sparse_encoders
+
+
+def get_lexical_indexes() -> LexicalIndexManager:
+    return service_container.get().lexical_indexes
+
+
+def get_embedding_coalescer() -> EmbeddingCoalescer:
+    return service_container.get().embedding_coalescer
+
+
+def get_embedding_concurrency_limiters() -> dict:
+    return service_container.get().embedding_concurrency_limiters
+
+
+def get_pinecone_service() -> PineconeService:
+    return service_container.get().pinecone_service
+
+
+def get_vector_store() -> VectorStoreRouter:
+    return service_container.get().vector_store
+
+
+def get_local_vector_store() -> LocalVectorStore:
+    return service_container.get().local_vector_store
+
+
+def get_reranker_service() -> RerankerService:
+    return service_container.get().reranker_service
+
+
+def get_llm_utils() -> LLMUtils:
+    return service_container.get().llm_utils
@@ -1,6 +1,7 @@
 from motor.motor_asyncio import AsyncIOMotorClient
 
 from app.config.settings import settings
+from app.utils.cache import LRUCache, TTLCache
 
 
 class DBHelper:
@@ -10,6 +11,13 @@ class DBHelper:
         self.raw_data = self.db["raw_data"]
         self.index_upsert_collection = self.db["index_upsert"]
         self.gt_data = self.db["gt_data"]
+        # index / namespace / host lookups, invalidated on index_upsert writes
+        self.index_resolution_cache = TTLCache(
+            max_items=settings.INDEX_RESOLUTION_CACHE_MAX_ITEMS,
+            ttl_seconds=settings.INDEX_RESOLUTION_CACHE_TTL_SECONDS,
+        )
+        # raw_data chunk texts by id, cleared when raw_data is replaced
+        self.chunk_text_cache = LRUCache(settings.CHUNK_TEXT_CACHE_MAX_ITEMS)
 
     async def connect(self):
         try:
@@ -43,6 +51,9 @@ class DBHelper:
             await self.connect()
         return self.db
 
+    def invalidate_index_resolution(self, index_name: str):
+        self.index_resolution_cache.pop_where(lambda key: key[1] == index_name)
+
     async def disconnect(self):
         if self.client:
             self.client.close()
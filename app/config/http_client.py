@@ -0,0 +1,220 @@
+import asyncio
+import importlib.util
+import logging
+from typing import Dict, Optional
+
+import httpx
+import orjson
+
+from app.config.settings import settings
+from app.utils.concurrency import (
+    OVERLOAD_STATUS_CODES,
+    AIMDConcurrencyLimiter,
+    is_overload_error,
+)
+from app.utils.rate_limiter import TokenBucket
+from app.utils.retry import (
+    NOT_PROCESSED_STATUS_CODES,
+    NOT_SENT_ERRORS,
+    RETRYABLE_STATUS_CODES,
+    RetryPolicy,
+)
+
+logger = logging.getLogger(__name__)
+
+
+class HTTPClientHelper:
+    """
+    Owns one long-lived, pooled httpx.AsyncClient per provider so that
+    connections (TCP + TLS) are reused across requests instead of being
+    re-established on every call.
+    """
+
+    PROVIDERS = ("pinecone", "cohere", "jina", "groq")
+
+    def __init__(self):
+        self.clients: Dict[str, httpx.AsyncClient] = {}
+        self.rate_limiters: Dict[str, TokenBucket] = {}
+        for provider, rate in {
+            "pinecone": settings.PINECONE_RATE_LIMIT_PER_SECOND,
+            "cohere": settings.COHERE_RATE_LIMIT_PER_SECOND,
+            "jina": settings.JINA_RATE_LIMIT_PER_SECOND,
+            "groq": settings.GROQ_RATE_LIMIT_PER_SECOND,
+        }.items():
+            if rate > 0:
+                self.rate_limiters[provider] = TokenBucket(
+                    rate, rate * settings.RATE_LIMIT_BURST_SECONDS
+                )
+        self.retry_policy = RetryPolicy(
+            max_attempts=settings.RETRY_MAX_ATTEMPTS,
+            base_delay=settings.RETRY_BASE_DELAY,
+            max_delay=settings.RETRY_MAX_DELAY,
+            max_retry_after=settings.RETRY_AFTER_MAX_SECONDS,
+        )
+
+    def _timeout_for(self, provider: str) -> httpx.Timeout:
+        read_timeout = {
+            "pinecone": settings.PINECONE_HTTP_TIMEOUT,
+            "cohere": settings.COHERE_HTTP_TIMEOUT,
+            "jina": settings.JINA_HTTP_TIMEOUT,
+            "groq": settings.GROQ_HTTP_TIMEOUT,
+        }[provider]
+        return httpx.Timeout(
+            read_timeout, connect=settings.HTTP_CONNECT_TIMEOUT
+        )
+
+    def _http2_enabled(self) -> bool:
+        if not settings.HTTP2_ENABLED:
+            return False
+        if importlib.util.find_spec("h2") is None:
+            logger.warning(
+                "HTTP2_ENABLED is set but the 'h2' package is not installed, "
+                "falling back to HTTP/1.1"
+            )
+            return False
+        return True
+
+    def _create_client(self, provider: str) -> httpx.AsyncClient:
+        limits = httpx.Limits(
+            max_connections=settings.HTTP_MAX_CONNECTIONS,
+            max_keepalive_connections=settings.HTTP_MAX_KEEPALIVE_CONNECTIONS,
+            keepalive_expiry=settings.HTTP_KEEPALIVE_EXPIRY,
+        )
+        return httpx.AsyncClient(
+            limits=limits,
+            timeout=self._timeout_for(provider),
+            http2=self._http2_enabled(),
+            # The cohere endpoints were always called with verification off.
+            verify=provider != "cohere",
+        )
+
+    async def connect(self):
+        for provider in self.PROVIDERS:
+            if provider not in self.clients:
+                self.clients[provider] = self._create_client(provider)
+
+        if settings.HTTP_WARMUP_ON_STARTUP:
+            await self.warm_up()
+
+    async def warm_up(self):
+        """Open a connection to every provider host ahead of the first request."""
+
+        warmup_urls = {
+            "pinecone": settings.PINECONE_LIST_INDEXES_URL,
+            "cohere": settings.COHERE_BASE_URL,
+            "jina": settings.JINA_BASE_URL,
+            "groq": settings.GROQ_BASE_URL,
+        }
+
+        async def _warm(provider: str, url: str):
+            try:
+                await self.get_client(provider).head(url)
+                logger.info(f"Warmed up {provider} connection")
+            except httpx.HTTPError as e:
+                logger.warning(f"Warm-up for {provider} failed: {str(e)}")
+
+        await asyncio.gather(
+            *(_warm(provider, url) for provider, url in warmup_urls.items())
+        )
+
+    def get_client(self, provider: str) -> httpx.AsyncClient:
+        client = self.clients.get(provider)
+        if client is None or client.is_closed:
+            client = self._create_client(provider)
+            self.clients[provider] = client
+        return client
+
+    async def request(
+        self,
+        provider: str,
+        method: str,
+        url: str,
+        limiter: Optional[AIMDConcurrencyLimiter] = None,
+        idempotent: bool = True,
+        **kwargs,
+    ) -> httpx.Response:
+        """
+        Send a request through the provider's pooled client, paced by its
+        token bucket. 429s, transient 5xx responses and transport errors
+        are retried with backoff, honoring ``Retry-After``. The last
+        response is returned (callers still call ``raise_for_status``).
+        The last transport error is re-raised once attempts run out.
+
+        Calls made under an AIMD ``limiter`` report every overload they
+        retry to it, so it backs off on the first one rather than seeing
+        one slow success. Requests that are not ``idempotent`` are only
+        retried when they cannot have been processed: 429s, 503s and
+        failures to connect.
+
+        ``json`` payloads are serialized once with orjson, which writes
+        NumPy float32 vectors directly, so vectors stay as arrays until
+        this wire boundary.
+        """
+        if "json" in kwargs:
+            headers = httpx.Headers(kwargs.get("headers"))
+            headers.setdefault("Content-Type", "application/json")
+            kwargs["headers"] = headers
+            kwargs["content"] = orjson.dumps(
+                kwargs.pop("json"), option=orjson.OPT_SERIALIZE_NUMPY
+            )
+
+        client = self.get_client(provider)
+        rate_limiter = self.rate_limiters.get(provider)
+        attempt = 0
+
+        while True:
+            if rate_limiter is not None:
+                await rate_limiter.acquire()
+
+            try:
+                response = await client.request(method, url, **kwargs)
+            except httpx.TransportError as e:
+                if not self.retry_policy.should_retry(attempt) or (
+                    not idempotent and not isinstance(e, NOT_SENT_ERRORS)
+                ):
+                    raise
+                if limiter is not None and is_overload_error(e):
+                    limiter.on_overload()
+                delay = self.retry_policy.delay_for(attempt)
+                logger.warning(
+                    f"{provider} request failed ({str(e) or type(e).__name__}), "
+                    f"retrying in {delay:.2f}s"
+                )
+            else:
+                retryable = (
+                    RETRYABLE_STATUS_CODES
+                    if idempotent
+                    else NOT_PROCESSED_STATUS_CODES
+                )
+                if (
+                    response.status_code not in retryable
+                    or not self.retry_policy.should_retry(attempt)
+                ):
+                    return response
+                if (
+                    limiter is not None
+                    and response.status_code in OVERLOAD_STATUS_CODES
+                ):
+                    limiter.on_overload()
+
+                delay = self.retry_policy.delay_for(attempt, response)
+                logger.warning(
+                    f"{provider} returned {response.status_code}, "
+                    f"retrying in {delay:.2f}s"
+                )
+                if response.status_code == 429 and rate_limiter is not None:
+                    # Every caller of this provider now waits out the delay
+                    # in acquire(), including this one.
+                    rate_limiter.pause(delay)
+                    delay = 0
+
+            await asyncio.sleep(delay)
+            attempt += 1
+
+    async def disconnect(self):
+        for client in self.clients.values():
+            await client.aclose()
+        self.clients = {}
+
+
+http_client_helper = HTTPClientHelper()
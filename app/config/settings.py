@@ -1,3 +1,5 @@
+from typing import Dict, List
+
 from pydantic_settings import BaseSettings
 
 
@@ -30,7 +32,6 @@ class Settings(BaseSettings):
     MULTI_CHUNK_QUERIES_COUNT: int = 4
     MIN_CHUNKS_FOR_MULTI_QUERY: int = 2
     MAX_CHUNKS_FOR_MULTI_QUERY: int = 5
-    LLM_REQUEST_DELAY: float = 0.7
     UPLOAD_DIR: str = "uploads/"
     GROUND_TRUTH_FILE_NAME: str = "raw_dataset.json"
     # GROUND_TRUTH_CHUNK_SIZE = 1000
@@ -39,6 +40,143 @@ class Settings(BaseSettings):
     GROQ_BASE_URL: str = "https://api.groq.com/openai/v1/chat/completions"
     # COLLECTION_NAME = "raw_dataset"
 
+    # Shared provider HTTP clients
+    HTTP_MAX_CONNECTIONS: int = 100
+    HTTP_MAX_KEEPALIVE_CONNECTIONS: int = 20
+    HTTP_KEEPALIVE_EXPIRY: float = 60.0
+    HTTP_CONNECT_TIMEOUT: float = 10.0
+    HTTP2_ENABLED: bool = False
+    HTTP_WARMUP_ON_STARTUP: bool = True
+    PINECONE_HTTP_TIMEOUT: float = 60.0
+    COHERE_HTTP_TIMEOUT: float = 60.0
+    JINA_HTTP_TIMEOUT: float = 60.0
+    GROQ_HTTP_TIMEOUT: float = 120.0
+
+    # Per-provider rate limits (requests/second, 0 disables) and retries
+    PINECONE_RATE_LIMIT_PER_SECOND: float = 50.0
+    COHERE_RATE_LIMIT_PER_SECOND: float = 10.0
+    JINA_RATE_LIMIT_PER_SECOND: float = 8.0
+    GROQ_RATE_LIMIT_PER_SECOND: float = 1.4
+    RATE_LIMIT_BURST_SECONDS: float = 1.0
+    RETRY_MAX_ATTEMPTS: int = 5
+    RETRY_BASE_DELAY: float = 0.5
+    RETRY_MAX_DELAY: float = 20.0
+    RETRY_AFTER_MAX_SECONDS: float = 60.0
+
+    # Dense embedding cache
+    EMBEDDING_CACHE_ENABLED: bool = True
+    EMBEDDING_CACHE_MAX_ITEMS: int = 50000
+    EMBEDDING_CACHE_DIR: str = "cache/embeddings"
+    # per (provider, model, dimension, input type) segment; 0 is unbounded
+    EMBEDDING_CACHE_DISK_MAX_ROWS: int = 200000
+
+    # /query response cache, invalidated when a namespace is upserted
+    QUERY_RESULT_CACHE_ENABLED: bool = True
+    QUERY_RESULT_CACHE_MAX_ITEMS: int = 10000
+    QUERY_RESULT_CACHE_TTL_SECONDS: int = 600
+
+    # Reuse results of earlier queries with a near-identical embedding.
+    # Off by default: a hit returns another question's matches, which are
+    # then scored against this question's ground truth
+    SEMANTIC_CACHE_ENABLED: bool = False
+    SEMANTIC_CACHE_THRESHOLD: float = 0.97
+    SEMANTIC_CACHE_GROUP_SIZE: int = 2048
+    SEMANTIC_CACHE_MAX_GROUPS: int = 256
+    SEMANTIC_CACHE_TTL_SECONDS: int = 3600
+
+    # /query/batch: vector queries in flight at once
+    QUERY_BATCH_CONCURRENCY: int = 16
+
+    # Models whose lower dimensions are derived locally from the full one
+    MATRYOSHKA_DERIVATION_ENABLED: bool = True
+    MATRYOSHKA_MODELS: Dict[str, int] = {
+        "llama-text-embed-v2": 2048,
+        "jina-embeddings-v3": 1024,
+    }
+
+    # Index creation readiness polling
+    INDEX_READY_TIMEOUT_SECONDS: float = 120.0
+    INDEX_READY_POLL_INITIAL_SECONDS: float = 0.5
+    INDEX_READY_POLL_MAX_SECONDS: float = 8.0
+
+    # Cached index / namespace / host resolution
+    INDEX_RESOLUTION_CACHE_TTL_SECONDS: float = 300.0
+    INDEX_RESOLUTION_CACHE_MAX_ITEMS: int = 1024
+
+    # Upsert vectors without chunk text; queries hydrate it from raw_data
+    LEAN_VECTOR_METADATA: bool = False
+    CHUNK_TEXT_CACHE_MAX_ITEMS: int = 100000
+
+    # "{similarity_metric}-{dimension}" indexes provisioned at startup. Each
+    # one is a billable serverless index, so none are by default; opt in
+    # with e.g. INDEX_WARM_POOL='["dotproduct-1024", "dotproduct-384"]'
+    INDEX_WARM_POOL: List[str] = []
+
+    # Local vector store: index names served in-process ("*" for all)
+    LOCAL_VECTOR_INDEXES: List[str] = []
+    LOCAL_VECTOR_STORE_DIR: str = "cache/vector_store"
+    LOCAL_SEARCH_BLOCK_ROWS: int = 65536
+    LOCAL_ANN_ENABLED: bool = True
+    LOCAL_ANN_MIN_ROWS: int = 100000
+    HNSW_M: int = 16
+    HNSW_EF_CONSTRUCTION: int = 200
+    HNSW_EF_SEARCH: int = 64
+    HNSW_BUILD_THREADS: int = 2  # hnswlib insert threads per graph build
+    LOCAL_VECTOR_CODEC: str = "none"  # "none", "sq8" or "pq"
+    LOCAL_CODEC_MIN_ROWS: int = 1000
+    LOCAL_PQ_SUBVECTOR_DIMS: int = 4
+    LOCAL_CODEC_RERANK_FACTOR: int = 8
+    LOCAL_FILTER_FIELDS: List[str] = ["keyword", "link", "created_at"]
+    LOCAL_FILTER_BITMAP_MAX_CARDINALITY: int = 256
+
+    # Batched Pinecone upserts (API limits: 1000 vectors, 2MB per request)
+    PINECONE_UPSERT_MAX_VECTORS: int = 1000
+    PINECONE_UPSERT_MAX_BYTES: int = 2_000_000
+    PINECONE_UPSERT_PARALLELISM: int = 4
+
+    # Per-namespace BM25 sparse encoders
+    SPARSE_ENCODER_DIR: str = "cache/sparse_encoders"
+    SPARSE_ENCODER_MAX_LOADED: int = 32
+    SPARSE_ENCODER_WORKERS: int = 0  # 0 uses one process per CPU
+    SPARSE_ENCODER_SHARD_SIZE: int = 256
+    SPARSE_TOKEN_CACHE_MAX_ITEMS: int = 100000
+    # Sparse vector pruning, recorded per index namespace at upsert (0 disables)
+    SPARSE_PRUNE_TOP_N: int = 0
+    SPARSE_PRUNE_MASS: float = 0.0
+    SPARSE_PRUNE_EVAL_TOP_K: int = 10
+
+    # Per-namespace BM25 inverted indexes for lexical-only queries
+    LEXICAL_INDEX_DIR: str = "cache/lexical_index"
+    LEXICAL_INDEX_MAX_LOADED: int = 16
+    LEXICAL_INDEX_BLOCK_SIZE: int = 128
+
+    # Query embedding micro-batching
+    EMBEDDING_COALESCE_WINDOW_MS: float = 5.0
+    EMBEDDING_COALESCE_MAX_BATCH: int = 64
+
+    # Ingestion embedding batching and adaptive concurrency
+    EMBEDDING_BATCH_LIMITS: Dict[str, Dict[str, int]] = {
+        "pinecone": {
+            "max_items": 96,
+            "max_tokens": 96 * 512,
+            "max_tokens_per_item": 2048,
+        },
+        "cohere": {
+            "max_items": 96,
+            "max_tokens": 96 * 512,
+            "max_tokens_per_item": 512,
+        },
+        "jina": {
+            "max_items": 256,
+            "max_tokens": 256 * 512,
+            "max_tokens_per_item": 8192,
+        },
+    }
+    EMBEDDING_CONCURRENCY_INITIAL: int = 4
+    EMBEDDING_CONCURRENCY_MIN: int = 1
+    EMBEDDING_CONCURRENCY_MAX: int = 16
+    EMBEDDING_LATENCY_TARGET_SECONDS: float = 5.0
+
     class Config:
         env_file = ".env"
 
@@ -1,6 +1,10 @@
 from fastapi import Depends
 
-from app.models.schemas.query_schema import QueryEndPointRequest
+from app.models.schemas.query_schema import (
+    BatchQueryEndPointRequest,
+    MatrixQueryEndPointRequest,
+    QueryEndPointRequest,
+)
 from app.usecases.query_usecase import QueryUseCase
 
 
@@ -11,3 +15,9 @@ class QueryController:
 
     async def make_query(self, request: QueryEndPointRequest):
         return await self.query_usecase.execute(request)
+
+    async def make_batch_query(self, request: BatchQueryEndPointRequest):
+        return await self.query_usecase.execute_batch(request)
+
+    async def make_matrix_query(self, request: MatrixQueryEndPointRequest):
+        return await self.query_usecase.execute_matrix(request)
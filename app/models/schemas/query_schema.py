@@ -1,16 +1,37 @@
-from typing import Optional
+from typing import List, Optional
 
 from pydantic import BaseModel
 
 
-class QueryEndPointRequest(BaseModel):
+class QueryConfiguration(BaseModel):
     is_hybrid: bool
+    is_lexical: bool = False
     file_name: str
     embedding_model: str
     dimension: int
     similarity_metric: str = "dotproduct"
+    top_k: int
+    alpha: Optional[float] = None
+    include_metadata: bool = False
+    filter_dict: Optional[dict] = None
+    ef_search: Optional[int] = None
+
+
+class QueryEndPointRequest(QueryConfiguration):
     query: str
+
+
+class BatchQueryEndPointRequest(QueryConfiguration):
+    queries: List[str]
+
+
+class MatrixQueryEndPointRequest(BaseModel):
+    query: str
+    file_name: str
+    is_hybrid: bool = False
+    embedding_models: Optional[List[str]] = None
     top_k: int
     alpha: Optional[float] = None
     include_metadata: bool = False
     filter_dict: Optional[dict] = None
+    ef_search: Optional[int] = None
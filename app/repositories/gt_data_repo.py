@@ -10,3 +10,13 @@ class GTDataRepo:
 
     async def insert_documents(self, documents: list):
         await self.collection.insert_many(documents)
+
+    async def fetch_questions(self):
+        """Every question with the ids of its relevant chunks."""
+        documents = await self.collection.find(
+            {}, {"question": 1, "chunks._id": 1}
+        ).to_list(length=None)
+        return [
+            (doc["question"], [chunk["_id"] for chunk in doc.get("chunks", [])])
+            for doc in documents
+        ]
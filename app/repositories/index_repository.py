@@ -6,29 +6,76 @@ class IndexRepository:
         self.ground_truth_collection = db_helper.gt_data
         self.raw_collection = db_helper.raw_data
         self.index_info_collection = db_helper.index_upsert_collection
+        self.resolution_cache = db_helper.index_resolution_cache
+        self.chunk_text_cache = db_helper.chunk_text_cache
 
     async def fetch_ground_truth(self, query):
+        """Ground truth of one question, or None when it has none."""
 
-        query = {"question": query}
+        return (await self.fetch_ground_truths([query])).get(query)
 
-        ground_truth_doc = await self.ground_truth_collection.find_one(query)
+    async def fetch_ground_truths(self, queries):
+        """Ground truth for many questions, one database query each."""
 
-        ground_truth_ids = []
-        for x in ground_truth_doc["chunks"]:
-            ground_truth_ids.append(x["_id"])
+        ground_truth_docs = await self.ground_truth_collection.find(
+            {"question": {"$in": list(set(queries))}}
+        ).to_list(length=None)
 
-        ground_truth = []
-        for _id in ground_truth_ids:
-            chunk = await self.raw_collection.find_one({"_id": _id})
+        chunk_ids = list(
+            {x["_id"] for doc in ground_truth_docs for x in doc["chunks"]}
+        )
+        chunks = await self.raw_collection.find(
+            {"_id": {"$in": chunk_ids}}, {"text_content": 1}
+        ).to_list(length=None)
+        texts = {chunk["_id"]: chunk["text_content"] for chunk in chunks}
 
-            ground_truth.append({"id": _id, "chunk": chunk["text_content"]})
+        ground_truths = {}
+        for doc in ground_truth_docs:
+            ground_truths.setdefault(
+                doc["question"],
+                [
+                    {"id": x["_id"], "chunk": texts[x["_id"]]}
+                    for x in doc["chunks"]
+                    if x["_id"] in texts
+                ],
+            )
+        return ground_truths
 
-        return ground_truth
+    async def fetch_chunk_texts(self, chunk_ids):
+        """
+        Texts of the given raw_data chunks by id, from the chunk text cache
+        with the misses fetched in one database query.
+        """
+
+        texts = {}
+        missing = []
+        for chunk_id in dict.fromkeys(chunk_ids):
+            text = self.chunk_text_cache.get(chunk_id)
+            if text is None:
+                missing.append(chunk_id)
+            else:
+                texts[chunk_id] = text
+
+        if missing:
+            chunks = await self.raw_collection.find(
+                {"_id": {"$in": missing}}, {"text": 1, "text_content": 1}
+            ).to_list(length=None)
+            for chunk in chunks:
+                text = chunk.get("text", chunk.get("text_content"))
+                if text is not None:
+                    self.chunk_text_cache.put(chunk["_id"], text)
+                    texts[chunk["_id"]] = text
+        return texts
 
     async def get_namespace_and_host(
         self, index_name: str, embedding_model: str, filename: str
     ):
 
+        cache_key = ("namespace", index_name, embedding_model, filename)
+        cached = self.resolution_cache.get(cache_key)
+        if cached is not None:
+            return cached
+
         query = {
             "index_name": index_name,
             "namespaces": {
@@ -38,10 +85,45 @@ class IndexRepository:
                 }
             },
         }
+        # namespaces.$ returns only the namespace matched by $elemMatch
+        projection = {"namespaces.$": 1, "index_host": 1}
+
+        document = await self.index_info_collection.find_one(query, projection)
+        if not document:
+            return None, None
 
-        document = await self.index_info_collection.find_one(query)
-        namespace = document.get("namespaces", [])[0]
+        namespace = document.get("namespaces", [{}])[0]
         namespace_name = namespace.get("name", None)
         host = document.get("index_host")
 
+        if namespace_name:
+            self.resolution_cache.put(cache_key, (namespace_name, host))
         return namespace_name, host
+
+    async def find_file_namespaces(self, filename: str):
+        """Every (index, namespace, embedding model) holding ``filename``."""
+
+        documents = await self.index_info_collection.find(
+            {"namespaces.details.filename": filename},
+            {
+                "index_name": 1,
+                "index_host": 1,
+                "dimension": 1,
+                "similarity_metric": 1,
+                "namespaces": 1,
+            },
+        ).to_list(length=None)
+
+        return [
+            {
+                "index_name": document["index_name"],
+                "index_host": document.get("index_host"),
+                "dimension": int(document["dimension"]),
+                "similarity_metric": document["similarity_metric"],
+                "namespace": namespace["name"],
+                "embedding_model": namespace["details"]["embedding_model"],
+            }
+            for document in documents
+            for namespace in document.get("namespaces", [])
+            if namespace.get("details", {}).get("filename") == filename
+        ]
@@ -8,6 +8,7 @@ class IndexUpsertRepository:
 
     def __init__(self):
         self.collection = db_helper.index_upsert_collection
+        self.resolution_cache = db_helper.index_resolution_cache
 
     async def find_matching_index_upsert(
         self,
@@ -16,6 +17,16 @@ class IndexUpsertRepository:
         file_name: str,
         embed_model: str,
     ):
+        cache_key = (
+            "index_upsert",
+            f"{similarity_metric}-{dimension}",
+            file_name,
+            embed_model,
+        )
+        document = self.resolution_cache.get(cache_key)
+        if document is not None:
+            return document
+
         query = {
             "dimension": dimension,
             "similarity_metric": similarity_metric,
@@ -27,14 +38,51 @@ class IndexUpsertRepository:
             },
         }
         document = await self.collection.find_one(query)
-        print(document)
+        if document:
+            self.resolution_cache.put(cache_key, document)
         return document
 
     async def find_matching_index(self, dimension: str, similarity_metric: str):
+        cache_key = ("index", f"{similarity_metric}-{dimension}")
+        document = self.resolution_cache.get(cache_key)
+        if document is not None:
+            return document
+
         query = {"dimension": dimension, "similarity_metric": similarity_metric}
         document = await self.collection.find_one(query)
+        if document:
+            self.resolution_cache.put(cache_key, document)
         return document
 
+    async def register_index(
+        self,
+        index_name: str,
+        index_host: str,
+        dimension: int,
+        similarity_metric: str,
+    ):
+        """Record an index with no namespaces unless one is already recorded."""
+        index_upsert_dict = IndexUpsert(
+            index_name=index_name,
+            index_host=index_host,
+            dimension=dimension,
+            similarity_metric=similarity_metric,
+        ).to_dict()
+        del index_upsert_dict["dimension"]
+        del index_upsert_dict["similarity_metric"]
+        try:
+            await self.collection.update_one(
+                {
+                    "dimension": dimension,
+                    "similarity_metric": similarity_metric,
+                },
+                {"$setOnInsert": index_upsert_dict},
+                upsert=True,
+            )
+            db_helper.invalidate_index_resolution(index_name)
+        except Exception as e:
+            raise HTTPException(status_code=500, detail=str(e))
+
     async def add_index_upsert_details(self, indexupsert: IndexUpsert):
         try:
             # Check if an index with same dimension and similarity_metric exists
@@ -82,3 +130,7 @@ class IndexUpsertRepository:
                 return str(result.inserted_id)
         except Exception as e:
             raise HTTPException(status_code=500, detail=str(e))
+        finally:
+            db_helper.invalidate_index_resolution(
+                f"{indexupsert.similarity_metric}-{indexupsert.dimension}"
+            )
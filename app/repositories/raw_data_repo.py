@@ -7,6 +7,7 @@ class RawDataRepo:
 
     async def clear_collection(self):
         await self.collection.delete_many({})
+        db_helper.chunk_text_cache.clear()
 
     async def insert_documents(self, documents: list):
         await self.collection.insert_many(documents)
@@ -0,0 +1,389 @@
+import asyncio
+import fcntl
+import hashlib
+import json
+import logging
+import os
+import re
+import threading
+from contextlib import contextmanager
+from typing import Dict, List, Optional, Sequence
+
+import numpy as np
+
+from app.utils.cache import LRUCache
+
+logger = logging.getLogger(__name__)
+
+
+def text_digest(text: str) -> str:
+    return hashlib.sha256(text.encode("utf-8")).hexdigest()
+
+
+class DiskSegment:
+    """
+    Append-only store of float32 vectors for a single
+    (provider, model, dimension, input_type) combination.
+
+    Vectors live in ``vectors.f32`` (read through ``np.memmap``) and the text
+    digest of row ``i`` is line ``i`` of ``keys.txt``. Vectors are always
+    written before their keys, so a torn write is repaired on load by
+    trimming both files to the rows they have in common.
+
+    Several worker processes may share a segment. Loads and appends hold
+    an exclusive ``flock`` on the segment's ``lock`` file, and an append
+    first catches up with rows other processes wrote, so row numbers
+    always follow the files on disk. Once ``max_rows`` would be exceeded
+    the segment is compacted to its newest half. Compaction replaces both
+    files, which changes the vectors file's inode and makes every other
+    process reload before its next read.
+
+    Every method does blocking disk work; ``EmbeddingCache`` calls them
+    from worker threads, which ``_mutex`` serializes within the process.
+    """
+
+    def __init__(self, path: str, max_rows: int = 0):
+        self.path = path
+        self.max_rows = max_rows
+        self.vectors_path = os.path.join(path, "vectors.f32")
+        self.keys_path = os.path.join(path, "keys.txt")
+        self.meta_path = os.path.join(path, "meta.json")
+        self.lock_path = os.path.join(path, "lock")
+        self.dim: Optional[int] = None
+        self.rows: Dict[str, int] = {}
+        self.n_rows = 0
+        self.compactions = 0
+        self._keys_offset = 0
+        self._inode: Optional[int] = None
+        self._mmap: Optional[np.memmap] = None
+        self._mutex = threading.Lock()
+        if os.path.exists(self.meta_path):
+            with self._locked():
+                self._load()
+
+    @contextmanager
+    def _locked(self):
+        os.makedirs(self.path, exist_ok=True)
+        with open(self.lock_path, "a") as lock:
+            fcntl.flock(lock, fcntl.LOCK_EX)
+            try:
+                yield
+            finally:
+                fcntl.flock(lock, fcntl.LOCK_UN)
+
+    def _file_inode(self) -> Optional[int]:
+        try:
+            return os.stat(self.vectors_path).st_ino
+        except FileNotFoundError:
+            return None
+
+    def _reset(self):
+        self.rows = {}
+        self.n_rows = 0
+        self._keys_offset = 0
+        self._mmap = None
+        self._inode = self._file_inode()
+
+    def _load(self):
+        """(Re)read the segment from disk. Callers hold the lock."""
+        self._reset()
+        if not os.path.exists(self.meta_path):
+            return
+
+        with open(self.meta_path, "r") as f:
+            meta = json.load(f)
+        self.dim = meta["dim"]
+        if meta.get("compacting"):
+            # interrupted compaction: the two files may not line up
+            for path in (self.vectors_path, self.keys_path):
+                if os.path.exists(path):
+                    os.truncate(path, 0)
+            self._write_meta()
+            self._inode = self._file_inode()
+            return
+
+        lines = []
+        if os.path.exists(self.keys_path):
+            with open(self.keys_path, "rb") as f:
+                # the last element is empty, or a torn partial line
+                lines = f.read().split(b"\n")[:-1]
+
+        row_bytes = self.dim * 4
+        vector_rows = (
+            os.path.getsize(self.vectors_path) // row_bytes
+            if os.path.exists(self.vectors_path)
+            else 0
+        )
+        n_rows = min(len(lines), vector_rows)
+        keys_offset = sum(len(line) + 1 for line in lines[:n_rows])
+
+        if os.path.exists(self.vectors_path) and (
+            os.path.getsize(self.vectors_path) != n_rows * row_bytes
+        ):
+            os.truncate(self.vectors_path, n_rows * row_bytes)
+        if os.path.exists(self.keys_path) and (
+            os.path.getsize(self.keys_path) != keys_offset
+        ):
+            os.truncate(self.keys_path, keys_offset)
+
+        self.rows = {
+            line.decode("ascii"): i for i, line in enumerate(lines[:n_rows])
+        }
+        self.n_rows = n_rows
+        self._keys_offset = keys_offset
+        self._inode = self._file_inode()
+
+    def _write_meta(self, **extra):
+        with open(self.meta_path, "w") as f:
+            json.dump({"dim": self.dim, **extra}, f)
+
+    def _sync(self):
+        """Catch up with rows appended by other processes (lock held)."""
+        if self.dim is None or self._file_inode() != self._inode:
+            self._load()
+            return
+        on_disk = os.path.getsize(self.vectors_path) // (self.dim * 4)
+        if on_disk == self.n_rows:
+            return
+
+        with open(self.keys_path, "rb") as f:
+            f.seek(self._keys_offset)
+            lines = f.read().split(b"\n")[:-1]
+        if self.n_rows + len(lines) != on_disk:
+            self._load()
+            return
+        for i, line in enumerate(lines, start=self.n_rows):
+            self.rows[line.decode("ascii")] = i
+        self.n_rows = on_disk
+        self._keys_offset += sum(len(line) + 1 for line in lines)
+
+    def refresh(self):
+        """Reload if another process compacted or created the segment."""
+        if self._file_inode() != self._inode:
+            with self._locked():
+                self._load()
+
+    def _vectors(self) -> Optional[np.memmap]:
+        if not self.n_rows:
+            return None
+        if self._mmap is None or self._mmap.shape[0] < self.n_rows:
+            with open(self.vectors_path, "rb") as f:
+                if os.fstat(f.fileno()).st_ino != self._inode:
+                    return None
+                self._mmap = np.memmap(
+                    f, dtype=np.float32, mode="r", shape=(self.n_rows, self.dim)
+                )
+        return self._mmap
+
+    def get_many(self, keys: Sequence[str]) -> List[Optional[np.ndarray]]:
+        """Stored vectors of ``keys`` (None when absent), refreshed first."""
+        with self._mutex:
+            self.refresh()
+            results = [None] * len(keys)
+            found = [
+                (i, self.rows[key])
+                for i, key in enumerate(keys)
+                if key in self.rows
+            ]
+            vectors = self._vectors() if found else None
+            if vectors is not None:
+                for i, row in found:
+                    results[i] = np.array(vectors[row])
+            return results
+
+    def _compact(self, keep_rows: int):
+        """Keep only the newest ``keep_rows`` rows (lock held)."""
+        start = self.n_rows - keep_rows
+        row_bytes = self.dim * 4
+        with open(self.vectors_path, "rb") as f:
+            f.seek(start * row_bytes)
+            vectors = f.read(keep_rows * row_bytes)
+        with open(self.keys_path, "rb") as f:
+            lines = f.read().split(b"\n")[start : self.n_rows]
+
+        self._write_meta(compacting=True)
+        with open(f"{self.vectors_path}.tmp", "wb") as f:
+            f.write(vectors)
+        with open(f"{self.keys_path}.tmp", "wb") as f:
+            f.writelines(line + b"\n" for line in lines)
+        os.replace(f"{self.keys_path}.tmp", self.keys_path)
+        os.replace(f"{self.vectors_path}.tmp", self.vectors_path)
+        self._write_meta()
+        self.compactions += 1
+        self._load()
+
+    def put_many(self, keys: Sequence[str], vectors: np.ndarray):
+        if not any(key not in self.rows for key in keys):
+            return
+
+        with self._mutex, self._locked():
+            if self.dim is None:
+                self._load()
+            if self.dim is None:
+                self.dim = int(vectors.shape[1])
+                self._write_meta()
+            else:
+                self._sync()
+
+            seen = set()
+            unique_rows = []
+            for i, key in enumerate(keys):
+                if key not in self.rows and key not in seen:
+                    seen.add(key)
+                    unique_rows.append(i)
+            if not unique_rows:
+                return
+            if self.max_rows:
+                unique_rows = unique_rows[-self.max_rows :]
+                if self.n_rows + len(unique_rows) > self.max_rows:
+                    self._compact(
+                        max(
+                            0,
+                            min(
+                                self.n_rows,
+                                self.max_rows // 2,
+                                self.max_rows - len(unique_rows),
+                            ),
+                        )
+                    )
+
+            block = np.ascontiguousarray(vectors[unique_rows], dtype=np.float32)
+            encoded = "".join(f"{keys[i]}\n" for i in unique_rows).encode()
+            with open(self.vectors_path, "ab") as f:
+                f.write(block.tobytes())
+            with open(self.keys_path, "ab") as f:
+                f.write(encoded)
+            if self._inode is None:
+                self._inode = self._file_inode()
+
+            for i in unique_rows:
+                self.rows[keys[i]] = self.n_rows
+                self.n_rows += 1
+            self._keys_offset += len(encoded)
+
+
+class EmbeddingCache:
+    """
+    Content-addressed, two-tier cache of dense embeddings keyed by
+    (provider, model, dimension, input_type, sha256(text)).
+
+    The first tier is a bounded in-memory LRU. The second tier, when
+    ``cache_dir`` is set, is a set of memory-mapped float32 files that
+    survive restarts, so index rebuilds do not re-embed known texts. Each
+    disk segment holds at most ``disk_max_rows`` vectors (0 for no bound).
+    Disk reads and writes run in worker threads, off the event loop, and
+    only memory misses reach the disk tier.
+    """
+
+    def __init__(
+        self,
+        max_items: int,
+        cache_dir: Optional[str] = None,
+        disk_max_rows: int = 0,
+    ):
+        self.memory = LRUCache(max_items)
+        self.cache_dir = cache_dir
+        self.disk_max_rows = disk_max_rows
+        self.segments: Dict[tuple, DiskSegment] = {}
+        self.disk_hits = 0
+        self.disk_writes = 0
+
+    def _segment(
+        self, provider: str, model: str, dimension, input_type
+    ) -> Optional[DiskSegment]:
+        if not self.cache_dir:
+            return None
+
+        segment_key = (provider, model, dimension, input_type)
+        segment = self.segments.get(segment_key)
+        if segment is None:
+            name = f"{dimension or 'native'}-{input_type or 'default'}"
+            path = os.path.join(
+                self.cache_dir,
+                provider,
+                re.sub(r"[^A-Za-z0-9._-]", "_", model),
+                re.sub(r"[^A-Za-z0-9._-]", "_", name),
+            )
+            segment = DiskSegment(path, self.disk_max_rows)
+            self.segments[segment_key] = segment
+        return segment
+
+    async def get_many(
+        self,
+        provider: str,
+        model: str,
+        dimension,
+        input_type,
+        texts: Sequence[str],
+    ) -> List[Optional[np.ndarray]]:
+        digests = [text_digest(text) for text in texts]
+        results = [
+            self.memory.get((provider, model, dimension, input_type, digest))
+            for digest in digests
+        ]
+        missing = [i for i, vector in enumerate(results) if vector is None]
+        segment = self._segment(provider, model, dimension, input_type)
+        if not missing or segment is None:
+            return results
+
+        stored = await asyncio.to_thread(
+            segment.get_many, [digests[i] for i in missing]
+        )
+        for i, vector in zip(missing, stored):
+            if vector is not None:
+                self.disk_hits += 1
+                self.memory.put(
+                    (provider, model, dimension, input_type, digests[i]),
+                    vector,
+                )
+                results[i] = vector
+        return results
+
+    async def put_many(
+        self,
+        provider: str,
+        model: str,
+        dimension,
+        input_type,
+        texts: Sequence[str],
+        vectors,
+    ):
+        if not len(texts):
+            return
+
+        matrix = np.asarray(vectors, dtype=np.float32)
+        digests = [text_digest(text) for text in texts]
+        for digest, vector in zip(digests, matrix):
+            self.memory.put(
+                (provider, model, dimension, input_type, digest), vector
+            )
+
+        segment = self._segment(provider, model, dimension, input_type)
+        if segment is not None:
+            try:
+                await asyncio.to_thread(segment.put_many, digests, matrix)
+                self.disk_writes += len(digests)
+            except OSError as e:
+                logger.error(f"Error writing embedding cache: {str(e)}")
+
+    def stats(self) -> Dict:
+        memory_stats = self.memory.stats()
+        lookups = memory_stats["hits"] + memory_stats["misses"]
+        misses = memory_stats["misses"] - self.disk_hits
+        return {
+            "memory_hits": memory_stats["hits"],
+            "disk_hits": self.disk_hits,
+            "misses": misses,
+            "evictions": memory_stats["evictions"],
+            "memory_size": memory_stats["size"],
+            "max_items": memory_stats["max_items"],
+            "disk_writes": self.disk_writes,
+            "disk_segments": len(self.segments),
+            "disk_rows": sum(s.n_rows for s in self.segments.values()),
+            "disk_compactions": sum(
+                s.compactions for s in self.segments.values()
+            ),
+            "hit_rate": (
+                round((lookups - misses) / lookups, 4) if lookups else 0.0
+            ),
+        }
@@ -0,0 +1,112 @@
+import asyncio
+import logging
+from typing import Dict, List, Tuple
+
+from app.services.embedding_service import EmbeddingService
+
+logger = logging.getLogger(__name__)
+
+
+class EmbeddingCoalescer:
+    """
+    Collects concurrent single-text embedding requests that share
+    (provider, model, dimension, input_type) and sends them to the provider
+    as one batch. A batch is flushed when ``window_ms`` has passed since its
+    first request or as soon as it reaches ``max_batch_size``, so a caller
+    never waits more than one window on top of the provider call.
+    """
+
+    def __init__(
+        self,
+        embedding_service: EmbeddingService,
+        window_ms: float,
+        max_batch_size: int,
+    ):
+        self.embedding_service = embedding_service
+        self.window = window_ms / 1000
+        self.max_batch_size = max_batch_size
+        self._pending: Dict[tuple, List[Tuple[str, asyncio.Future]]] = {}
+        self._timers: Dict[tuple, asyncio.TimerHandle] = {}
+        self._tasks = set()
+        self.requests = 0
+        self.batches = 0
+
+    async def embed(
+        self,
+        provider: str,
+        model: str,
+        text: str,
+        input_type: str = None,
+        dimension: int = None,
+    ):
+        self.requests += 1
+
+        if self.window <= 0 or self.max_batch_size <= 1:
+            self.batches += 1
+            embeddings = await self.embedding_service.embed_texts(
+                provider, model, [text], input_type, dimension
+            )
+            return embeddings[0]
+
+        key = (provider, model, dimension, input_type)
+        loop = asyncio.get_running_loop()
+        future = loop.create_future()
+
+        batch = self._pending.setdefault(key, [])
+        batch.append((text, future))
+
+        if len(batch) >= self.max_batch_size:
+            self._flush(key)
+        elif key not in self._timers:
+            self._timers[key] = loop.call_later(self.window, self._flush, key)
+
+        return await future
+
+    def _flush(self, key: tuple):
+        timer = self._timers.pop(key, None)
+        if timer is not None:
+            timer.cancel()
+
+        batch = self._pending.pop(key, None)
+        if not batch:
+            return
+
+        task = asyncio.create_task(self._dispatch(key, batch))
+        self._tasks.add(task)
+        task.add_done_callback(self._tasks.discard)
+
+    async def _dispatch(
+        self, key: tuple, batch: List[Tuple[str, asyncio.Future]]
+    ):
+        provider, model, dimension, input_type = key
+        self.batches += 1
+
+        try:
+            embeddings = await self.embedding_service.embed_texts(
+                provider,
+                model,
+                [text for text, _ in batch],
+                input_type,
+                dimension,
+            )
+        except Exception as e:
+            logger.error(f"Error in coalesced embedding batch: {str(e)}")
+            for _, future in batch:
+                if not future.done():
+                    future.set_exception(e)
+            return
+
+        for (_, future), embedding in zip(batch, embeddings):
+            if not future.done():
+                future.set_result(embedding)
+
+    def stats(self) -> Dict:
+        return {
+            "requests": self.requests,
+            "batches": self.batches,
+            "average_batch_size": (
+                round(self.requests / self.batches, 2) if self.batches else 0.0
+            ),
+            "window_ms": self.window * 1000,
+            "max_batch_size": self.max_batch_size,
+        }
@@ -2,18 +2,30 @@ import json
 import logging
 
 import httpx
+import numpy as np
+import orjson
 from fastapi import HTTPException
-from pinecone_text.sparse import BM25Encoder
 
+from app.config.http_client import HTTPClientHelper
 from app.config.settings import settings
+from app.services.embedding_cache import EmbeddingCache
+from app.services.sparse_encoder_service import SparseEncoderManager
+from app.utils.concurrency import AIMDConcurrencyLimiter
+from app.utils.vector_ops import as_float32_matrix, truncate_and_normalize
 
 logger = logging.getLogger(__name__)
 
-bm25 = BM25Encoder.default()
-
 
 class EmbeddingService:
-    def __init__(self):
+    def __init__(
+        self,
+        http_clients: HTTPClientHelper,
+        sparse_encoders: SparseEncoderManager,
+        embedding_cache: EmbeddingCache = None,
+    ):
+        self.http_clients = http_clients
+        self.sparse_encoders = sparse_encoders
+        self.embedding_cache = embedding_cache
         self.pinecone_api_key = settings.PINECONE_API_KEY
         self.dense_embed_url = settings.PINECONE_EMBED_URL
         self.pinecone_embedding_url = settings.PINECONE_EMBED_URL
@@ -25,6 +37,123 @@ class EmbeddingService:
         self.EMBED_SUFFIX = "embed"
         self.JINA_EMBED_SUFFIX = "embeddings"
 
+    async def _cached_embeddings(
+        self, provider, model, dimension, input_type, texts, fetch
+    ):
+        """
+        Serve what we can from the embedding cache, send only the misses
+        (deduplicated) to the provider through ``fetch`` and merge the
+        results back in input order, as one (len(texts), dim) float32 matrix.
+        """
+        if self.embedding_cache is None:
+            return as_float32_matrix(await fetch(texts))
+
+        results = await self.embedding_cache.get_many(
+            provider, model, dimension, input_type, texts
+        )
+        missing = [i for i, vector in enumerate(results) if vector is None]
+
+        if missing:
+            missing_texts = list(dict.fromkeys(texts[i] for i in missing))
+            fetched = as_float32_matrix(await fetch(missing_texts))
+            await self.embedding_cache.put_many(
+                provider, model, dimension, input_type, missing_texts, fetched
+            )
+            fetched_by_text = dict(zip(missing_texts, fetched))
+            for i in missing:
+                results[i] = fetched_by_text[texts[i]]
+
+        return as_float32_matrix(results)
+
+    def _matryoshka_source_dimension(self, model, dimension):
+        """
+        For models trained with Matryoshka representation learning, the
+        dimension to embed at so that ``dimension`` can be derived locally,
+        or None when the provider should be asked for ``dimension``.
+        """
+        full_dimension = settings.MATRYOSHKA_MODELS.get(model)
+        if (
+            settings.MATRYOSHKA_DERIVATION_ENABLED
+            and full_dimension
+            and dimension
+            and dimension < full_dimension
+        ):
+            return full_dimension
+        return None
+
+    async def _derived_embeddings(
+        self, provider, model, dimension, input_type, texts, fetch_at
+    ):
+        """
+        Embed (and cache) at the model's full dimension, then truncate and
+        renormalize to ``dimension``. A sweep over dimensions costs one
+        provider pass instead of one per dimension.
+        """
+        full_dimension = self._matryoshka_source_dimension(model, dimension)
+        if full_dimension is None:
+            return await self._cached_embeddings(
+                provider,
+                model,
+                dimension,
+                input_type,
+                texts,
+                lambda missing: fetch_at(missing, dimension),
+            )
+
+        full_embeddings = await self._cached_embeddings(
+            provider,
+            model,
+            full_dimension,
+            input_type,
+            texts,
+            lambda missing: fetch_at(missing, full_dimension),
+        )
+        return truncate_and_normalize(full_embeddings, dimension)
+
+    async def embed_texts(
+        self,
+        provider: str,
+        model: str,
+        texts: list[str],
+        input_type: str = None,
+        dimension: int = None,
+        limiter: AIMDConcurrencyLimiter = None,
+    ):
+        """
+        Embed plain texts with whichever provider serves the model. Callers
+        holding a ``limiter`` slot pass the limiter so that provider
+        overloads are reported to it as they happen.
+        """
+
+        if provider == "pinecone":
+            return await self.pinecone_dense_embeddings(
+                inputs=[{"text": text} for text in texts],
+                embedding_model=model,
+                input_type=input_type,
+                dimension=dimension,
+                limiter=limiter,
+            )
+        elif provider == "cohere":
+            return await self.cohere_dense_embeddings(
+                model_name=model,
+                texts=texts,
+                input_type=input_type,
+                limiter=limiter,
+            )
+        elif provider == "jina":
+            return await self.jina_dense_embeddings(
+                model_name=model,
+                dimension=dimension,
+                inputs=texts,
+                input_type=input_type,
+                limiter=limiter,
+            )
+
+        raise HTTPException(
+            status_code=400,
+            detail=f"Unsupported embedding provider: {provider}",
+        )
+
     async def pinecone_dense_embeddings(
         self,
         inputs: list,
@@ -32,6 +161,33 @@ class EmbeddingService:
         input_type: str = "passage",
         truncate: str = "END",
         dimension: int = 1024,
+        limiter: AIMDConcurrencyLimiter = None,
+    ):
+        texts = [item["text"] for item in inputs]
+        return await self._derived_embeddings(
+            "pinecone",
+            embedding_model,
+            dimension,
+            input_type,
+            texts,
+            lambda missing, at_dimension: self._pinecone_dense_request(
+                missing,
+                embedding_model,
+                input_type,
+                truncate,
+                at_dimension,
+                limiter,
+            ),
+        )
+
+    async def _pinecone_dense_request(
+        self,
+        texts: list,
+        embedding_model: str,
+        input_type: str,
+        truncate: str,
+        dimension: int,
+        limiter: AIMDConcurrencyLimiter = None,
     ):
         payload = {
             "model": embedding_model,
@@ -40,7 +196,7 @@ class EmbeddingService:
                 "truncate": truncate,
                 "dimension": dimension,
             },
-            "inputs": inputs,
+            "inputs": [{"text": text} for text in texts],
         }
 
         headers = {
@@ -52,13 +208,21 @@ class EmbeddingService:
         url = self.dense_embed_url
 
         try:
-            async with httpx.AsyncClient() as client:
-                response = await client.post(url, headers=headers, json=payload)
-                response.raise_for_status()
-                print("embeddings generated")
-                response = response.json()
-                list_result = [item["values"] for item in response["data"]]
-                return list_result
+            response = await self.http_clients.request(
+                "pinecone",
+                "POST",
+                url,
+                limiter=limiter,
+                headers=headers,
+                json=payload,
+            )
+            response.raise_for_status()
+            print("embeddings generated")
+            response = orjson.loads(response.content)
+            return np.asarray(
+                [item["values"] for item in response["data"]],
+                dtype=np.float32,
+            )
 
         except httpx.HTTPStatusError as e:
             parsed_response = json.loads(response.content.decode("utf-8"))
@@ -66,27 +230,75 @@ class EmbeddingService:
                 "message", "Unknown error occurred"
             )
             logging.error(f"Error dense embeddings: {error_message}")
-            raise HTTPException(status_code=400, detail=error_message)
+            raise HTTPException(
+                status_code=429 if e.response.status_code == 429 else 400,
+                detail=error_message,
+            )
+        except httpx.TimeoutException as e:
+            logging.error(f"Timeout dense embeddings: {str(e)}")
+            raise HTTPException(status_code=504, detail="Embedding timed out")
         except Exception as e:
             logging.error(f"Error dense embeddings: {str(e)}")
             raise HTTPException(status_code=500, detail=str(e))
 
-    def pinecone_sparse_embeddings(self, inputs):
+    async def fit_pinecone_sparse_embeddings(self, inputs: list[str]):
+        """(unsaved BM25 encoder fitted on ``inputs``, their vectors)"""
+        try:
+            return await self.sparse_encoders.fit_and_encode_documents(inputs)
+        except Exception as e:
+            logging.error(f"Error creating sparse embeddings: {str(e)}")
+            raise HTTPException(status_code=500, detail=str(e))
+
+    def pinecone_sparse_embeddings(
+        self, inputs, index_name: str = None, namespace: str = None
+    ):
         try:
-            sparse_vector = bm25.encode_documents(inputs)
+            sparse_vector = self.sparse_encoders.encode_documents(
+                inputs, index_name, namespace
+            )
             return sparse_vector
 
         except Exception as e:
             logging.error(f"Error creating sparse embeddings: {str(e)}")
             raise HTTPException(status_code=500, detail=str(e))
 
+    def pinecone_sparse_query_embeddings(
+        self, inputs, index_name: str = None, namespace: str = None
+    ):
+        try:
+            return self.sparse_encoders.encode_queries(
+                inputs, index_name, namespace
+            )
+
+        except Exception as e:
+            logging.error(f"Error creating sparse query embeddings: {str(e)}")
+            raise HTTPException(status_code=500, detail=str(e))
+
     async def cohere_dense_embeddings(
         self,
         model_name: str,
         texts: list[str],
         input_type: str = "search_document",
+        limiter: AIMDConcurrencyLimiter = None,
     ):
+        return await self._cached_embeddings(
+            "cohere",
+            model_name,
+            None,
+            input_type,
+            texts,
+            lambda missing: self._cohere_dense_request(
+                model_name, missing, input_type, limiter
+            ),
+        )
 
+    async def _cohere_dense_request(
+        self,
+        model_name: str,
+        texts: list[str],
+        input_type: str,
+        limiter: AIMDConcurrencyLimiter = None,
+    ):
         url = f"{self.cohere_base_url}/{self.EMBED_SUFFIX}"
 
         headers = {
@@ -102,18 +314,25 @@ class EmbeddingService:
         }
 
         try:
-            async with httpx.AsyncClient(verify=False) as client:
-                response = await client.post(url, headers=headers, json=data)
-                response.raise_for_status()
-                # return response.json()
-                response = response.json()
-                result = response["embeddings"]["float"]
-                return result
+            response = await self.http_clients.request(
+                "cohere",
+                "POST",
+                url,
+                limiter=limiter,
+                headers=headers,
+                json=data,
+            )
+            response.raise_for_status()
+            response = orjson.loads(response.content)
+            return np.asarray(response["embeddings"]["float"], dtype=np.float32)
         except httpx.HTTPStatusError as e:
             logging.error(f"HTTP error: {e.response.status_code} - {str(e)}")
             raise HTTPException(
                 status_code=e.response.status_code, detail=str(e)
             )
+        except httpx.TimeoutException as e:
+            logging.error(f"Timeout error:  {str(e)}")
+            raise HTTPException(status_code=504, detail="Embedding timed out")
         except httpx.RequestError as e:
             logging.error(f"Request error:  {str(e)}")
             raise HTTPException(
@@ -124,10 +343,36 @@ class EmbeddingService:
             raise HTTPException(status_code=500, detail=str(e))
 
     async def jina_dense_embeddings(
-        self, model_name: str, dimension: int, inputs: list[str]
+        self,
+        model_name: str,
+        dimension: int,
+        inputs: list,
+        input_type: str = None,
+        limiter: AIMDConcurrencyLimiter = None,
     ):
+        texts = [
+            item["text"] if isinstance(item, dict) else item for item in inputs
+        ]
+        return await self._derived_embeddings(
+            "jina",
+            model_name,
+            dimension,
+            input_type,
+            texts,
+            lambda missing, at_dimension: self._jina_dense_request(
+                model_name, at_dimension, missing, input_type, limiter
+            ),
+        )
 
-        url = f"{self.cohere_base_url}/{self.JINA_EMBED_SUFFIX}"
+    async def _jina_dense_request(
+        self,
+        model_name: str,
+        dimension: int,
+        texts: list[str],
+        input_type: str = None,
+        limiter: AIMDConcurrencyLimiter = None,
+    ):
+        url = f"{self.jina_base_url}/{self.JINA_EMBED_SUFFIX}"
 
         headers = {
             "Content-Type": "application/json",
@@ -138,23 +383,35 @@ class EmbeddingService:
             "dimensions": dimension,
             "normalized": True,
             "embedding_type": "float",
-            "input": inputs,
+            "input": texts,
         }
+        if input_type:
+            data["task"] = input_type
 
         try:
-            async with httpx.AsyncClient() as client:
-                response = await client.post(url, headers=headers, json=data)
-                response.raise_for_status()
-                # return response.json()
-                response = response.json()
-                result = [item["embedding"] for item in response["data"]]
-                return result
+            response = await self.http_clients.request(
+                "jina",
+                "POST",
+                url,
+                limiter=limiter,
+                headers=headers,
+                json=data,
+            )
+            response.raise_for_status()
+            response = orjson.loads(response.content)
+            return np.asarray(
+                [item["embedding"] for item in response["data"]],
+                dtype=np.float32,
+            )
 
         except httpx.HTTPStatusError as e:
             logging.error(f"HTTP error: {e.response.status_code} - {str(e)}")
             raise HTTPException(
                 status_code=e.response.status_code, detail=str(e)
             )
+        except httpx.TimeoutException as e:
+            logging.error(f"Timeout error:  {str(e)}")
+            raise HTTPException(status_code=504, detail="Embedding timed out")
         except httpx.RequestError as e:
             logging.error(f"Request error:  {str(e)}")
             raise HTTPException(
@@ -0,0 +1,151 @@
+import asyncio
+import json
+import logging
+import time
+from typing import Any, Dict, Optional
+
+import httpx
+from fastapi import HTTPException
+
+from app.config.http_client import HTTPClientHelper
+from app.config.settings import settings
+
+logger = logging.getLogger(__name__)
+
+
+class IndexLifecycleManager:
+    """
+    Creates Pinecone indexes and waits for them to become ready without
+    blocking the event loop.
+
+    Describe calls go through the shared async HTTP client and are polled
+    with exponential backoff. Concurrent ``ensure_index`` calls for the same
+    index share one readiness task, so an index is created and polled once
+    however many requests are waiting on it.
+    """
+
+    def __init__(self, http_clients: HTTPClientHelper):
+        self.http_clients = http_clients
+        self.pinecone_api_key = settings.PINECONE_API_KEY
+        self.api_version = settings.PINECONE_API_VERSION
+        self.index_url = settings.PINECONE_CREATE_INDEX_URL
+        self.ready_timeout = settings.INDEX_READY_TIMEOUT_SECONDS
+        self.poll_initial = settings.INDEX_READY_POLL_INITIAL_SECONDS
+        self.poll_max = settings.INDEX_READY_POLL_MAX_SECONDS
+        self._ready: Dict[str, Dict[str, Any]] = {}
+        self._pending: Dict[str, asyncio.Task] = {}
+
+    def _headers(self) -> Dict[str, str]:
+        return {
+            "Accept": "application/json",
+            "Api-Key": self.pinecone_api_key,
+            "X-Pinecone-API-Version": self.api_version,
+        }
+
+    async def describe_index(self, index_name: str) -> Optional[Dict]:
+        """The index description, or None if the index does not exist."""
+        response = await self.http_clients.request(
+            "pinecone",
+            "GET",
+            f"{self.index_url}/{index_name}",
+            headers=self._headers(),
+        )
+        if response.status_code == 404:
+            return None
+        response.raise_for_status()
+        return response.json()
+
+    async def _create(self, index_name: str, dimension: int, metric: str):
+        index_data = {
+            "name": index_name,
+            "dimension": dimension,
+            "metric": metric,
+            "spec": {"serverless": {"cloud": "aws", "region": "us-east-1"}},
+        }
+        response = await self.http_clients.request(
+            "pinecone",
+            "POST",
+            self.index_url,
+            headers=self._headers(),
+            json=index_data,
+        )
+        # 409: created concurrently by another worker, just wait for it
+        if response.status_code != 409:
+            response.raise_for_status()
+        logger.info(f"Index {index_name} created")
+
+    async def wait_until_ready(self, index_name: str) -> Dict[str, Any]:
+        deadline = time.monotonic() + self.ready_timeout
+        delay = self.poll_initial
+
+        while True:
+            description = await self.describe_index(index_name)
+            status = (description or {}).get("status") or {}
+            logger.info(f"Index {index_name} status: {status.get('state')}")
+
+            if status.get("ready") or status.get("state") == "Ready":
+                return description
+
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                raise asyncio.TimeoutError(
+                    f"Index {index_name} was not ready after "
+                    f"{self.ready_timeout} seconds"
+                )
+            await asyncio.sleep(min(delay, remaining))
+            delay = min(delay * 2, self.poll_max)
+
+    async def _create_and_wait(
+        self, index_name: str, dimension: int, metric: str
+    ) -> Dict[str, Any]:
+        if await self.describe_index(index_name) is None:
+            await self._create(index_name, dimension, metric)
+        else:
+            logger.info(f"Index {index_name} already exists")
+
+        description = await self.wait_until_ready(index_name)
+        self._ready[index_name] = description
+        return description
+
+    async def ensure_index(
+        self, index_name: str, dimension: int, metric: str
+    ) -> Dict[str, Any]:
+        """
+        Create ``index_name`` if it does not exist and return its description
+        once it is ready.
+        """
+        if index_name in self._ready:
+            return self._ready[index_name]
+
+        task = self._pending.get(index_name)
+        if task is None:
+            task = asyncio.create_task(
+                self._create_and_wait(index_name, dimension, metric)
+            )
+            self._pending[index_name] = task
+            task.add_done_callback(
+                lambda _: self._pending.pop(index_name, None)
+            )
+
+        try:
+            # shield: a cancelled caller must not cancel the shared task
+            return await asyncio.shield(task)
+        except httpx.HTTPStatusError as e:
+            try:
+                error_message = (
+                    json.loads(e.response.content.decode("utf-8"))
+                    .get("error", {})
+                    .get("message", "Unknown error occurred")
+                )
+            except (ValueError, AttributeError):
+                error_message = e.response.text or str(e)
+            logging.error(f"Error creating index: {error_message}")
+            raise HTTPException(status_code=400, detail=error_message)
+        except asyncio.TimeoutError as e:
+            logging.error(f"Error creating index: {str(e)}")
+            raise HTTPException(
+                status_code=504, detail="Index creation timed out"
+            )
+        except Exception as e:
+            logging.error(f"Error creating index: {str(e)}")
+            raise HTTPException(status_code=500, detail=str(e))
@@ -0,0 +1,71 @@
+import asyncio
+import logging
+from typing import List, Optional, Tuple
+
+from app.repositories.index_upsert_repository import IndexUpsertRepository
+from app.services.vector_store_router import VectorStoreRouter
+
+logger = logging.getLogger(__name__)
+
+
+class IndexWarmPool:
+    """
+    Provisions the commonly used ``{similarity_metric}-{dimension}`` indexes
+    in the background at startup and records their hosts in
+    ``index_upsert``, so the first upsert for one of these pairs finds an
+    existing index instead of creating one and polling until it is ready.
+    Nothing is provisioned unless ``INDEX_WARM_POOL`` lists indexes.
+    """
+
+    def __init__(
+        self,
+        vector_store: VectorStoreRouter,
+        index_upsert_repository: IndexUpsertRepository,
+        index_names: List[str],
+    ):
+        self.vector_store = vector_store
+        self.index_upsert_repository = index_upsert_repository
+        self.pairs = [self.parse_index_name(name) for name in index_names]
+        self._task: Optional[asyncio.Task] = None
+
+    @staticmethod
+    def parse_index_name(index_name: str) -> Tuple[str, int]:
+        metric, dimension = index_name.rsplit("-", 1)
+        return metric, int(dimension)
+
+    async def _provision(self, metric: str, dimension: int):
+        index_name = f"{metric}-{dimension}"
+        try:
+            existing = await self.index_upsert_repository.find_matching_index(
+                dimension, metric
+            )
+            if existing:
+                return
+
+            description = await self.vector_store.create_index(
+                index_name, dimension, metric
+            )
+            await self.index_upsert_repository.register_index(
+                index_name, description.get("host"), dimension, metric
+            )
+            logger.info(f"Warm pool index {index_name} is ready")
+        except Exception as e:
+            logger.error(f"Error provisioning warm index {index_name}: {e}")
+
+    async def _run(self):
+        await asyncio.gather(
+            *(self._provision(metric, dim) for metric, dim in self.pairs)
+        )
+
+    def start(self):
+        if self.pairs and self._task is None:
+            self._task = asyncio.create_task(self._run())
+
+    async def stop(self):
+        if self._task is not None and not self._task.done():
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+        self._task = None
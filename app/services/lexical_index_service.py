@@ -0,0 +1,136 @@
+import asyncio
+import logging
+import os
+import re
+import time
+from typing import Dict, List, Optional, Tuple
+
+import orjson
+
+from app.services.sparse_encoder_service import SparseEncoderManager
+from app.utils.cache import LRUCache
+from app.utils.inverted_index import InvertedIndex
+
+logger = logging.getLogger(__name__)
+
+
+class LexicalIndexManager:
+    """
+    Per-namespace BM25 inverted indexes for lexical-only retrieval.
+
+    An index is built at upsert time from the namespace's chunks, reusing
+    the sparse encoder's tokenization (and its term frequency cache). Once
+    the namespace's vectors are upserted it is persisted as
+    ``{index_name}/{namespace}.npz`` with the chunk ids and texts next to
+    it. Loaded indexes are kept in an LRU of ``max_loaded`` namespaces.
+    """
+
+    def __init__(
+        self,
+        sparse_encoders: SparseEncoderManager,
+        index_dir: str,
+        max_loaded: int,
+        block_size: int = 128,
+    ):
+        self.sparse_encoders = sparse_encoders
+        self.index_dir = index_dir
+        self.block_size = block_size
+        self._indexes = LRUCache(max_loaded)
+        self.queries = 0
+        self.postings_decoded = 0
+        self.postings_total = 0
+        self.query_seconds = 0.0
+
+    def _paths(self, index_name: str, namespace: str) -> Tuple[str, str]:
+        safe_index = re.sub(r"[^A-Za-z0-9._-]", "_", index_name)
+        safe_name = re.sub(r"[^A-Za-z0-9._-]", "_", namespace)
+        base = os.path.join(self.index_dir, safe_index, safe_name)
+        return f"{base}.npz", f"{base}.docs.json"
+
+    async def build(
+        self, chunks: List[dict]
+    ) -> Tuple[InvertedIndex, Dict[str, list]]:
+        """Index ``chunks`` without persisting anything (see ``save``)."""
+        tfs = await self.sparse_encoders.term_frequencies(
+            [chunk["text"] for chunk in chunks]
+        )
+        index = await asyncio.to_thread(
+            InvertedIndex.build, tfs, self.block_size
+        )
+        docs = {
+            "ids": [chunk["_id"] for chunk in chunks],
+            "texts": [chunk["text"] for chunk in chunks],
+        }
+        return index, docs
+
+    def save(
+        self,
+        index_name: str,
+        namespace: str,
+        built: Tuple[InvertedIndex, Dict[str, list]],
+    ):
+        """Persist ``built`` as the lexical index of the index's namespace."""
+        index, docs = built
+        index_path, docs_path = self._paths(index_name, namespace)
+        index.save(index_path)
+        tmp_path = f"{docs_path}.tmp"
+        with open(tmp_path, "wb") as f:
+            f.write(orjson.dumps(docs))
+        os.replace(tmp_path, docs_path)
+        self._indexes.put((index_name, namespace), built)
+
+    def _load(
+        self, index_name: str, namespace: str
+    ) -> Optional[Tuple[InvertedIndex, dict]]:
+        index_path, docs_path = self._paths(index_name, namespace)
+        if not os.path.exists(index_path) or not os.path.exists(docs_path):
+            return None
+        with open(docs_path, "rb") as f:
+            docs = orjson.loads(f.read())
+        loaded = (InvertedIndex.load(index_path), docs)
+        self._indexes.put((index_name, namespace), loaded)
+        return loaded
+
+    async def search(
+        self, index_name: str, namespace: str, query: str, top_k: int
+    ) -> Optional[Dict]:
+        """BM25 top-k for ``query`` in Pinecone's ``{"matches": [...]}``."""
+        loaded = self._indexes.get((index_name, namespace))
+        if loaded is None:
+            loaded = await asyncio.to_thread(self._load, index_name, namespace)
+        if loaded is None:
+            return None
+        index, docs = loaded
+
+        started = time.perf_counter()
+        terms, counts = self.sparse_encoders.query_terms(query)
+        rows, scores, (decoded, total) = index.search(terms, counts, top_k)
+        self.query_seconds += time.perf_counter() - started
+        self.queries += 1
+        self.postings_decoded += decoded
+        self.postings_total += total
+
+        return {
+            "matches": [
+                {
+                    "id": docs["ids"][row],
+                    "score": float(score),
+                    "metadata": {"text": docs["texts"][row]},
+                }
+                for row, score in zip(rows.tolist(), scores.tolist())
+            ],
+            "namespace": namespace,
+        }
+
+    def stats(self) -> Dict:
+        return {
+            "loaded_indexes": len(self._indexes),
+            "queries": self.queries,
+            "avg_query_ms": (
+                round(1000 * self.query_seconds / self.queries, 4)
+                if self.queries
+                else None
+            ),
+            "postings_decoded": self.postings_decoded,
+            "postings_in_query_terms": self.postings_total,
+        }
@@ -0,0 +1,1026 @@
+import asyncio
+import json
+import logging
+import os
+import re
+import threading
+from typing import Dict, List, Optional, Tuple
+
+import numpy as np
+import orjson
+from fastapi import HTTPException
+
+from app.utils.hnsw import HNSWIndex
+from app.utils.metadata_index import FilterError, MetadataIndex
+from app.utils.quantization import CODECS, train_codec
+from app.utils.vector_ops import as_float32_matrix, hybrid_scale, top_k
+
+logger = logging.getLogger(__name__)
+
+LOCAL_HOST_SCHEME = "local://"
+SUPPORTED_METRICS = ("dotproduct", "cosine", "euclidean")
+
+
+def _safe_name(name: str) -> str:
+    return re.sub(r"[^A-Za-z0-9._-]", "_", name)
+
+
+class LocalNamespace:
+    """
+    Append-only, memory-mapped storage for the vectors of one namespace.
+
+    Each upsert appends dense rows to ``vectors.f32``, sparse values to
+    ``sparse_indices.u32`` / ``sparse_values.f32`` with their row offsets
+    in ``sparse_indptr.i64``, and one ``records.jsonl`` line per row with
+    its id and metadata. Re-upserting an id appends a new row and retires
+    the old one from ``live``. ``records.jsonl`` is written last, so a torn
+    write is repaired on load by trimming every file to the rows it
+    lists.
+
+    Once a namespace reaches ``ann_params["min_rows"]`` rows, an hnswlib
+    HNSW graph persisted under ``hnsw/`` is built and then extended after
+    every upsert, in the background, and dense queries are answered from
+    it instead of by exact search whenever it covers every row and every
+    retired row is marked deleted in it.
+
+    With ``codec_params``, rows are also kept as int8 (``sq8``) or product
+    quantized (``pq``) codes under ``codec/``. Scans then read the compact
+    codes from memory and only touch the float32 file to rerank the best
+    candidates.
+
+    Metadata filters are evaluated by a ``MetadataIndex`` over
+    ``filter_params["fields"]``, rebuilt in memory after each upsert. When
+    a filter keeps at most ``FILTER_SUBSET_FRACTION`` of the rows, only
+    the matching rows are gathered and scored.
+    """
+
+    ANN_INSERT_CHUNK = 4096
+    ANN_EF_WIDENINGS = 3
+    FILTER_SUBSET_FRACTION = 0.25
+
+    def __init__(
+        self,
+        path: str,
+        dimension: int,
+        metric: str,
+        ann_params: Optional[dict] = None,
+        codec_params: Optional[dict] = None,
+        filter_params: Optional[dict] = None,
+    ):
+        self.path = path
+        self.dimension = dimension
+        self.metric = metric
+        self.ann_params = ann_params
+        self.ann_path = os.path.join(path, "hnsw")
+        self.codec_params = codec_params
+        self.codec_path = os.path.join(path, "codec")
+        self.codec = None
+        self.codes = np.zeros((0, 0), dtype=np.uint8)
+        self.codec_stats: dict = {}
+        self.filter_params = filter_params or {"fields": []}
+        self.filter_index: Optional[MetadataIndex] = None
+        self.vectors_path = os.path.join(path, "vectors.f32")
+        self.indptr_path = os.path.join(path, "sparse_indptr.i64")
+        self.sparse_indices_path = os.path.join(path, "sparse_indices.u32")
+        self.sparse_values_path = os.path.join(path, "sparse_values.f32")
+        self.records_path = os.path.join(path, "records.jsonl")
+        self.ids: List[str] = []
+        self.metadata: List[dict] = []
+        self.id_rows: Dict[str, int] = {}
+        self.live = np.zeros(0, dtype=bool)
+        self.sq_norms = np.zeros(0, dtype=np.float32)
+        self.indptr = np.zeros(1, dtype=np.int64)
+        self._vectors: Optional[np.memmap] = None
+        self._sparse: Optional[Tuple[np.ndarray, ...]] = None
+        self._lock = threading.Lock()
+        self._ann_lock = threading.Lock()
+        self._codec_lock = threading.Lock()
+        self._filter_lock = threading.Lock()
+        self._load()
+        self.ann: Optional[HNSWIndex] = None
+        if ann_params:
+            self.ann = HNSWIndex.load(
+                self.ann_path, ann_params["ef_search"], ann_params["threads"]
+            )
+            if self.ann is not None and len(self.ann) > len(self.ids):
+                # rows were trimmed by a torn write; rebuild the graph
+                self.ann = None
+        if codec_params:
+            self._load_codec()
+
+    def _load_codec(self):
+        meta_path = os.path.join(self.codec_path, "meta.json")
+        if not os.path.exists(meta_path):
+            return
+
+        with open(meta_path, "r") as f:
+            meta = json.load(f)
+        with np.load(os.path.join(self.codec_path, "params.npz")) as params:
+            codec = CODECS[meta.pop("kind")].from_params(params)
+
+        codes_path = os.path.join(self.codec_path, "codes.u8")
+        code_size = codec.code_size()
+        n_coded = min(self._file_items(codes_path, code_size), len(self.ids))
+        self._truncate(codes_path, n_coded * code_size)
+        codes = np.fromfile(
+            codes_path, dtype=np.uint8, count=n_coded * code_size
+        )
+        self.codec = codec
+        self.codes = codes.reshape(n_coded, code_size)
+        self.codec_stats = meta
+
+    def __len__(self) -> int:
+        return len(self.ids)
+
+    @staticmethod
+    def _file_items(path: str, itemsize: int) -> int:
+        return os.path.getsize(path) // itemsize if os.path.exists(path) else 0
+
+    @staticmethod
+    def _truncate(path: str, size: int):
+        if os.path.exists(path) and os.path.getsize(path) != size:
+            with open(path, "r+b") as f:
+                f.truncate(size)
+
+    def _load(self):
+        if not os.path.exists(self.records_path):
+            return
+
+        with open(self.records_path, "rb") as f:
+            records = []
+            for line in f:
+                try:
+                    records.append(orjson.loads(line))
+                except orjson.JSONDecodeError:
+                    break
+
+        row_bytes = self.dimension * 4
+        n_rows = min(
+            len(records),
+            self._file_items(self.vectors_path, row_bytes),
+            self._file_items(self.indptr_path, 8),
+        )
+        indptr = (
+            np.fromfile(self.indptr_path, dtype=np.int64, count=n_rows)
+            if n_rows
+            else np.zeros(0, dtype=np.int64)
+        )
+        n_values = int(indptr[-1]) if n_rows else 0
+
+        self._truncate(self.vectors_path, n_rows * row_bytes)
+        self._truncate(self.indptr_path, n_rows * 8)
+        self._truncate(self.sparse_indices_path, n_values * 4)
+        self._truncate(self.sparse_values_path, n_values * 4)
+        if len(records) != n_rows:
+            with open(self.records_path, "wb") as f:
+                f.writelines(
+                    orjson.dumps(record) + b"\n" for record in records[:n_rows]
+                )
+
+        records = records[:n_rows]
+        self.ids = [record["id"] for record in records]
+        self.metadata = [record.get("metadata") or {} for record in records]
+        self.id_rows = {id: row for row, id in enumerate(self.ids)}
+        live = np.zeros(n_rows, dtype=bool)
+        live[list(self.id_rows.values())] = True
+        self.live = live
+        self.indptr = np.concatenate([[0], indptr]).astype(np.int64)
+        self.sq_norms = self._row_sq_norms(self.vectors(), 0, n_rows)
+
+    @staticmethod
+    def _row_sq_norms(vectors, start: int, stop: int, block: int = 65536):
+        if vectors is None or stop <= start:
+            return np.zeros(0, dtype=np.float32)
+        return np.concatenate(
+            [
+                np.einsum("ij,ij->i", rows, rows)
+                for rows in (
+                    np.asarray(vectors[i : min(i + block, stop)])
+                    for i in range(start, stop, block)
+                )
+            ]
+        ).astype(np.float32)
+
+    def vectors(self) -> Optional[np.memmap]:
+        n_rows = len(self.ids)
+        if not n_rows:
+            return None
+        if self._vectors is None or self._vectors.shape[0] != n_rows:
+            self._vectors = np.memmap(
+                self.vectors_path,
+                dtype=np.float32,
+                mode="r",
+                shape=(n_rows, self.dimension),
+            )
+        return self._vectors
+
+    def sparse(self) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+        """CSR sparse matrix as (row ids, term indices, values) per entry."""
+        n_values = int(self.indptr[-1])
+        if self._sparse is None or len(self._sparse[0]) != n_values:
+            if not n_values:
+                return (
+                    np.zeros(0, dtype=np.int64),
+                    np.zeros(0, dtype=np.uint32),
+                    np.zeros(0, dtype=np.float32),
+                )
+            self._sparse = (
+                np.repeat(np.arange(len(self.ids)), np.diff(self.indptr)),
+                np.memmap(
+                    self.sparse_indices_path,
+                    dtype=np.uint32,
+                    mode="r",
+                    shape=(n_values,),
+                ),
+                np.memmap(
+                    self.sparse_values_path,
+                    dtype=np.float32,
+                    mode="r",
+                    shape=(n_values,),
+                ),
+            )
+        return self._sparse
+
+    def upsert(self, records: List[dict]) -> int:
+        if not records:
+            return 0
+
+        dense = as_float32_matrix([record["values"] for record in records])
+        if dense.shape[1] != self.dimension:
+            raise ValueError(
+                f"Vector dimension {dense.shape[1]} does not match index "
+                f"dimension {self.dimension}"
+            )
+
+        sparse_indices, sparse_values, lengths = [], [], []
+        for record in records:
+            sparse_vector = record.get("sparse_values") or {}
+            indices = np.asarray(
+                sparse_vector.get("indices", []), dtype=np.uint32
+            )
+            sparse_indices.append(indices)
+            sparse_values.append(
+                np.asarray(sparse_vector.get("values", []), dtype=np.float32)
+            )
+            lengths.append(len(indices))
+
+        with self._lock:
+            os.makedirs(self.path, exist_ok=True)
+            start = len(self.ids)
+            indptr = int(self.indptr[-1]) + np.cumsum(lengths, dtype=np.int64)
+
+            with open(self.vectors_path, "ab") as f:
+                f.write(dense.tobytes())
+            with open(self.sparse_indices_path, "ab") as f:
+                f.write(np.concatenate(sparse_indices).tobytes())
+            with open(self.sparse_values_path, "ab") as f:
+                f.write(np.concatenate(sparse_values).tobytes())
+            with open(self.indptr_path, "ab") as f:
+                f.write(indptr.tobytes())
+            with open(self.records_path, "ab") as f:
+                f.writelines(
+                    orjson.dumps(
+                        {
+                            "id": record["id"],
+                            "metadata": record.get("metadata") or {},
+                        }
+                    )
+                    + b"\n"
+                    for record in records
+                )
+
+            # publish new arrays instead of mutating ones readers may hold
+            live = np.concatenate([self.live, np.ones(len(records), bool)])
+            for offset, record in enumerate(records):
+                previous = self.id_rows.get(record["id"])
+                if previous is not None:
+                    live[previous] = False
+                self.id_rows[record["id"]] = start + offset
+            self.ids.extend(record["id"] for record in records)
+            self.metadata.extend(
+                record.get("metadata") or {} for record in records
+            )
+            self.sq_norms = np.concatenate(
+                [self.sq_norms, np.einsum("ij,ij->i", dense, dense)]
+            )
+            self.indptr = np.concatenate([self.indptr, indptr])
+            self.live = live
+
+        return len(records)
+
+    def ann_behind(self) -> bool:
+        """Whether ``update_ann`` has rows to build or insert."""
+        if not self.ann_params:
+            return False
+        live = self.live
+        n_live = int(live.sum())
+        if self.ann is None:
+            return n_live >= self.ann_params["min_rows"]
+        return (
+            len(self.ann) < len(live) or self.ann.n_deleted < len(live) - n_live
+        )
+
+    def update_ann(self, stop: Optional[threading.Event] = None):
+        """
+        Insert rows the HNSW graph does not cover yet, building the graph
+        once the namespace is large enough, then mark retired rows deleted.
+        Rows go in chunks so queries waiting on the graph are never held up
+        for long, and ``stop`` is checked between chunks. Progress is saved
+        either way.
+        """
+        if not self.ann_params:
+            return
+        if self.ann is None:
+            if int(self.live.sum()) < self.ann_params["min_rows"]:
+                return
+            self.ann = HNSWIndex(
+                self.metric,
+                self.dimension,
+                M=self.ann_params["M"],
+                ef_construction=self.ann_params["ef_construction"],
+                ef_search=self.ann_params["ef_search"],
+                threads=self.ann_params["threads"],
+            )
+
+        with self._lock:
+            vectors = self.vectors()
+            live = self.live
+            n_rows = len(live)
+        if vectors is None:
+            return
+
+        for start in range(len(self.ann), n_rows, self.ANN_INSERT_CHUNK):
+            if stop is not None and stop.is_set():
+                break
+            with self._ann_lock:
+                self.ann.add(
+                    vectors, min(start + self.ANN_INSERT_CHUNK, n_rows)
+                )
+        with self._ann_lock:
+            self.ann.retire(live)
+            self.ann.save(self.ann_path)
+
+    def ann_search(
+        self, query: np.ndarray, top_k_count: int, ef_search: int = None
+    ) -> Optional[Tuple[np.ndarray, np.ndarray]]:
+        """
+        Approximate top-k from the HNSW graph, or None when there is no
+        graph, it is behind the namespace's rows or retirements, or it
+        cannot find ``top_k_count`` live rows even after doubling ``ef``
+        ``ANN_EF_WIDENINGS`` times.
+        """
+        # checked before taking the lock, which a running build holds for
+        # a whole insert chunk, so queries fall back to exact search early
+        live = self.live
+        n_live = int(live.sum())
+        ann = self.ann
+        if (
+            ann is None
+            or len(ann) != len(live)
+            or ann.n_deleted != len(live) - n_live
+        ):
+            return None
+
+        wanted = min(top_k_count, n_live)
+        if not wanted:
+            return None
+        with self._ann_lock:
+            if self.ann is not ann or len(ann) != len(self.live):
+                return None
+            ef = max(ef_search or ann.ef_search, wanted)
+            for _ in range(self.ANN_EF_WIDENINGS + 1):
+                result = ann.search(query, wanted, ef)
+                if result is not None:
+                    break
+                ef *= 2
+            else:
+                return None
+        rows, keys = result
+        return rows, -keys if self.metric == "euclidean" else keys
+
+    @staticmethod
+    def sparse_scores(sparse, indices, values, n_rows: int) -> np.ndarray:
+        """Dot product of one sparse query with every stored sparse row."""
+        scores = np.zeros(n_rows, dtype=np.float32)
+        query_indices = np.asarray(indices, dtype=np.uint32)
+        if not len(query_indices):
+            return scores
+
+        order = np.argsort(query_indices)
+        query_indices = query_indices[order]
+        query_values = np.asarray(values, dtype=np.float32)[order]
+
+        row_ids, term_indices, term_values = sparse
+        positions = np.searchsorted(query_indices, term_indices)
+        positions = np.minimum(positions, len(query_indices) - 1)
+        hits = query_indices[positions] == term_indices
+        if hits.any():
+            scores += np.bincount(
+                row_ids[hits],
+                weights=term_values[hits] * query_values[positions[hits]],
+                minlength=n_rows,
+            )[:n_rows].astype(np.float32)
+        return scores
+
+    def _metric_keys(self, dots, sq_norms, query_sq_norms) -> np.ndarray:
+        """Turn (rows, queries) dot products into larger-is-better keys."""
+        if self.metric == "cosine":
+            norms = np.sqrt(sq_norms[:, None] * query_sq_norms)
+            return np.divide(
+                dots, norms, out=np.zeros_like(dots), where=norms > 0
+            )
+        if self.metric == "euclidean":
+            # rank on negative squared distance
+            return 2 * dots - sq_norms[:, None] - query_sq_norms
+        return dots
+
+    def _scan(
+        self,
+        block_dots,
+        n_queries: int,
+        top_k_count: int,
+        block_rows: int,
+        live: np.ndarray,
+        sq_norms: np.ndarray,
+        query_sq_norms: np.ndarray,
+        sparse: np.ndarray = None,
+    ) -> Tuple[List[np.ndarray], List[np.ndarray]]:
+        """
+        Top-k rows per query over the whole namespace. ``block_dots(start,
+        stop)`` returns the (rows, queries) dot products of one block, so
+        exact and compressed scoring share the blocking and merging.
+        """
+        best_rows = [np.empty(0, dtype=np.int64)] * n_queries
+        best_keys = [np.empty(0, dtype=np.float32)] * n_queries
+
+        for start in range(0, len(live), block_rows):
+            stop = min(start + block_rows, len(live))
+            keys = self._metric_keys(
+                block_dots(start, stop), sq_norms[start:stop], query_sq_norms
+            )
+            if sparse is not None:
+                keys += sparse[start:stop, None]
+            keys[~live[start:stop]] = -np.inf
+
+            for j in range(n_queries):
+                selected = top_k(keys[:, j], top_k_count)
+                rows = np.concatenate([best_rows[j], selected + start])
+                candidate_keys = np.concatenate(
+                    [best_keys[j], keys[selected, j]]
+                )
+                order = top_k(candidate_keys, top_k_count)
+                best_rows[j] = rows[order]
+                best_keys[j] = candidate_keys[order]
+
+        return best_rows, best_keys
+
+    def _rerank(
+        self,
+        vectors,
+        candidates: np.ndarray,
+        query: np.ndarray,
+        top_k_count: int,
+        sq_norms: np.ndarray,
+        sparse: np.ndarray = None,
+    ) -> Tuple[np.ndarray, np.ndarray]:
+        """Exact keys for ``candidates``, read from the on-disk vectors."""
+        rows = np.sort(candidates)
+        dots = (np.asarray(vectors[rows]) @ query)[:, None]
+        keys = self._metric_keys(
+            dots, sq_norms[rows], np.array([query @ query])
+        )[:, 0]
+        if sparse is not None:
+            keys = keys + sparse[rows]
+        order = top_k(keys, top_k_count)
+        return rows[order], keys[order]
+
+    def update_filter_index(self) -> MetadataIndex:
+        """Rebuild the metadata filter index if rows were added."""
+        with self._filter_lock:
+            index = self.filter_index
+            if index is not None and index.n_rows >= len(self.metadata):
+                return index
+            with self._lock:
+                metadata = self.metadata[:]
+            self.filter_index = MetadataIndex(
+                metadata,
+                self.filter_params["fields"],
+                self.filter_params.get("bitmap_max_cardinality", 256),
+            )
+            return self.filter_index
+
+    def filter_mask(self, filter_dict: dict) -> np.ndarray:
+        """Rows matching ``filter_dict``; raises ``FilterError``."""
+        return self.update_filter_index().mask(filter_dict)
+
+    def search(
+        self,
+        queries: np.ndarray,
+        top_k_count: int,
+        block_rows: int,
+        sparse_query: dict = None,
+        row_mask: Optional[np.ndarray] = None,
+    ) -> List[Tuple[np.ndarray, np.ndarray]]:
+        """
+        Top-k for each row of ``queries``. Rows are scored in blocks of
+        ``block_rows`` with one matrix product per block, and only each
+        block's top-k survives, so memory stays bounded for any namespace
+        size. With a trained codec, blocks are scored from the compressed
+        codes and the best ``rerank_factor * top_k`` candidates are then
+        rescored exactly. ``row_mask`` restricts the search to the rows it
+        marks. Returns (rows, scores) per query, best first.
+        """
+        with self._lock:
+            vectors = self.vectors()
+            live = self.live
+            sq_norms = self.sq_norms
+            codec, codes = self.codec, self.codes
+            sparse_rows = self.sparse() if sparse_query is not None else None
+
+        queries = as_float32_matrix(queries)
+        empty = (np.empty(0, dtype=np.int64), np.empty(0, dtype=np.float32))
+        if vectors is None:
+            return [empty for _ in range(len(queries))]
+
+        sparse = None
+        if sparse_query is not None:
+            sparse = self.sparse_scores(
+                sparse_rows,
+                sparse_query["indices"],
+                sparse_query["values"],
+                len(live),
+            )
+
+        if row_mask is not None:
+            mask = np.zeros(len(live), dtype=bool)
+            mask[: len(row_mask)] = row_mask[: len(live)]
+            live = live & mask
+
+        query_sq_norms = np.einsum("ij,ij->i", queries, queries)
+        subset = None
+        if row_mask is not None:
+            subset = np.flatnonzero(live)
+            if len(subset) > self.FILTER_SUBSET_FRACTION * len(live):
+                subset = None
+
+        if subset is not None:
+            rows, keys = self._scan(
+                lambda start, stop: np.asarray(vectors[subset[start:stop]])
+                @ queries.T,
+                len(queries),
+                top_k_count,
+                block_rows,
+                np.ones(len(subset), dtype=bool),
+                sq_norms[subset],
+                query_sq_norms,
+                sparse[subset] if sparse is not None else None,
+            )
+            best = [(subset[r], k) for r, k in zip(rows, keys)]
+        elif codec is not None and len(codes) == len(live):
+            candidates, _ = self._scan(
+                lambda start, stop: codec.dots(codes[start:stop], queries),
+                len(queries),
+                top_k_count * self.codec_params["rerank_factor"],
+                block_rows,
+                live,
+                sq_norms,
+                query_sq_norms,
+                sparse,
+            )
+            best = [
+                self._rerank(
+                    vectors, rows, query, top_k_count, sq_norms, sparse
+                )
+                for rows, query in zip(candidates, queries)
+            ]
+        else:
+            best = zip(
+                *self._scan(
+                    lambda start, stop: np.asarray(vectors[start:stop])
+                    @ queries.T,
+                    len(queries),
+                    top_k_count,
+                    block_rows,
+                    live,
+                    sq_norms,
+                    query_sq_norms,
+                    sparse,
+                )
+            )
+
+        results = []
+        for rows, keys in best:
+            found = np.isfinite(keys)
+            rows, keys = rows[found], keys[found]
+            results.append(
+                (rows, -keys if self.metric == "euclidean" else keys)
+            )
+        return results
+
+    def update_codec(self):
+        """
+        Train the configured codec once the namespace is large enough, or
+        encode the rows added since the last call with the existing one.
+        """
+        if not self.codec_params or self.codec_params["kind"] == "none":
+            return
+        with self._codec_lock:
+            self._update_codec()
+
+    def _update_codec(self):
+        with self._lock:
+            vectors = self.vectors()
+            n_rows = len(self.ids)
+            live = self.live
+            sq_norms = self.sq_norms
+            codec, n_coded = self.codec, len(self.codes)
+        if vectors is None or n_coded >= n_rows:
+            return
+
+        codes_path = os.path.join(self.codec_path, "codes.u8")
+        trained = codec is None
+        if trained:
+            if n_rows < self.codec_params["min_rows"]:
+                return
+            rng = np.random.default_rng(0)
+            sample = np.sort(
+                rng.choice(n_rows, min(n_rows, 20000), replace=False)
+            )
+            codec = train_codec(
+                self.codec_params["kind"],
+                np.asarray(vectors[sample]),
+                self.codec_params["pq_subvector_dims"],
+            )
+            os.makedirs(self.codec_path, exist_ok=True)
+            np.savez(
+                os.path.join(self.codec_path, "params.npz"), **codec.params()
+            )
+            if os.path.exists(codes_path):
+                os.remove(codes_path)
+
+        new_codes = np.concatenate(
+            [
+                codec.encode(np.asarray(vectors[i : min(i + 65536, n_rows)]))
+                for i in range(n_coded, n_rows, 65536)
+            ]
+        )
+        with open(codes_path, "ab") as f:
+            f.write(new_codes.tobytes())
+
+        if trained:
+            codes = new_codes
+            codec_stats = self._measure_codec(
+                vectors, codec, codes, live[:n_rows], sq_norms[:n_rows]
+            )
+            with open(os.path.join(self.codec_path, "meta.json"), "w") as f:
+                json.dump({"kind": codec.kind, **codec_stats}, f)
+        else:
+            codes = np.concatenate([self.codes, new_codes])
+            codec_stats = self.codec_stats
+
+        with self._lock:
+            self.codec, self.codes, self.codec_stats = codec, codes, codec_stats
+
+    def _measure_codec(
+        self, vectors, codec, codes, live, sq_norms, n_queries=50, k=10
+    ) -> dict:
+        """
+        recall@k of compressed search, with and without the exact rerank,
+        against exact search, using a sample of stored vectors as queries.
+        """
+        rng = np.random.default_rng(1)
+        live_rows = np.flatnonzero(live)
+        query_rows = np.sort(
+            rng.choice(live_rows, min(n_queries, len(live_rows)), False)
+        )
+        queries = np.asarray(vectors[query_rows])
+        query_sq_norms = np.einsum("ij,ij->i", queries, queries)
+        block_rows = 65536
+
+        exact, _ = self._scan(
+            lambda start, stop: np.asarray(vectors[start:stop]) @ queries.T,
+            len(queries),
+            k,
+            block_rows,
+            live,
+            sq_norms,
+            query_sq_norms,
+        )
+        candidates, _ = self._scan(
+            lambda start, stop: codec.dots(codes[start:stop], queries),
+            len(queries),
+            k * self.codec_params["rerank_factor"],
+            block_rows,
+            live,
+            sq_norms,
+            query_sq_norms,
+        )
+        adc_hits = rerank_hits = 0
+        for truth, rows, query in zip(exact, candidates, queries):
+            truth = set(truth.tolist())
+            adc_hits += len(truth & set(rows[:k].tolist()))
+            reranked, _ = self._rerank(vectors, rows, query, k, sq_norms)
+            rerank_hits += len(truth & set(reranked.tolist()))
+
+        total = max(len(queries) * k, 1)
+        return {
+            f"adc_recall_at_{k}": round(adc_hits / total, 4),
+            f"recall_at_{k}": round(rerank_hits / total, 4),
+            "measured_queries": len(queries),
+            "trained_rows": len(live),
+        }
+
+    def stats(self) -> dict:
+        vector_bytes = len(self.ids) * self.dimension * 4
+        code_bytes = int(self.codes.nbytes)
+        return {
+            "rows": len(self.ids),
+            "live_rows": int(self.live.sum()),
+            "metric": self.metric,
+            "ann_rows": len(self.ann) if self.ann is not None else 0,
+            "codec": self.codec.kind if self.codec is not None else "none",
+            "vector_bytes": vector_bytes,
+            "code_bytes": code_bytes,
+            "compression_ratio": (
+                round(vector_bytes / code_bytes, 2) if code_bytes else None
+            ),
+            **self.codec_stats,
+        }
+
+    def matches(
+        self, rows: np.ndarray, scores: np.ndarray, include_metadata: bool
+    ) -> List[dict]:
+        matches = []
+        for row, score in zip(rows.tolist(), scores.tolist()):
+            match = {"id": self.ids[row], "score": score, "values": []}
+            if include_metadata:
+                match["metadata"] = self.metadata[row]
+            matches.append(match)
+        return matches
+
+
+class LocalVectorStore:
+    """
+    In-process stand-in for a Pinecone index, addressed by hosts of the form
+    ``local://{index_name}``. Indexes live under ``root_dir`` with one
+    ``index.json`` (dimension and metric) and one ``LocalNamespace``
+    directory per namespace. Upserts and queries accept and return the
+    same shapes as ``PineconeService``.
+
+    HNSW graphs are built and extended by one background task per
+    namespace, so upserts return once rows, filter index and codec are
+    updated. ``close`` stops the tasks at their next insert chunk.
+    """
+
+    def __init__(
+        self,
+        root_dir: str,
+        block_rows: int,
+        ann_params: dict = None,
+        codec_params: dict = None,
+        filter_params: dict = None,
+    ):
+        self.root_dir = root_dir
+        self.block_rows = block_rows
+        self.ann_params = ann_params
+        self.codec_params = codec_params
+        self.filter_params = filter_params
+        self._indexes: Dict[str, dict] = {}
+        self._namespaces: Dict[Tuple[str, str], LocalNamespace] = {}
+        self._lock = threading.Lock()
+        self._ann_tasks: Dict[Tuple[str, str], asyncio.Task] = {}
+        self._ann_stop = threading.Event()
+
+    @staticmethod
+    def host_for(index_name: str) -> str:
+        return f"{LOCAL_HOST_SCHEME}{index_name}"
+
+    @staticmethod
+    def is_local_host(index_host: Optional[str]) -> bool:
+        return bool(index_host) and index_host.startswith(LOCAL_HOST_SCHEME)
+
+    def _index_dir(self, index_name: str) -> str:
+        return os.path.join(self.root_dir, _safe_name(index_name))
+
+    def _describe(self, index_name: str, config: dict) -> dict:
+        return {
+            "name": index_name,
+            "host": self.host_for(index_name),
+            "dimension": config["dimension"],
+            "metric": config["metric"],
+            "status": {"ready": True, "state": "Ready"},
+        }
+
+    def _index_config(self, index_name: str) -> dict:
+        config = self._indexes.get(index_name)
+        if config is None:
+            path = os.path.join(self._index_dir(index_name), "index.json")
+            if not os.path.exists(path):
+                raise HTTPException(
+                    status_code=404,
+                    detail=f"Local index {index_name} not found",
+                )
+            with open(path, "r") as f:
+                config = json.load(f)
+            self._indexes[index_name] = config
+        return config
+
+    def _namespace(self, index_name: str, namespace: str) -> LocalNamespace:
+        key = (index_name, namespace)
+        with self._lock:
+            store = self._namespaces.get(key)
+            if store is None:
+                config = self._index_config(index_name)
+                store = LocalNamespace(
+                    os.path.join(
+                        self._index_dir(index_name), _safe_name(namespace)
+                    ),
+                    config["dimension"],
+                    config["metric"],
+                    self.ann_params,
+                    self.codec_params,
+                    self.filter_params,
+                )
+                self._namespaces[key] = store
+        return store
+
+    def _resolve(self, index_host: str, namespace: str):
+        index_name = index_host[len(LOCAL_HOST_SCHEME) :]
+        config = self._index_config(index_name)
+        return config, self._namespace(index_name, namespace)
+
+    def _schedule_ann(self, index_host: str, namespace: str, store):
+        """Start the namespace's graph build unless one is running."""
+        key = (index_host, namespace)
+        task = self._ann_tasks.get(key)
+        if self._ann_stop.is_set() or (task is not None and not task.done()):
+            # a running build picks up the new rows before it finishes
+            return
+        self._ann_tasks[key] = asyncio.create_task(self._run_ann(key, store))
+
+    async def _run_ann(self, key, store: LocalNamespace):
+        try:
+            while not self._ann_stop.is_set() and store.ann_behind():
+                covered = len(store.ann) if store.ann is not None else -1
+                await asyncio.to_thread(store.update_ann, self._ann_stop)
+                if store.ann is None or len(store.ann) == covered:
+                    break
+        except Exception as e:
+            logger.error(f"Error building HNSW graph for {key}: {str(e)}")
+
+    async def close(self):
+        """Stop the background graph builds, keeping their progress."""
+        self._ann_stop.set()
+        tasks = [task for task in self._ann_tasks.values() if not task.done()]
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+        self._ann_tasks = {}
+
+    def stats(self) -> dict:
+        with self._lock:
+            namespaces = dict(self._namespaces)
+        return {
+            f"{index_name}/{namespace}": store.stats()
+            for (index_name, namespace), store in namespaces.items()
+        }
+
+    async def create_index(
+        self, index_name: str, dimension: int, metric: str
+    ) -> dict:
+        if metric not in SUPPORTED_METRICS:
+            raise HTTPException(
+                status_code=400, detail=f"Unsupported metric {metric}"
+            )
+
+        try:
+            config = self._index_config(index_name)
+        except HTTPException:
+            config = {"dimension": dimension, "metric": metric}
+            os.makedirs(self._index_dir(index_name), exist_ok=True)
+            path = os.path.join(self._index_dir(index_name), "index.json")
+            with open(path, "w") as f:
+                json.dump(config, f)
+            self._indexes[index_name] = config
+            logger.info(f"Local index {index_name} created")
+
+        return self._describe(index_name, config)
+
+    async def upsert_vectors(self, index_host, input, namespace):
+        try:
+            _, store = self._resolve(index_host, namespace)
+            upserted = await asyncio.to_thread(store.upsert, input)
+            await asyncio.to_thread(store.update_filter_index)
+            await asyncio.to_thread(store.update_codec)
+            self._schedule_ann(index_host, namespace, store)
+            return {"upsertedCount": upserted}
+        except HTTPException:
+            raise
+        except ValueError as e:
+            logging.error(f"Error upserting local vectors: {str(e)}")
+            raise HTTPException(status_code=400, detail=str(e))
+        except Exception as e:
+            logging.error(f"Error upserting local vectors: {str(e)}")
+            raise HTTPException(status_code=500, detail=str(e))
+
+    async def _search(
+        self,
+        index_host,
+        namespace,
+        top_k_count,
+        vector,
+        include_metadata,
+        filter_dict=None,
+        sparse_query=None,
+        ef_search=None,
+    ):
+        config, store = self._resolve(index_host, namespace)
+        if sparse_query is not None and config["metric"] != "dotproduct":
+            raise HTTPException(
+                status_code=400,
+                detail="Sparse values are only supported for dotproduct",
+            )
+
+        row_mask = None
+        if filter_dict:
+            try:
+                row_mask = await asyncio.to_thread(
+                    store.filter_mask, filter_dict
+                )
+            except FilterError as e:
+                raise HTTPException(status_code=400, detail=str(e))
+
+        try:
+            query = as_float32_matrix([np.asarray(vector, dtype=np.float32)])
+            result = None
+            if sparse_query is None and row_mask is None:
+                result = await asyncio.to_thread(
+                    store.ann_search, query[0], top_k_count, ef_search
+                )
+            if result is None:
+                [result] = await asyncio.to_thread(
+                    store.search,
+                    query,
+                    top_k_count,
+                    self.block_rows,
+                    sparse_query,
+                    row_mask,
+                )
+            rows, scores = result
+            return {
+                "matches": store.matches(rows, scores, include_metadata),
+                "namespace": namespace,
+            }
+        except Exception as e:
+            logging.error(f"Error querying local index: {str(e)}")
+            raise HTTPException(status_code=500, detail=str(e))
+
+    async def query(
+        self,
+        index_host: str,
+        namespace: str,
+        top_k: int,
+        vector: list,
+        include_metadata: bool,
+        filter_dict: dict = None,
+        ef_search: int = None,
+    ):
+        return await self._search(
+            index_host,
+            namespace,
+            top_k,
+            vector,
+            include_metadata,
+            filter_dict,
+            ef_search=ef_search,
+        )
+
+    async def hybrid_query(
+        self,
+        index_host,
+        namespace,
+        top_k,
+        alpha,
+        query_vector_embeds,
+        query_sparse_embeds,
+        include_metadata,
+        filter_dict=None,
+    ):
+        if query_vector_embeds is None or query_sparse_embeds is None:
+            raise HTTPException(
+                status_code=400,
+                detail="Both dense and sparse query embeddings are required",
+            )
+
+        hdense, hsparse = hybrid_scale(
+            query_vector_embeds, query_sparse_embeds, alpha
+        )
+        return await self._search(
+            index_host,
+            namespace,
+            top_k,
+            hdense,
+            include_metadata,
+            filter_dict,
+            sparse_query=hsparse,
+        )
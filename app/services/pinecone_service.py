@@ -1,21 +1,31 @@
 import asyncio
 import json
 import logging
-import time
 from datetime import datetime
 from typing import Any, Dict
 
 import httpx
+import numpy as np
+import orjson
 from fastapi import HTTPException
-from pinecone import Pinecone
 
+from app.config.http_client import HTTPClientHelper
 from app.config.settings import settings
+from app.services.index_lifecycle import IndexLifecycleManager
+from app.utils.batching import plan_sized_batches
+from app.utils.vector_ops import hybrid_scale
 
 logger = logging.getLogger(__name__)
 
 
 class PineconeService:
-    def __init__(self):
+    def __init__(
+        self,
+        http_clients: HTTPClientHelper,
+        index_lifecycle: IndexLifecycleManager,
+    ):
+        self.http_clients = http_clients
+        self.index_lifecycle = index_lifecycle
         self.pinecone_api_key = settings.PINECONE_API_KEY
         self.api_version = settings.PINECONE_API_VERSION
         self.index_url = settings.PINECONE_CREATE_INDEX_URL
@@ -23,8 +33,9 @@ class PineconeService:
         self.upsert_url = settings.PINECONE_UPSERT_URL
         self.query_url = settings.PINECONE_QUERY_URL
         self.list_index_url = settings.PINECONE_LIST_INDEXES_URL
-        self.semaphore = asyncio.Semaphore(10)
-        self.pc = Pinecone(api_key=settings.PINECONE_API_KEY)
+        self.upsert_max_vectors = settings.PINECONE_UPSERT_MAX_VECTORS
+        self.upsert_max_bytes = settings.PINECONE_UPSERT_MAX_BYTES
+        self.upsert_parallelism = settings.PINECONE_UPSERT_PARALLELISM
 
     async def list_pinecone_indexes(self):
         url = self.list_index_url
@@ -35,10 +46,11 @@ class PineconeService:
         }
 
         try:
-            async with httpx.AsyncClient() as client:
-                response = await client.get(url, headers=headers)
-                response.raise_for_status()
-                return response.json()
+            response = await self.http_clients.request(
+                "pinecone", "GET", url, headers=headers
+            )
+            response.raise_for_status()
+            return response.json()
 
         except httpx.HTTPStatusError as e:
             parsed_response = json.loads(response.content.decode("utf-8"))
@@ -54,92 +66,78 @@ class PineconeService:
     async def create_index(
         self, index_name: str, dimension: int, metric: str
     ) -> Dict[str, Any]:
-        if self.pc.has_index(index_name) == False:
-            index_data = {
-                "name": index_name,
-                "dimension": dimension,
-                "metric": metric,
-                "spec": {"serverless": {"cloud": "aws", "region": "us-east-1"}},
-            }
-
-            headers = {
-                "Accept": "application/json",
-                "Content-Type": "application/json",
-                "Api-Key": self.pinecone_api_key,
-                "X-Pinecone-API-Version": self.api_version,
-            }
-
-            try:
-                async with httpx.AsyncClient() as client:
-                    response = await client.post(
-                        self.index_url, headers=headers, json=index_data
-                    )
-                    response.raise_for_status()
-
-                    retry_count = 0
-                    max_retries = 30
-                    while retry_count < max_retries:
-                        status = (
-                            self.pc.describe_index(index_name)
-                            .get("status")
-                            .get("state")
-                        )
-                        logger.info(f"Index status: {status}")
-
-                        if status == "Ready":
-                            logger.info(f"Index {index_name} is ready")
-                            break
-
-                        retry_count += 1
-                        time.sleep(2)
-
-                    if retry_count > max_retries:
-                        raise HTTPException(
-                            status_code=500, detail="Index creation timed out"
-                        )
-
-                    logger.info("Index Created")
-                    return response.json()
-
-            except httpx.HTTPStatusError as e:
-                parsed_response = json.loads(response.content.decode("utf-8"))
-                error_message = parsed_response.get("error", {}).get(
-                    "message", "Unknown error occurred"
-                )
-                logging.error(f"Error creating index: {error_message}")
-                raise HTTPException(status_code=400, detail=error_message)
-            except Exception as e:
-                logging.error(f"Error creating index: {str(e)}")
-                raise HTTPException(status_code=500, detail=str(e))
-
-        else:
-            logger.info("index already created")
-            return {"host": self.pc.describe_index(index_name).get("host")}
+        return await self.index_lifecycle.ensure_index(
+            index_name, dimension, metric
+        )
 
     async def upsert_format(
-        self, chunks: list, vector_embeddings: list, sparse_embeddings: list
+        self,
+        chunks: list,
+        vector_embeddings: np.ndarray,
+        sparse_embeddings: list,
     ):
+        """
+        Build upsert records. ``values`` are row views of the float32
+        embedding matrix; they are only turned into JSON on the wire. With
+        LEAN_VECTOR_METADATA the chunk text is left out of the metadata and
+        queries hydrate it from raw_data.
+        """
+        created_at = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
         results = []
         for i in range(len(chunks)):
             result = {
                 "id": chunks[i]["_id"],
                 "values": vector_embeddings[i],
                 "metadata": {
-                    "text": chunks[i]["text"],
                     "link": chunks[i]["link"],
                     "keyword": chunks[i]["keyword"],
-                    "created_at": datetime.now().strftime("%Y-%m-%d %H:%M:%S"),
+                    "created_at": created_at,
                 },
                 "sparse_values": {
                     "indices": sparse_embeddings[i]["indices"],
                     "values": sparse_embeddings[i]["values"],
                 },
             }
+            if not settings.LEAN_VECTOR_METADATA:
+                result["metadata"]["text"] = chunks[i]["text"]
             results.append(result)
         return results
 
-    async def upsert_vectors(self, index_host, input, namespace):
+    def _upsert_batches(self, input, namespace):
+        """
+        Serialize each record once and pack the encoded records into request
+        bodies bounded by vector count and bytes.
+        """
+        records = [
+            orjson.dumps(record, option=orjson.OPT_SERIALIZE_NUMPY)
+            for record in input
+        ]
+        prefix = b'{"vectors":['
+        suffix = b'],"namespace":' + orjson.dumps(namespace) + b"}"
+        batches = plan_sized_batches(
+            [len(record) + 1 for record in records],
+            self.upsert_max_vectors,
+            self.upsert_max_bytes - len(prefix) - len(suffix),
+        )
+        return [
+            (len(batch), prefix + b",".join(records[i] for i in batch) + suffix)
+            for batch in batches
+        ]
+
+    async def _upsert_batch(self, url, headers, body, semaphore):
+        async with semaphore:
+            response = await self.http_clients.request(
+                "pinecone", "POST", url=url, headers=headers, content=body
+            )
+        response.raise_for_status()
+        return response.json()
 
+    async def upsert_vectors(self, index_host, input, namespace):
+        """
+        Upsert ``input`` in size-bounded batches sent concurrently. Each
+        batch is retried by the HTTP client's retry policy only; batches
+        still failing after it are reported individually.
+        """
         headers = {
             "Api-Key": self.pinecone_api_key,
             "Content-Type": "application/json",
@@ -148,37 +146,74 @@ class PineconeService:
 
         url = self.upsert_url.format(index_host)
 
-        payload = {"vectors": input, "namespace": namespace}
         try:
-            async with httpx.AsyncClient() as client:
-                response = await client.post(
-                    url=url, headers=headers, json=payload
+            batches = self._upsert_batches(input, namespace)
+        except Exception as e:
+            logging.error(f"Error serializing upsert batches: {str(e)}")
+            raise HTTPException(status_code=500, detail=str(e))
+
+        semaphore = asyncio.Semaphore(self.upsert_parallelism)
+        batch_results = [
+            {
+                "batch": i,
+                "vector_count": count,
+                "bytes": len(body),
+                "upserted_count": 0,
+                "error": None,
+            }
+            for i, (count, body) in enumerate(batches)
+        ]
+
+        responses = await asyncio.gather(
+            *(
+                self._upsert_batch(url, headers, body, semaphore)
+                for _, body in batches
+            ),
+            return_exceptions=True,
+        )
+        for result, response in zip(batch_results, responses):
+            if isinstance(response, Exception):
+                result["error"] = self._upsert_error_message(response)
+            else:
+                result["upserted_count"] = response.get(
+                    "upsertedCount", result["vector_count"]
                 )
-                response.raise_for_status()
-                return response.json()
-        except httpx.HTTPError as e:
-            parsed_response = json.loads(response.content.decode("utf-8"))
-            error_message = parsed_response.get("error", {}).get(
-                "message", "Unknown error occurred"
+
+        failed = [result for result in batch_results if result["error"]]
+        if failed:
+            logging.error(
+                f"{len(failed)} of {len(batches)} upsert batches failed: "
+                f"{failed[0]['error']}"
+            )
+            raise HTTPException(
+                status_code=502,
+                detail=(
+                    f"{len(failed)} of {len(batches)} upsert batches failed: "
+                    f"{failed[0]['error']}"
+                ),
             )
-            logging.error(f"Error creating index: {error_message}")
-            raise HTTPException(status_code=400, detail=error_message)
 
-        except Exception as e:
-            logging.error(f"Error creating index: {str(e)}")
-            raise HTTPException(status_code=500, detail=str(e))
+        return {
+            "upsertedCount": sum(r["upserted_count"] for r in batch_results),
+            "batches": batch_results,
+        }
 
-    def hybrid_scale(self, dense, sparse, alpha: float):
+    @staticmethod
+    def _upsert_error_message(error: Exception) -> str:
+        if isinstance(error, httpx.HTTPStatusError):
+            try:
+                return (
+                    json.loads(error.response.content.decode("utf-8"))
+                    .get("error", {})
+                    .get("message", "Unknown error occurred")
+                )
+            except (ValueError, AttributeError):
+                return error.response.text or str(error)
+        return str(error) or type(error).__name__
 
-        if alpha < 0 or alpha > 1:
-            raise ValueError("Alpha must be between 0 and 1")
+    def hybrid_scale(self, dense, sparse, alpha: float):
         # scale sparse and dense vectors to create hybrid search vecs
-        hsparse = {
-            "indices": sparse["indices"],
-            "values": [v * (1 - alpha) for v in sparse["values"]],
-        }
-        hdense = [v * alpha for v in dense]
-        return hdense, hsparse
+        return hybrid_scale(dense, sparse, alpha)
 
     async def pinecone_hybrid_query(
         self,
@@ -193,7 +228,10 @@ class PineconeService:
     ):
 
         if query_vector_embeds is None or query_sparse_embeds is None:
-            time.sleep(2)
+            raise HTTPException(
+                status_code=400,
+                detail="Both dense and sparse query embeddings are required",
+            )
 
         headers = {
             "Api-Key": self.pinecone_api_key,
@@ -227,10 +265,11 @@ class PineconeService:
 
         url = self.query_url.format(index_host)
         try:
-            async with httpx.AsyncClient() as client:
-                response = await client.post(url, headers=headers, json=payload)
-                response.raise_for_status()
-                return response.json()
+            response = await self.http_clients.request(
+                "pinecone", "POST", url, headers=headers, json=payload
+            )
+            response.raise_for_status()
+            return response.json()
 
         except httpx.HTTPError as e:
             parsed_response = json.loads(response.content.decode("utf-8"))
@@ -275,10 +314,11 @@ class PineconeService:
         url = self.query_url.format(index_host)
 
         try:
-            async with httpx.AsyncClient() as client:
-                response = await client.post(url, headers=headers, json=payload)
-                response.raise_for_status()
-                return response.json()
+            response = await self.http_clients.request(
+                "pinecone", "POST", url, headers=headers, json=payload
+            )
+            response.raise_for_status()
+            return response.json()
 
         except httpx.HTTPError as e:
             parsed_response = json.loads(response.content.decode("utf-8"))
@@ -0,0 +1,67 @@
+import hashlib
+from typing import Any, Dict, Hashable, Optional
+
+import orjson
+
+from app.utils.cache import TTLCache
+
+
+class QueryResultCache:
+    """
+    LRU + TTL cache of complete ``/query`` responses.
+
+    Keys hold the index, namespace, query text, top_k, alpha, search mode
+    and a hash of ``filter_dict``, plus the namespace's generation.
+    Upserting a namespace bumps its generation and drops its entries, so a
+    request that was already in flight during the upsert stores its
+    result under the old generation, where it is never read. ``clear``
+    does the same for every namespace, for when ground truth changes.
+    """
+
+    def __init__(self, max_items: int, ttl_seconds: float):
+        self._cache = TTLCache(max_items=max_items, ttl_seconds=ttl_seconds)
+        self._generations: Dict[str, int] = {}
+        self._epoch = 0
+        self.invalidations = 0
+
+    @staticmethod
+    def filter_digest(filter_dict: Optional[dict]) -> Optional[str]:
+        if not filter_dict:
+            return None
+        encoded = orjson.dumps(filter_dict, option=orjson.OPT_SORT_KEYS)
+        return hashlib.sha1(encoded).hexdigest()
+
+    def key(self, index_name: str, namespace: str, request_data) -> Hashable:
+        return (
+            index_name,
+            namespace,
+            self._epoch,
+            self._generations.get(namespace, 0),
+            request_data.query,
+            request_data.top_k,
+            request_data.alpha,
+            request_data.is_hybrid,
+            request_data.is_lexical,
+            request_data.include_metadata,
+            request_data.ef_search,
+            self.filter_digest(request_data.filter_dict),
+        )
+
+    def get(self, key: Hashable) -> Optional[Any]:
+        return self._cache.get(key)
+
+    def put(self, key: Hashable, value: Any):
+        self._cache.put(key, value)
+
+    def invalidate_namespace(self, namespace: str) -> int:
+        self._generations[namespace] = self._generations.get(namespace, 0) + 1
+        self.invalidations += 1
+        return self._cache.pop_where(lambda key: key[1] == namespace)
+
+    def clear(self):
+        self._epoch += 1
+        self._cache.clear()
+        self.invalidations += 1
+
+    def stats(self) -> Dict:
+        return {**self._cache.stats(), "invalidations": self.invalidations}
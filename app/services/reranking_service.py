@@ -4,13 +4,15 @@ import logging
 import httpx
 from fastapi import HTTPException
 
+from app.config.http_client import HTTPClientHelper
 from app.config.settings import settings
 
 logger = logging.getLogger(__name__)
 
 
 class RerankerService:
-    def __init__(self):
+    def __init__(self, http_clients: HTTPClientHelper):
+        self.http_clients = http_clients
         self.pinecone_api_key = settings.PINECONE_API_KEY
         self.cohere_api_key = settings.COHERE_API_KEY
         self.jina_api_key = settings.JINA_API_KEY
@@ -45,11 +47,12 @@ class RerankerService:
         url = self.pinecone_rerank_url
 
         try:
-            async with httpx.AsyncClient() as client:
-                response = await client.post(url, headers=headers, json=payload)
-                response.raise_for_status()
-                print("reranking done")
-                return response.json()
+            response = await self.http_clients.request(
+                "pinecone", "POST", url, headers=headers, json=payload
+            )
+            response.raise_for_status()
+            print("reranking done")
+            return response.json()
 
         except httpx.HTTPStatusError as e:
             parsed_response = json.loads(response.content.decode("utf-8"))
@@ -82,15 +85,16 @@ class RerankerService:
         }
 
         try:
-            async with httpx.AsyncClient(verify=False) as client:
-                response = await client.post(
-                    rerank_url,
-                    headers=headers,
-                    json=payload,
-                )
-                response.raise_for_status()
-                print("reranking done by cohere")
-                return response.json()
+            response = await self.http_clients.request(
+                "cohere",
+                "POST",
+                rerank_url,
+                headers=headers,
+                json=payload,
+            )
+            response.raise_for_status()
+            print("reranking done by cohere")
+            return response.json()
         except httpx.HTTPStatusError as e:
             logging.error(f"HTTP error: {e.response.status_code} - {str(e)}")
             raise HTTPException(
@@ -124,13 +128,12 @@ class RerankerService:
         rerank_url = f"{self.jina_base_url}/{self.RERANK_SUFFIX}"
 
         try:
-            async with httpx.AsyncClient(verify=False) as client:
-                response = await client.post(
-                    rerank_url, headers=headers, json=payload
-                )
-                response.raise_for_status()
-                print("reranking done by jina")
-                return response.json()
+            response = await self.http_clients.request(
+                "jina", "POST", rerank_url, headers=headers, json=payload
+            )
+            response.raise_for_status()
+            print("reranking done by jina")
+            return response.json()
         except httpx.HTTPStatusError as e:
             logging.error(f"HTTP error: {e.response.status_code} - {str(e)}")
             raise HTTPException(
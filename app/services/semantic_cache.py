@@ -0,0 +1,147 @@
+import time
+from typing import Any, Dict, Hashable, List, Optional, Tuple
+
+import numpy as np
+
+from app.services.query_result_cache import QueryResultCache
+from app.utils.cache import LRUCache
+
+
+class _SemanticGroup:
+    """Ring buffer of unit-norm query embeddings and their results."""
+
+    def __init__(self, dimension: int, capacity: int):
+        self.vectors = np.zeros((capacity, dimension), dtype=np.float32)
+        self.values: List[Any] = [None] * capacity
+        self.expires_at = np.zeros(capacity, dtype=np.float64)
+        self.count = 0
+        self.next_slot = 0
+
+    def lookup(self, unit: np.ndarray, now: float) -> Tuple[int, float]:
+        if not self.count:
+            return -1, -1.0
+        similarities = self.vectors[: self.count] @ unit
+        similarities[self.expires_at[: self.count] <= now] = -np.inf
+        best = int(np.argmax(similarities))
+        return best, float(similarities[best])
+
+    def add(self, unit: np.ndarray, value: Any, expires_at: float):
+        slot = self.next_slot
+        self.vectors[slot] = unit
+        self.values[slot] = value
+        self.expires_at[slot] = expires_at
+        self.next_slot = (slot + 1) % len(self.values)
+        self.count = min(self.count + 1, len(self.values))
+
+
+class SemanticQueryCache:
+    """
+    Vector store results keyed by query embedding rather than query text.
+
+    Results are grouped by index, namespace and the search parameters that
+    change them (top_k, alpha, search mode, filter). Within a group the
+    most similar earlier query embedding is found with one matrix-vector
+    product over at most ``max_entries_per_group`` unit vectors, and its
+    results are reused when the cosine similarity reaches ``threshold``.
+    Groups are kept in an LRU of ``max_groups``. Upserting a namespace
+    drops its groups and bumps its generation, which is part of the group
+    key, so searches in flight during the upsert cannot repopulate them.
+
+    The best similarity of every lookup is recorded in a histogram, which
+    shows how far the threshold is from the traffic it sees.
+    """
+
+    HISTOGRAM_BINS = np.linspace(0.0, 1.0, 21)
+
+    def __init__(
+        self,
+        threshold: float,
+        max_entries_per_group: int,
+        max_groups: int,
+        ttl_seconds: float,
+    ):
+        self.threshold = threshold
+        self.max_entries_per_group = max_entries_per_group
+        self.ttl_seconds = ttl_seconds
+        self._groups = LRUCache(max_groups)
+        self._generations: Dict[str, int] = {}
+        self.lookups = 0
+        self.hits = 0
+        self.histogram = np.zeros(len(self.HISTOGRAM_BINS) - 1, np.int64)
+
+    def group_key(
+        self, index_name: str, namespace: str, request_data
+    ) -> Hashable:
+        return (
+            index_name,
+            namespace,
+            self._generations.get(namespace, 0),
+            request_data.top_k,
+            request_data.alpha,
+            request_data.is_hybrid,
+            request_data.include_metadata,
+            request_data.ef_search,
+            QueryResultCache.filter_digest(request_data.filter_dict),
+        )
+
+    @staticmethod
+    def _unit(embedding) -> Optional[np.ndarray]:
+        vector = np.asarray(embedding, dtype=np.float32).ravel()
+        norm = float(np.linalg.norm(vector))
+        return vector / norm if norm > 0 else None
+
+    def lookup(self, group_key: Hashable, embedding) -> Optional[Tuple]:
+        """(results, similarity) of the closest cached query, or None."""
+        self.lookups += 1
+        unit = self._unit(embedding)
+        group = self._groups.get(group_key)
+        if unit is None or group is None:
+            return None
+        if group.vectors.shape[1] != len(unit):
+            return None
+
+        best, similarity = group.lookup(unit, time.monotonic())
+        if best < 0 or not np.isfinite(similarity):
+            return None
+        bin_index = np.searchsorted(
+            self.HISTOGRAM_BINS, np.clip(similarity, 0.0, 1.0), side="right"
+        )
+        self.histogram[min(max(bin_index - 1, 0), len(self.histogram) - 1)] += 1
+
+        if similarity < self.threshold:
+            return None
+        self.hits += 1
+        return group.values[best], similarity
+
+    def add(self, group_key: Hashable, embedding, results: Any):
+        unit = self._unit(embedding)
+        if unit is None:
+            return
+        group = self._groups.get(group_key)
+        if group is None or group.vectors.shape[1] != len(unit):
+            group = _SemanticGroup(len(unit), self.max_entries_per_group)
+            self._groups.put(group_key, group)
+        group.add(unit, results, time.monotonic() + self.ttl_seconds)
+
+    def invalidate_namespace(self, namespace: str) -> int:
+        self._generations[namespace] = self._generations.get(namespace, 0) + 1
+        return self._groups.pop_where(lambda key: key[1] == namespace)
+
+    def stats(self) -> Dict:
+        return {
+            "threshold": self.threshold,
+            "groups": len(self._groups),
+            "lookups": self.lookups,
+            "hits": self.hits,
+            "hit_rate": (
+                round(self.hits / self.lookups, 4) if self.lookups else 0.0
+            ),
+            "similarity_histogram": {
+                f"{low:.2f}-{high:.2f}": int(count)
+                for low, high, count in zip(
+                    self.HISTOGRAM_BINS[:-1],
+                    self.HISTOGRAM_BINS[1:],
+                    self.histogram,
+                )
+            },
+        }
@@ -0,0 +1,322 @@
+import asyncio
+import hashlib
+import json
+import logging
+import os
+import re
+from concurrent.futures import Executor
+from typing import Dict, List, Optional, Tuple
+
+import numpy as np
+import orjson
+from pinecone_text.sparse import BM25Encoder
+
+from app.utils.cache import LRUCache
+from app.utils.sparse_pruning import prune_sparse_vectors
+
+logger = logging.getLogger(__name__)
+
+TermFrequencies = Tuple[np.ndarray, np.ndarray]
+
+_worker_encoder: Optional[BM25Encoder] = None
+
+
+def term_frequencies(texts: List[str]) -> List[TermFrequencies]:
+    """
+    Tokenize and hash a shard of texts into (term hashes, counts) pairs.
+
+    Runs inside the sparse encoding process pool, so each worker builds its
+    own tokenizer once and reuses it for every shard it is handed.
+    """
+    global _worker_encoder
+    if _worker_encoder is None:
+        _worker_encoder = BM25Encoder()
+
+    results = []
+    for text in texts:
+        indices, counts = _worker_encoder._tf(text)
+        results.append(
+            (
+                np.asarray(indices, dtype=np.uint32),
+                np.asarray(counts, dtype=np.float32),
+            )
+        )
+    return results
+
+
+class SparseEncoderManager:
+    """
+    Owns the BM25 encoders used for sparse vectors.
+
+    The generic MS MARCO encoder is only downloaded the first time it is
+    needed. Each upserted (index, namespace) gets its own encoder fitted on
+    its corpus, since the same file and model can be upserted into several
+    indexes. Its parameters are persisted as a compressed ``.npz`` (uint32
+    term hashes and float32 document frequencies), so query-time encoding
+    uses the same statistics as the documents it is searching. Fitting does
+    not persist anything; the caller saves the encoder once the vectors it
+    encoded have been upserted.
+
+    Tokenization of large corpora is sharded across ``executor`` (a process
+    pool owned by the service container) and the resulting term
+    frequencies are cached by chunk content hash, so fitting and encoding a
+    corpus tokenizes each distinct chunk once.
+
+    Sparse vectors can be pruned to their ``prune_top_n`` largest terms
+    and/or to ``prune_mass`` of their magnitude. The rule in force when a
+    namespace is upserted into an index is recorded next to its parameters
+    once the upsert succeeds and applied to its documents and queries from
+    then on, so changing the settings only affects namespaces upserted
+    afterwards.
+    """
+
+    def __init__(
+        self,
+        params_dir: str,
+        max_loaded: int,
+        executor: Optional[Executor] = None,
+        shard_size: int = 256,
+        token_cache_size: int = 100000,
+        prune_top_n: int = 0,
+        prune_mass: float = 0.0,
+    ):
+        self.params_dir = params_dir
+        self.prune_top_n = prune_top_n
+        self.prune_mass = prune_mass
+        self.executor = executor
+        self.shard_size = max(1, shard_size)
+        self._default: Optional[BM25Encoder] = None
+        self._tokenizer: Optional[BM25Encoder] = None
+        self._encoders = LRUCache(max_loaded)
+        self._pruning = LRUCache(max_loaded)
+        self._term_frequencies = LRUCache(token_cache_size)
+        self.shards_dispatched = 0
+
+    def _params_path(self, index_name: str, namespace: str) -> str:
+        safe_index = re.sub(r"[^A-Za-z0-9._-]", "_", index_name)
+        safe_name = re.sub(r"[^A-Za-z0-9._-]", "_", namespace)
+        return os.path.join(self.params_dir, safe_index, f"{safe_name}.npz")
+
+    def _pruning_path(self, index_name: str, namespace: str) -> str:
+        safe_index = re.sub(r"[^A-Za-z0-9._-]", "_", index_name)
+        safe_name = re.sub(r"[^A-Za-z0-9._-]", "_", namespace)
+        return os.path.join(
+            self.params_dir, safe_index, f"{safe_name}.pruning.json"
+        )
+
+    def pruning_rule(self) -> Dict:
+        """The pruning rule of the current settings."""
+        return {"top_n": self.prune_top_n, "mass": self.prune_mass}
+
+    def pruning_for(
+        self, index_name: Optional[str], namespace: Optional[str]
+    ) -> Dict:
+        """The pruning rule (and report) recorded for the index's namespace."""
+        if not index_name or not namespace:
+            return {}
+        key = (index_name, namespace)
+        pruning = self._pruning.get(key)
+        if pruning is None:
+            path = self._pruning_path(index_name, namespace)
+            pruning = {}
+            if os.path.exists(path):
+                with open(path, "rb") as f:
+                    pruning = orjson.loads(f.read())
+            self._pruning.put(key, pruning)
+        return pruning
+
+    def record_pruning(self, index_name: str, namespace: str, pruning: Dict):
+        """Persist ``pruning`` as the rule of the index's namespace."""
+        path = self._pruning_path(index_name, namespace)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        tmp_path = f"{path}.tmp"
+        with open(tmp_path, "wb") as f:
+            f.write(orjson.dumps(pruning))
+        os.replace(tmp_path, path)
+        self._pruning.put((index_name, namespace), pruning)
+
+    @staticmethod
+    def prune(vectors: List[dict], pruning: Dict):
+        return prune_sparse_vectors(
+            vectors, pruning.get("top_n", 0), pruning.get("mass", 0.0)
+        )
+
+    def default_encoder(self) -> BM25Encoder:
+        if self._default is None:
+            logger.info("Loading default BM25 encoder")
+            self._default = BM25Encoder.default()
+        return self._default
+
+    def fit(self, corpus: List[str]) -> BM25Encoder:
+        """An encoder fitted on ``corpus``, not saved yet."""
+        return BM25Encoder().fit(corpus)
+
+    async def term_frequencies(self, texts: List[str]) -> List[TermFrequencies]:
+        """Term frequencies for ``texts`` in order, tokenizing only misses."""
+        digests = [
+            hashlib.sha256(text.encode("utf-8")).hexdigest() for text in texts
+        ]
+        results: Dict[str, TermFrequencies] = {}
+        missing: Dict[str, str] = {}
+        for digest, text in zip(digests, texts):
+            if digest in results or digest in missing:
+                continue
+            cached = self._term_frequencies.get(digest)
+            if cached is None:
+                missing[digest] = text
+            else:
+                results[digest] = cached
+
+        if missing:
+            missing_digests = list(missing)
+            shards = [
+                missing_digests[i : i + self.shard_size]
+                for i in range(0, len(missing_digests), self.shard_size)
+            ]
+            loop = asyncio.get_running_loop()
+            shard_results = await asyncio.gather(
+                *(
+                    loop.run_in_executor(
+                        self.executor,
+                        term_frequencies,
+                        [missing[digest] for digest in shard],
+                    )
+                    for shard in shards
+                )
+            )
+            self.shards_dispatched += len(shards)
+            for shard, shard_result in zip(shards, shard_results):
+                for digest, tf in zip(shard, shard_result):
+                    results[digest] = tf
+                    self._term_frequencies.put(digest, tf)
+
+        return [results[digest] for digest in digests]
+
+    def query_terms(self, text: str) -> TermFrequencies:
+        """(term hashes, counts) for a query, tokenized in-process."""
+        if self._tokenizer is None:
+            self._tokenizer = BM25Encoder()
+        indices, counts = self._tokenizer._tf(text)
+        return (
+            np.asarray(indices, dtype=np.uint32),
+            np.asarray(counts, dtype=np.float32),
+        )
+
+    async def fit_and_encode_documents(
+        self, corpus: List[str]
+    ) -> Tuple[BM25Encoder, List[dict]]:
+        """
+        Fit an encoder on ``corpus`` and encode the corpus with it, reusing
+        one tokenization pass for both. Returns the encoder, unsaved, and
+        the unpruned document vectors.
+        """
+        tfs = await self.term_frequencies(corpus)
+        non_empty = [tf for tf in tfs if len(tf[0])]
+        if not non_empty:
+            raise ValueError("Cannot fit BM25 on a corpus without any tokens")
+
+        term_hashes, doc_freq = np.unique(
+            np.concatenate([indices for indices, _ in non_empty]),
+            return_counts=True,
+        )
+        doc_lengths = np.array([counts.sum() for _, counts in tfs])
+
+        encoder = BM25Encoder()
+        encoder.doc_freq = dict(
+            zip(term_hashes.tolist(), doc_freq.astype(float).tolist())
+        )
+        encoder.n_docs = len(non_empty)
+        encoder.avgdl = float(doc_lengths.sum()) / len(non_empty)
+
+        norms = encoder.k1 * (
+            1.0 - encoder.b + encoder.b * (doc_lengths / encoder.avgdl)
+        )
+        return encoder, [
+            {
+                "indices": indices.tolist(),
+                "values": (counts / (norm + counts)).tolist(),
+            }
+            for (indices, counts), norm in zip(tfs, norms)
+        ]
+
+    def save(self, index_name: str, namespace: str, encoder: BM25Encoder):
+        """Persist ``encoder`` as the one for the index's namespace."""
+        params = encoder.get_params()
+        doc_freq = params.pop("doc_freq")
+        path = self._params_path(index_name, namespace)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        # np.savez_compressed appends .npz to names without it
+        tmp_path = f"{path}.tmp.npz"
+        np.savez_compressed(
+            tmp_path,
+            indices=np.asarray(doc_freq["indices"], dtype=np.uint32),
+            values=np.asarray(doc_freq["values"], dtype=np.float32),
+            params=np.asarray(json.dumps(params)),
+        )
+        os.replace(tmp_path, path)
+        self._encoders.put((index_name, namespace), encoder)
+
+    def load(self, index_name: str, namespace: str) -> Optional[BM25Encoder]:
+        path = self._params_path(index_name, namespace)
+        if not os.path.exists(path):
+            return None
+
+        with np.load(path) as data:
+            params = json.loads(str(data["params"]))
+            params["doc_freq"] = {
+                "indices": data["indices"].tolist(),
+                "values": data["values"].tolist(),
+            }
+        return BM25Encoder().set_params(**params)
+
+    def encoder_for(
+        self, index_name: Optional[str] = None, namespace: Optional[str] = None
+    ) -> BM25Encoder:
+        """
+        The fitted encoder of the index's namespace, falling back to the
+        default one.
+        """
+        if index_name and namespace:
+            key = (index_name, namespace)
+            encoder = self._encoders.get(key)
+            if encoder is None:
+                encoder = self.load(index_name, namespace)
+                if encoder is not None:
+                    self._encoders.put(key, encoder)
+            if encoder is not None:
+                return encoder
+        return self.default_encoder()
+
+    def encode_documents(
+        self, texts: List[str], index_name: str = None, namespace: str = None
+    ):
+        return self.prune(
+            self.encoder_for(index_name, namespace).encode_documents(texts),
+            self.pruning_for(index_name, namespace),
+        )
+
+    def encode_queries(
+        self, texts: List[str], index_name: str = None, namespace: str = None
+    ):
+        return self.prune(
+            self.encoder_for(index_name, namespace).encode_queries(texts),
+            self.pruning_for(index_name, namespace),
+        )
+
+    def stats(self) -> Dict:
+        return {
+            "loaded_encoders": len(self._encoders),
+            "shards_dispatched": self.shards_dispatched,
+            "token_cache": self._term_frequencies.stats(),
+            "pruning": {
+                "top_n": self.prune_top_n,
+                "mass": self.prune_mass,
+                "namespaces": {
+                    f"{index_name}/{namespace}": pruning
+                    for (
+                        index_name,
+                        namespace,
+                    ), pruning in self._pruning.items()
+                },
+            },
+        }
@@ -0,0 +1,116 @@
+from typing import Any, Dict, List
+
+from app.services.local_vector_store import LocalVectorStore
+from app.services.pinecone_service import PineconeService
+
+
+class VectorStoreRouter:
+    """
+    Single upsert/query surface over Pinecone and the local vector store.
+
+    Indexes listed in ``local_indexes`` (or every index, with ``"*"``) are
+    created locally and recorded with a ``local://`` host. Every other call
+    is routed by the host it is given, so callers never need to know which
+    backend an index lives in.
+    """
+
+    def __init__(
+        self,
+        pinecone_service: PineconeService,
+        local_store: LocalVectorStore,
+        local_indexes: List[str],
+    ):
+        self.pinecone_service = pinecone_service
+        self.local_store = local_store
+        self.local_indexes = set(local_indexes)
+
+    def is_local_index(self, index_name: str) -> bool:
+        return "*" in self.local_indexes or index_name in self.local_indexes
+
+    async def create_index(
+        self, index_name: str, dimension: int, metric: str
+    ) -> Dict[str, Any]:
+        if self.is_local_index(index_name):
+            return await self.local_store.create_index(
+                index_name, dimension, metric
+            )
+        return await self.pinecone_service.create_index(
+            index_name, dimension, metric
+        )
+
+    async def upsert_format(self, chunks, vector_embeddings, sparse_embeddings):
+        return await self.pinecone_service.upsert_format(
+            chunks, vector_embeddings, sparse_embeddings
+        )
+
+    async def upsert_vectors(self, index_host, input, namespace):
+        if self.local_store.is_local_host(index_host):
+            return await self.local_store.upsert_vectors(
+                index_host, input, namespace
+            )
+        return await self.pinecone_service.upsert_vectors(
+            index_host, input, namespace
+        )
+
+    async def query(
+        self,
+        index_host: str,
+        namespace: str,
+        top_k: int,
+        vector: list,
+        include_metadata: bool,
+        filter_dict: dict = None,
+        ef_search: int = None,
+    ):
+        """Dense query; ``ef_search`` only applies to local HNSW graphs."""
+        if self.local_store.is_local_host(index_host):
+            return await self.local_store.query(
+                index_host,
+                namespace,
+                top_k,
+                vector,
+                include_metadata,
+                filter_dict,
+                ef_search,
+            )
+        return await self.pinecone_service.pinecone_query(
+            index_host=index_host,
+            namespace=namespace,
+            top_k=top_k,
+            vector=vector,
+            include_metadata=include_metadata,
+            filter_dict=filter_dict,
+        )
+
+    async def hybrid_query(
+        self,
+        index_host,
+        namespace,
+        top_k,
+        alpha,
+        query_vector_embeds,
+        query_sparse_embeds,
+        include_metadata,
+        filter_dict=None,
+    ):
+        if self.local_store.is_local_host(index_host):
+            return await self.local_store.hybrid_query(
+                index_host,
+                namespace,
+                top_k,
+                alpha,
+                query_vector_embeds,
+                query_sparse_embeds,
+                include_metadata,
+                filter_dict,
+            )
+        return await self.pinecone_service.pinecone_hybrid_query(
+            index_host=index_host,
+            namespace=namespace,
+            top_k=top_k,
+            alpha=alpha,
+            query_vector_embeds=query_vector_embeds,
+            query_sparse_embeds=query_sparse_embeds,
+            include_metadata=include_metadata,
+            filter_dict=filter_dict,
+        )
@@ -5,18 +5,26 @@ import random
 from uuid import uuid4
 
 import aiofiles
+from fastapi import Depends
 
+from app.config.container import get_llm_utils, get_query_result_cache
 from app.config.settings import settings
 from app.repositories.gt_data_repo import GTDataRepo
 from app.repositories.raw_data_repo import RawDataRepo
+from app.services.query_result_cache import QueryResultCache
 from app.utils.llm_utils import LLMUtils
 
 
 class FileUploadUseCase:
-    def __init__(self):
+    def __init__(
+        self,
+        llm_utils: LLMUtils = Depends(get_llm_utils),
+        query_result_cache: QueryResultCache = Depends(get_query_result_cache),
+    ):
         self.raw_data_repo = RawDataRepo()
         self.gt_data_repo = GTDataRepo()
-        self.llm_utils = LLMUtils()
+        self.llm_utils = llm_utils
+        self.query_result_cache = query_result_cache
 
     async def store_file_locally(self, file):
         os.makedirs(settings.UPLOAD_DIR, exist_ok=True)
@@ -138,6 +146,8 @@ class FileUploadUseCase:
 
             await self.gt_data_repo.clear_collection()
             await self.gt_data_repo.insert_documents(mongo_dataset)
+            if self.query_result_cache is not None:
+                self.query_result_cache.clear()
 
             dataset_path = os.path.join(settings.UPLOAD_DIR, "rag_dataset.json")
             async with aiofiles.open(dataset_path, "w") as f:
@@ -4,10 +4,23 @@ import logging
 
 from fastapi import Depends, HTTPException
 
+from app.config.container import (
+    get_embedding_concurrency_limiters,
+    get_embedding_service,
+    get_lexical_indexes,
+    get_query_result_cache,
+    get_semantic_cache,
+    get_sparse_encoders,
+    get_vector_store,
+)
+from app.config.settings import settings
 from app.models.domain.indexupsert import IndexUpsert, Namespace
+from app.repositories.gt_data_repo import GTDataRepo
 from app.repositories.index_upsert_repository import IndexUpsertRepository
 from app.services.embedding_service import EmbeddingService
-from app.services.pinecone_service import PineconeService
+from app.utils.batching import plan_batches
+from app.utils.sparse_pruning import sparse_payload_stats, sparse_recall_at_k
+from app.utils.vector_ops import concat_rows
 
 logger = logging.getLogger(__name__)
 
@@ -16,15 +29,30 @@ class IndexUpsertUseCase:
     def __init__(
         self,
         index_upsert_repository=Depends(IndexUpsertRepository),
-        pinecone_service=Depends(PineconeService),
-        embedding_service=Depends(EmbeddingService),
+        vector_store=Depends(get_vector_store),
+        embedding_service=Depends(get_embedding_service),
+        concurrency_limiters=Depends(get_embedding_concurrency_limiters),
+        lexical_indexes=Depends(get_lexical_indexes),
+        query_result_cache=Depends(get_query_result_cache),
+        semantic_cache=Depends(get_semantic_cache),
+        sparse_encoders=Depends(get_sparse_encoders),
+        gt_data_repo=Depends(GTDataRepo),
     ):
         self.index_upsert_repository = index_upsert_repository
-        self.pinecone_service = pinecone_service
+        self.vector_store = vector_store
         self.embedding_service = embedding_service
+        self.concurrency_limiters = concurrency_limiters
+        self.lexical_indexes = lexical_indexes
+        self.query_result_cache = query_result_cache
+        self.semantic_cache = semantic_cache
+        self.sparse_encoders = sparse_encoders
+        self.gt_data_repo = gt_data_repo
         self.file_path = "uploads/raw_dataset.json"
-        self.chunk_size = 90
-        self.semaphore = asyncio.Semaphore(5)
+        self.document_input_types = {
+            "pinecone": "passage",
+            "cohere": "search_document",
+            "jina": None,
+        }
         self.model_provider = {
             "llama-text-embed-v2": "pinecone",
             "multilingual-e5-large": "pinecone",
@@ -39,85 +67,191 @@ class IndexUpsertUseCase:
             "jina-embeddings-v2-base-code": "jina",
         }
 
-    async def process_chunk(self, chunk, provider, embed_model, dimension=None):
-        async with self.semaphore:
-            try:
-                if provider == "pinecone":
-                    return (
-                        await self.embedding_service.pinecone_dense_embeddings(
-                            chunk, embed_model, dimension=dimension
-                        )
-                    )
-                elif provider == "cohere":
-                    return await self.embedding_service.cohere_dense_embeddings(
-                        embed_model, chunk
-                    )
-                elif provider == "jina":
-                    return await self.embedding_service.jina_embeddings(
-                        embed_model, dimension, chunk
-                    )
-            except Exception as e:
-                logger.error(
-                    f"Error processing chunk with {provider} provider: {str(e)}"
+    async def process_chunk(self, texts, provider, embed_model, dimension=None):
+        try:
+            limiter = self.concurrency_limiters[provider]
+            async with limiter.slot():
+                return await self.embedding_service.embed_texts(
+                    provider,
+                    embed_model,
+                    texts,
+                    input_type=self.document_input_types[provider],
+                    dimension=None if provider == "cohere" else dimension,
+                    limiter=limiter,
                 )
-                raise HTTPException(status_code=500, detail=str(e))
+        except Exception as e:
+            logger.error(
+                f"Error processing chunk with {provider} provider: {str(e)}"
+            )
+            raise HTTPException(status_code=500, detail=str(e))
 
     async def _get_embeddings(self, data, embed_model, dimension):
         try:
-            all_embeddings = []
             embedding_provider = self.model_provider.get(embed_model)
+            if embedding_provider is None:
+                return concat_rows([])
 
-            if embedding_provider == "pinecone":
-                inputs = [{"text": item["text"]} for item in data]
-            elif embedding_provider == "cohere":
-                inputs = [item["text"] for item in data]
-            elif embedding_provider == "jina":
-                inputs = [{"text": item["text"]} for item in data]
-            else:
-                return []
-
-            chunks = [
-                inputs[i : i + self.chunk_size]
-                for i in range(0, len(inputs), self.chunk_size)
-            ]
+            texts = [item["text"] for item in data]
+            batches = plan_batches(
+                texts, **settings.EMBEDDING_BATCH_LIMITS[embedding_provider]
+            )
             tasks = [
                 self.process_chunk(
-                    chunk, embedding_provider, embed_model, dimension
+                    [texts[i] for i in batch],
+                    embedding_provider,
+                    embed_model,
+                    dimension,
                 )
-                for chunk in chunks
+                for batch in batches
             ]
-            chunk_results = await asyncio.gather(*tasks)
+            batch_results = await asyncio.gather(*tasks)
 
-            for embeddings in chunk_results:
-                all_embeddings.extend(embeddings)
-
-            return all_embeddings
+            return concat_rows(batch_results)
         except Exception as e:
             logger.error(f"Error generating embedding {str(e)}")
             raise HTTPException(status_code=500, detail=str(e))
 
     async def _prepare_and_upsert(
-        self, data, embed_model, dimension, index_host, namespace_name
+        self,
+        data,
+        embed_model,
+        dimension,
+        index_name,
+        index_host,
+        namespace_name,
     ):
+        """
+        Embed and upsert ``data``. The namespace's BM25 encoder, sparse
+        pruning rule and lexical index are only saved once its vectors are
+        upserted, so a failed upsert leaves those of the vectors already in
+        the index in place.
+        """
         try:
             all_embeddings = await self._get_embeddings(
                 data, embed_model, dimension
             )
 
             text_list = [item["text"] for item in data]
-            sparse_embeds = self.embedding_service.pinecone_sparse_embeddings(
-                text_list
+            sparse_encoder, sparse_embeds = (
+                await self.embedding_service.fit_pinecone_sparse_embeddings(
+                    text_list
+                )
+            )
+            pruning = self.sparse_encoders.pruning_rule()
+            pruned_sparse_embeds = self.sparse_encoders.prune(
+                sparse_embeds, pruning
             )
-            final_upsert_format = await self.pinecone_service.upsert_format(
-                data, all_embeddings, sparse_embeds
+            if pruned_sparse_embeds is not sparse_embeds:
+                pruning["report"] = await self._sparse_pruning_report(
+                    pruning,
+                    sparse_encoder,
+                    data,
+                    sparse_embeds,
+                    pruned_sparse_embeds,
+                )
+            lexical_index = await self.lexical_indexes.build(data)
+            final_upsert_format = await self.vector_store.upsert_format(
+                data, all_embeddings, pruned_sparse_embeds
             )
-            return await self.pinecone_service.upsert_vectors(
+            upsert_result = await self.vector_store.upsert_vectors(
                 index_host, final_upsert_format, namespace_name
             )
+            await asyncio.to_thread(
+                self.sparse_encoders.save,
+                index_name,
+                namespace_name,
+                sparse_encoder,
+            )
+            await asyncio.to_thread(
+                self.sparse_encoders.record_pruning,
+                index_name,
+                namespace_name,
+                pruning,
+            )
+            await asyncio.to_thread(
+                self.lexical_indexes.save,
+                index_name,
+                namespace_name,
+                lexical_index,
+            )
+            if self.query_result_cache is not None:
+                self.query_result_cache.invalidate_namespace(namespace_name)
+            if self.semantic_cache is not None:
+                self.semantic_cache.invalidate_namespace(namespace_name)
+            return upsert_result
         except Exception as e:
             logger.error(f"Error in preparing and upserting vectors : {str(e)}")
             raise HTTPException(status_code=500, detail=str(e))
 
+    async def _sparse_pruning_report(
+        self,
+        pruning,
+        sparse_encoder,
+        data,
+        sparse_embeds,
+        pruned_sparse_embeds,
+    ):
+        """
+        Sparse payload before and after pruning, next to the recall@k of
+        sparse-only retrieval of the ground truth chunks with and without
+        it. Failing to evaluate never fails the upsert.
+        """
+        before = sparse_payload_stats(sparse_embeds)
+        after = sparse_payload_stats(pruned_sparse_embeds)
+        report = {
+            "documents": len(sparse_embeds),
+            "terms_before": before["terms"],
+            "terms_after": after["terms"],
+            "bytes_before": before["bytes"],
+            "bytes_after": after["bytes"],
+            "payload_reduction": (
+                round(1 - after["bytes"] / before["bytes"], 4)
+                if before["bytes"]
+                else 0.0
+            ),
+        }
+
+        try:
+            rows = {item["_id"]: row for row, item in enumerate(data)}
+            questions = [
+                (question, [rows[i] for i in chunk_ids if i in rows])
+                for question, chunk_ids in await self.gt_data_repo.fetch_questions()
+            ]
+            questions = [(q, relevant) for q, relevant in questions if relevant]
+            if not questions:
+                return report
+
+            queries = sparse_encoder.encode_queries(
+                [question for question, _ in questions]
+            )
+            pruned_queries = self.sparse_encoders.prune(queries, pruning)
+            relevant = [relevant for _, relevant in questions]
+            k = settings.SPARSE_PRUNE_EVAL_TOP_K
+            recall_before, recall_after = await asyncio.gather(
+                asyncio.to_thread(
+                    sparse_recall_at_k, sparse_embeds, queries, relevant, k
+                ),
+                asyncio.to_thread(
+                    sparse_recall_at_k,
+                    pruned_sparse_embeds,
+                    pruned_queries,
+                    relevant,
+                    k,
+                ),
+            )
+        except Exception as e:
+            logger.warning(f"Error evaluating sparse pruning: {str(e)}")
+            return report
+
+        return {
+            **report,
+            "questions": len(questions),
+            "k": k,
+            "recall_at_k_before": round(recall_before, 4),
+            "recall_at_k_after": round(recall_after, 4),
+            "recall_delta": round(recall_after - recall_before, 4),
+        }
+
     async def _save_in_db(
         self,
         file_name,
@@ -175,15 +309,8 @@ class IndexUpsertUseCase:
             )
 
             if not already_index:
-                index_list = await self.pinecone_service.list_pinecone_indexes()
-
-                logger.info(f"already index {already_index}")
-                logger.info(f"index list {index_list}")
-                print(f"already index {already_index}")
-                print(f"index list {index_list}")
-
                 index_name = f"{similarity_metric}-{dimension}"
-                response = await self.pinecone_service.create_index(
+                response = await self.vector_store.create_index(
                     index_name, dimension, similarity_metric
                 )
                 index_host = response.get("host")
@@ -191,7 +318,12 @@ class IndexUpsertUseCase:
                 namespace_name = f"{file_name}-{embed_model}-namespace"
 
                 upsert_result = await self._prepare_and_upsert(
-                    data, embed_model, dimension, index_host, namespace_name
+                    data,
+                    embed_model,
+                    dimension,
+                    index_name,
+                    index_host,
+                    namespace_name,
                 )
 
                 db_result = await self._save_in_db(
@@ -211,18 +343,14 @@ class IndexUpsertUseCase:
             index_name = already_index.get("index_name")
             index_host = already_index.get("index_host")
 
-            index_json = await self.pinecone_service.list_pinecone_indexes()
-            index_list = index_json.get("indexes")
-            print(f"length of index list : {len(index_list)}")
-
-            logger.info(f"already index outside if{already_index}")
-            logger.info(f"index list outside if {index_list}")
-            print(f"already index outside if {already_index}")
-            print(f"index list outside if {index_list}")
-
             namespace_name = f"{file_name}-{embed_model}-namespace"
             upsert_result = await self._prepare_and_upsert(
-                data, embed_model, dimension, index_host, namespace_name
+                data,
+                embed_model,
+                dimension,
+                index_name,
+                index_host,
+                namespace_name,
             )
 
             db_result = await self._save_in_db(
@@ -1,10 +1,36 @@
+import asyncio
+import logging
+import time
+
 from fastapi import Depends, HTTPException
 
-from app.models.schemas.query_schema import QueryEndPointRequest
+from app.config.container import (
+    get_embedding_coalescer,
+    get_embedding_concurrency_limiters,
+    get_embedding_service,
+    get_lexical_indexes,
+    get_query_result_cache,
+    get_semantic_cache,
+    get_vector_store,
+)
+from app.config.settings import settings
+from app.models.schemas.query_schema import (
+    BatchQueryEndPointRequest,
+    MatrixQueryEndPointRequest,
+    QueryEndPointRequest,
+)
 from app.repositories.index_repository import IndexRepository
+from app.services.embedding_coalescer import EmbeddingCoalescer
 from app.services.embedding_service import EmbeddingService
 from app.services.evaluation_service import EvaluationService
-from app.services.pinecone_service import PineconeService
+from app.services.lexical_index_service import LexicalIndexManager
+from app.services.query_result_cache import QueryResultCache
+from app.services.semantic_cache import SemanticQueryCache
+from app.services.vector_store_router import VectorStoreRouter
+from app.utils.batching import plan_batches
+from app.utils.vector_ops import truncate_and_normalize
+
+logger = logging.getLogger(__name__)
 
 
 class QueryUseCase:
@@ -12,12 +38,26 @@ class QueryUseCase:
     def __init__(
         self,
         index_repository: IndexRepository = Depends(),
-        embedding_service: EmbeddingService = Depends(),
-        pinecone_service: PineconeService = Depends(),
+        embedding_service: EmbeddingService = Depends(get_embedding_service),
+        vector_store: VectorStoreRouter = Depends(get_vector_store),
+        embedding_coalescer: EmbeddingCoalescer = Depends(
+            get_embedding_coalescer
+        ),
+        lexical_indexes: LexicalIndexManager = Depends(get_lexical_indexes),
+        query_result_cache: QueryResultCache = Depends(get_query_result_cache),
+        semantic_cache: SemanticQueryCache = Depends(get_semantic_cache),
+        concurrency_limiters: dict = Depends(
+            get_embedding_concurrency_limiters
+        ),
     ):
         self.index_repository = index_repository
         self.embedding_service = embedding_service
-        self.pinecone_service = pinecone_service
+        self.vector_store = vector_store
+        self.embedding_coalescer = embedding_coalescer
+        self.lexical_indexes = lexical_indexes
+        self.query_result_cache = query_result_cache
+        self.semantic_cache = semantic_cache
+        self.concurrency_limiters = concurrency_limiters
         self.embeddings_provider_mapping = {
             "llama-text-embed-v2": "pinecone",
             "multilingual-e5-large": "pinecone",
@@ -30,34 +70,351 @@ class QueryUseCase:
             "embed-multilingual-v2.0": "cohere",
             "jina-embeddings-v3": "jina",
         }
+        self.query_input_types = {
+            "pinecone": "query",
+            "cohere": "search_query",
+            "jina": "retrieval.query",
+        }
 
     async def execute(self, request_data: QueryEndPointRequest):
         """
         Main execution function for processing query endpoint requests.
+        Repeated requests are answered from the query result cache.
+        """
+
+        namespace_name, host = await self._get_namespace_and_host(request_data)
+        if self.query_result_cache is None:
+            return await self._execute(request_data, namespace_name, host)
+
+        cache_key = self.query_result_cache.key(
+            f"{request_data.similarity_metric}-{request_data.dimension}",
+            namespace_name,
+            request_data,
+        )
+        response = self.query_result_cache.get(cache_key)
+        if response is None:
+            response = await self._execute(request_data, namespace_name, host)
+            self.query_result_cache.put(cache_key, response)
+        return response
+
+    async def _execute(
+        self, request_data: QueryEndPointRequest, namespace_name, host
+    ):
+        """
         Breaks down the request handling into smaller, focused functions.
         """
 
+        results = await self._search(request_data, namespace_name, host)
+        ground_truth = await self._get_ground_truth(request_data.query)
+        return self._build_response(results, ground_truth, request_data.top_k)
+
+    async def execute_batch(self, request_data: BatchQueryEndPointRequest):
+        """
+        Run every query of a batch request against one namespace. Queries
+        are embedded in provider-sized batches, searched with at most
+        QUERY_BATCH_CONCURRENCY vector queries in flight, and all ground
+        truth is fetched in one database pass.
+        """
+
+        started = time.perf_counter()
         namespace_name, host = await self._get_namespace_and_host(request_data)
+        queries = request_data.queries
 
-        dense_embedding = await self._generate_dense_embedding(request_data)
+        if request_data.is_lexical:
+            ground_truths = await self.index_repository.fetch_ground_truths(
+                queries
+            )
+            embeddings = [None] * len(queries)
+        else:
+            ground_truths, embeddings = await asyncio.gather(
+                self.index_repository.fetch_ground_truths(queries),
+                self._generate_dense_embeddings(request_data),
+            )
+
+        config = request_data.model_dump(exclude={"queries"})
+        semaphore = asyncio.Semaphore(settings.QUERY_BATCH_CONCURRENCY)
+
+        async def run(query, dense_embedding):
+            query_request = QueryEndPointRequest(**config, query=query)
+            try:
+                async with semaphore:
+                    results = await self._search(
+                        query_request, namespace_name, host, dense_embedding
+                    )
+            except Exception as e:
+                logger.error(f"Error in batch query {query!r}: {str(e)}")
+                error = e.detail if isinstance(e, HTTPException) else str(e)
+                return {"query": query, "relevant_docs": {}, "error": error}
+            return {
+                "query": query,
+                **self._build_response(
+                    results, ground_truths.get(query), request_data.top_k
+                ),
+            }
 
-        results = None
+        responses = await asyncio.gather(
+            *(run(query, emb) for query, emb in zip(queries, embeddings))
+        )
+        aggregate = self._aggregate_metrics(
+            responses, time.perf_counter() - started
+        )
         if request_data.is_hybrid:
-            results = await self._perform_hybrid_search(
-                request_data, namespace_name, host, dense_embedding
+            aggregate["sparse_pruning"] = (
+                self.embedding_service.sparse_encoders.pruning_for(
+                    f"{request_data.similarity_metric}-"
+                    f"{request_data.dimension}",
+                    namespace_name,
+                )
             )
-        else:
-            results = await self._perform_regular_search(
-                request_data, namespace_name, host, dense_embedding
+        return {"results": responses, "aggregate": aggregate}
+
+    async def execute_matrix(self, request_data: MatrixQueryEndPointRequest):
+        """
+        Run one query against every namespace holding the file, one per
+        (embedding model, dimension, similarity metric). The query is
+        embedded once per model where the model allows it, all namespaces
+        are searched concurrently, and the results and metrics come back
+        side by side.
+        """
+
+        started = time.perf_counter()
+        configurations = await self.index_repository.find_file_namespaces(
+            request_data.file_name
+        )
+        if request_data.embedding_models:
+            configurations = [
+                c
+                for c in configurations
+                if c["embedding_model"] in request_data.embedding_models
+            ]
+        if not configurations:
+            raise HTTPException(status_code=404, detail="Namespace not found.")
+
+        ground_truth, embeddings = await asyncio.gather(
+            self.index_repository.fetch_ground_truths([request_data.query]),
+            self._generate_matrix_embeddings(
+                request_data.query, configurations
+            ),
+        )
+        ground_truth = ground_truth.get(request_data.query)
+        config = request_data.model_dump(exclude={"embedding_models"})
+
+        async def run(configuration):
+            query_request = QueryEndPointRequest(
+                **config,
+                embedding_model=configuration["embedding_model"],
+                dimension=configuration["dimension"],
+                similarity_metric=configuration["similarity_metric"],
             )
+            embedding_key = self._matrix_embedding_key(configuration)
+            search_started = time.perf_counter()
+            try:
+                if isinstance(embeddings[embedding_key], Exception):
+                    raise embeddings[embedding_key]
+                results = await self._search(
+                    query_request,
+                    configuration["namespace"],
+                    configuration["index_host"],
+                    embeddings[embedding_key],
+                )
+                response = self._build_response(
+                    results, ground_truth, request_data.top_k
+                )
+            except Exception as e:
+                logger.error(
+                    f"Error querying {configuration['namespace']} in "
+                    f"{configuration['index_name']}: {str(e)}"
+                )
+                error = e.detail if isinstance(e, HTTPException) else str(e)
+                response = {"relevant_docs": {}, "error": error}
+            return {
+                **configuration,
+                "elapsed_seconds": round(
+                    time.perf_counter() - search_started, 4
+                ),
+                **response,
+            }
 
-        relevant_docs = []
-        for result in results["matches"]:
-            relevant_docs.append(
-                {"id": result["id"], "text": result["metadata"]["text"]}
+        responses = await asyncio.gather(*(run(c) for c in configurations))
+        return {
+            "query": request_data.query,
+            "file_name": request_data.file_name,
+            "results": responses,
+            "matrix": self._metrics_matrix(responses),
+            "elapsed_seconds": round(time.perf_counter() - started, 4),
+        }
+
+    def _matrix_embedding_key(self, configuration):
+        """Configurations sharing a key are searched with one embedding."""
+
+        model = configuration["embedding_model"]
+        provider = self.embeddings_provider_mapping.get(model, "jina")
+        return model, (
+            None if provider == "cohere" else configuration["dimension"]
+        )
+
+    async def _generate_matrix_embeddings(self, query, configurations):
+        """
+        Query embedding for every (model, dimension) of a matrix request.
+        Matryoshka models are embedded once at their full dimension and
+        truncated to the others; other models once per dimension. Failed
+        embeddings are returned as exceptions so they fail only their own
+        configurations.
+        """
+
+        dimensions = {}
+        for configuration in configurations:
+            model, dimension = self._matrix_embedding_key(configuration)
+            dimensions.setdefault(model, set()).add(dimension)
+
+        async def embed(model, dimension):
+            provider = self.embeddings_provider_mapping.get(model, "jina")
+            limiter = self.concurrency_limiters[provider]
+            async with limiter.slot():
+                embeddings = await self.embedding_service.embed_texts(
+                    provider,
+                    model,
+                    [query],
+                    input_type=self.query_input_types[provider],
+                    dimension=dimension,
+                    limiter=limiter,
+                )
+            return embeddings[0]
+
+        requests = {}
+        for model, model_dimensions in dimensions.items():
+            full_dimension = settings.MATRYOSHKA_MODELS.get(model)
+            if settings.MATRYOSHKA_DERIVATION_ENABLED and full_dimension:
+                requests[(model, full_dimension)] = None
+            else:
+                for dimension in model_dimensions:
+                    requests[(model, dimension)] = None
+
+        fetched = dict(
+            zip(
+                requests,
+                await asyncio.gather(
+                    *(embed(*key) for key in requests), return_exceptions=True
+                ),
             )
+        )
 
-        ground_truth = await self._get_ground_truth(request_data.query)
+        embeddings = {}
+        for model, model_dimensions in dimensions.items():
+            full_dimension = settings.MATRYOSHKA_MODELS.get(model)
+            for dimension in model_dimensions:
+                source = fetched.get((model, full_dimension))
+                if (model, dimension) in fetched:
+                    embeddings[(model, dimension)] = fetched[(model, dimension)]
+                elif isinstance(source, Exception):
+                    embeddings[(model, dimension)] = source
+                else:
+                    embeddings[(model, dimension)] = truncate_and_normalize(
+                        [source], dimension
+                    )[0]
+        return embeddings
+
+    @staticmethod
+    def _metrics_matrix(responses):
+        """Metrics only, as ``{embedding model: {index name: metrics}}``."""
+
+        matrix = {}
+        for response in responses:
+            metrics = {
+                name: value
+                for name, value in response.items()
+                if name
+                not in (
+                    "index_name",
+                    "index_host",
+                    "dimension",
+                    "similarity_metric",
+                    "namespace",
+                    "embedding_model",
+                    "relevant_docs",
+                )
+            }
+            matrix.setdefault(response["embedding_model"], {})[
+                response["index_name"]
+            ] = metrics
+        return matrix
+
+    async def _search(
+        self, request_data, namespace_name, host, dense_embedding=None
+    ):
+        """Lexical, dense or hybrid search for one query."""
+
+        if request_data.is_lexical:
+            return await self._perform_lexical_search(
+                request_data, namespace_name
+            )
+        if dense_embedding is None:
+            dense_embedding = await self._generate_dense_embedding(request_data)
+        results = await self._perform_dense_search(
+            request_data, namespace_name, host, dense_embedding
+        )
+        if settings.LEAN_VECTOR_METADATA:
+            return await self._hydrate_texts(results)
+        return results
+
+    async def _hydrate_texts(self, results):
+        """
+        Fill in the text of matches upserted without it, from raw_data.
+        The results are copied, as they may be shared with the semantic
+        cache.
+        """
+
+        matches = results.get("matches", [])
+        missing = [
+            match["id"]
+            for match in matches
+            if "text" not in (match.get("metadata") or {})
+        ]
+        if not missing:
+            return results
+
+        texts = await self.index_repository.fetch_chunk_texts(missing)
+        hydrated = []
+        for match in matches:
+            metadata = match.get("metadata") or {}
+            if "text" not in metadata and match["id"] in texts:
+                metadata = {**metadata, "text": texts[match["id"]]}
+            hydrated.append({**match, "metadata": metadata})
+        return {**results, "matches": hydrated}
+
+    def _build_response(self, results, ground_truth, top_k):
+        """Relevant docs for the search results plus evaluation metrics."""
+
+        cache_flags = {
+            name: results[name]
+            for name in ("semantic_cache_hit", "semantic_cache_similarity")
+            if name in results
+        }
+        missing_text_ids = [
+            result["id"]
+            for result in results["matches"]
+            if (result.get("metadata") or {}).get("text") is None
+        ]
+        if missing_text_ids:
+            # lean vectors whose chunks are no longer in raw_data
+            logger.warning(
+                f"Dropped {len(missing_text_ids)} matches without text: "
+                f"{missing_text_ids[:10]}"
+            )
+            cache_flags["missing_text_ids"] = missing_text_ids
+        return {
+            **self._evaluate_results(results, ground_truth, top_k),
+            **cache_flags,
+        }
+
+    def _evaluate_results(self, results, ground_truth, top_k):
+        """Relevant docs of the matches, scored against the ground truth."""
+
+        relevant_docs = []
+        for result in results["matches"]:
+            text = (result.get("metadata") or {}).get("text")
+            if text is not None:
+                relevant_docs.append({"id": result["id"], "text": text})
 
         if not relevant_docs:
             return {
@@ -72,11 +429,63 @@ class QueryUseCase:
             }
 
         evaluation_metrics = self._calculate_evaluation_metrics(
-            relevant_docs, ground_truth, request_data.top_k
+            relevant_docs, ground_truth, top_k
         )
 
         return {"relevant_docs": relevant_docs, **evaluation_metrics}
 
+    def _aggregate_metrics(self, responses, elapsed_seconds):
+        """Mean of every evaluation metric over the evaluated queries."""
+
+        evaluated = [r for r in responses if "precision_at_k" in r]
+        metric_names = [
+            name
+            for name in (evaluated[0] if evaluated else {})
+            if name
+            not in (
+                "query",
+                "relevant_docs",
+                "semantic_cache_hit",
+                "semantic_cache_similarity",
+                "missing_text_ids",
+            )
+        ]
+        return {
+            "queries": len(responses),
+            "evaluated": len(evaluated),
+            "not_evaluated": len(responses) - len(evaluated),
+            "semantic_cache_hits": sum(
+                1 for r in responses if r.get("semantic_cache_hit")
+            ),
+            **{
+                f"mean_{name}": self._mean_metric([r[name] for r in evaluated])
+                for name in metric_names
+            },
+            "elapsed_seconds": round(elapsed_seconds, 4),
+            "queries_per_second": (
+                round(len(responses) / elapsed_seconds, 2)
+                if elapsed_seconds > 0
+                else None
+            ),
+        }
+
+    @staticmethod
+    def _mean_metric(values):
+        """Mean of scalar metrics, or per key of ``{"X@k": score}`` ones."""
+
+        numbers = [v for v in values if isinstance(v, (int, float))]
+        if numbers:
+            return sum(numbers) / len(numbers)
+
+        scores = {}
+        for value in values:
+            if not isinstance(value, dict):
+                continue
+            for key, score in value.items():
+                if isinstance(score, (int, float)):
+                    scores.setdefault(key, []).append(score)
+        return {key: sum(v) / len(v) for key, v in scores.items()}
+
     async def _get_namespace_and_host(self, request_data: QueryEndPointRequest):
         """Get the namespace and host for the index."""
 
@@ -99,69 +508,123 @@ class QueryUseCase:
     async def _generate_dense_embedding(
         self, request_data: QueryEndPointRequest
     ):
-        """Generate dense embedding for the query using the appropriate provider."""
+        """
+        Generate dense embedding for the query using the appropriate provider.
+        Concurrent queries for the same model are batched by the coalescer.
+        """
 
-        embedding_provider = None
-        for key, value in self.embeddings_provider_mapping.items():
-            if key == request_data.embedding_model:
-                embedding_provider = value
+        embedding_provider = self.embeddings_provider_mapping.get(
+            request_data.embedding_model, "jina"
+        )
 
-        if embedding_provider == "pinecone":
-            return await self._generate_pinecone_embedding(request_data)
-        elif embedding_provider == "cohere":
-            return await self._generate_cohere_embedding(request_data)
-        else:
-            return await self._generate_jina_embedding(request_data)
+        return await self.embedding_coalescer.embed(
+            provider=embedding_provider,
+            model=request_data.embedding_model,
+            text=request_data.query,
+            input_type=self.query_input_types[embedding_provider],
+            dimension=(
+                None
+                if embedding_provider == "cohere"
+                else request_data.dimension
+            ),
+        )
 
-    async def _generate_pinecone_embedding(
-        self, request_data: QueryEndPointRequest
+    async def _generate_dense_embeddings(
+        self, request_data: BatchQueryEndPointRequest
     ):
-        """Generate embeddings using Pinecone."""
+        """
+        Embed every query of a batch request, in batches sized to the
+        provider's limits and under its concurrency limiter.
+        """
 
-        pinecone_input = [{"text": request_data.query}]
-        embedding = await self.embedding_service.pinecone_dense_embeddings(
-            inputs=pinecone_input,
-            embedding_model=request_data.embedding_model,
-            dimension=request_data.dimension,
-            input_type="query",
+        embedding_provider = self.embeddings_provider_mapping.get(
+            request_data.embedding_model, "jina"
+        )
+        queries = request_data.queries
+        batches = plan_batches(
+            queries, **settings.EMBEDDING_BATCH_LIMITS[embedding_provider]
         )
-        return embedding[0]
 
-    async def _generate_cohere_embedding(
-        self, request_data: QueryEndPointRequest
+        async def embed(batch):
+            limiter = self.concurrency_limiters[embedding_provider]
+            async with limiter.slot():
+                return await self.embedding_service.embed_texts(
+                    embedding_provider,
+                    request_data.embedding_model,
+                    [queries[i] for i in batch],
+                    input_type=self.query_input_types[embedding_provider],
+                    dimension=(
+                        None
+                        if embedding_provider == "cohere"
+                        else request_data.dimension
+                    ),
+                    limiter=limiter,
+                )
+
+        batch_embeddings = await asyncio.gather(*(embed(b) for b in batches))
+        embeddings = [None] * len(queries)
+        for batch, matrix in zip(batches, batch_embeddings):
+            for i, embedding in zip(batch, matrix):
+                embeddings[i] = embedding
+        return embeddings
+
+    async def _perform_dense_search(
+        self, request_data, namespace_name, host, dense_embedding
     ):
-        """Generate embeddings using Cohere."""
+        """
+        Dense or hybrid search. Dense searches reuse the results of an
+        earlier query whose embedding is close enough from the semantic
+        cache, flagged with ``semantic_cache_hit`` and the similarity, as
+        they were retrieved for a different question. Hybrid searches
+        also depend on the query text, so they are never served from it.
+        """
 
-        embedding = await self.embedding_service.cohere_dense_embeddings(
-            texts=[request_data.query],
-            model_name=request_data.embedding_model,
-            input_type="search_query",
-        )
-        return embedding[0]
+        if request_data.is_hybrid:
+            return await self._perform_hybrid_search(
+                request_data, namespace_name, host, dense_embedding
+            )
+        search = self._perform_regular_search
+        if self.semantic_cache is None:
+            return await search(
+                request_data, namespace_name, host, dense_embedding
+            )
 
-    async def _generate_jina_embedding(
-        self, request_data: QueryEndPointRequest
-    ):
-        """Generate embeddings using Jina."""
+        group_key = self.semantic_cache.group_key(
+            f"{request_data.similarity_metric}-{request_data.dimension}",
+            namespace_name,
+            request_data,
+        )
+        cached = self.semantic_cache.lookup(group_key, dense_embedding)
+        if cached is not None:
+            results, similarity = cached
+            return {
+                **results,
+                "semantic_cache_hit": True,
+                "semantic_cache_similarity": round(similarity, 4),
+            }
 
-        embedding = await self.embedding_service.jina_dense_embeddings(
-            model_name=request_data.embedding_model,
-            dimension=request_data.dimension,
-            inputs=[request_data.query],
-            input_type="retrieval.query",
+        results = await search(
+            request_data, namespace_name, host, dense_embedding
         )
-        return embedding[0]
+        self.semantic_cache.add(group_key, dense_embedding, results)
+        return results
 
     async def _perform_hybrid_search(
         self, request_data, namespace_name, host, dense_embedding
     ):
         """Perform hybrid search using both dense and sparse embeddings."""
 
-        sparse_embedding = self.embedding_service.pinecone_sparse_embeddings(
-            inputs=[request_data.query]
+        sparse_embedding = (
+            self.embedding_service.pinecone_sparse_query_embeddings(
+                inputs=[request_data.query],
+                index_name=(
+                    f"{request_data.similarity_metric}-{request_data.dimension}"
+                ),
+                namespace=namespace_name,
+            )
         )
 
-        return await self.pinecone_service.pinecone_hybrid_query(
+        return await self.vector_store.hybrid_query(
             index_host=host,
             namespace=namespace_name,
             top_k=request_data.top_k,
@@ -172,18 +635,35 @@ class QueryUseCase:
             filter_dict=request_data.filter_dict,
         )
 
+    async def _perform_lexical_search(self, request_data, namespace_name):
+        """BM25 search over the namespace's local inverted index."""
+
+        results = await self.lexical_indexes.search(
+            f"{request_data.similarity_metric}-{request_data.dimension}",
+            namespace_name,
+            request_data.query,
+            request_data.top_k,
+        )
+        if results is None:
+            raise HTTPException(
+                status_code=404,
+                detail="Lexical index not found, upsert the file again.",
+            )
+        return results
+
     async def _perform_regular_search(
         self, request_data, namespace_name, host, dense_embedding
     ):
         """Perform regular dense vector search."""
 
-        return await self.pinecone_service.pinecone_query(
+        return await self.vector_store.query(
             index_host=host,
             namespace=namespace_name,
             top_k=request_data.top_k,
             vector=dense_embedding,
             include_metadata=request_data.include_metadata,
             filter_dict=request_data.filter_dict,
+            ef_search=request_data.ef_search,
         )
 
     async def _get_ground_truth(self, query):
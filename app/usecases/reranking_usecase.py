@@ -1,5 +1,6 @@
 from fastapi import Depends, HTTPException
 
+from app.config.container import get_reranker_service
 from app.models.schemas.reranking_schema import (
     RerankingRequest,
     RerankingResponse,
@@ -14,7 +15,7 @@ class RerankingUseCase:
     def __init__(
         self,
         index_repository: IndexRepository = Depends(),
-        reranker_service: RerankerService = Depends(),
+        reranker_service: RerankerService = Depends(get_reranker_service),
     ):
         self.reranker_service = reranker_service
         self.index_repository = index_repository
@@ -0,0 +1,61 @@
+from typing import List, Sequence
+
+CHARS_PER_TOKEN = 4
+
+
+def estimate_tokens(text: str) -> int:
+    """Cheap token estimate (~4 characters per token for English text)."""
+    return len(text) // CHARS_PER_TOKEN + 1
+
+
+def plan_batches(
+    texts: Sequence[str],
+    max_items: int,
+    max_tokens: int,
+    max_tokens_per_item: int = None,
+) -> List[List[int]]:
+    """
+    Greedily pack consecutive texts into batches that respect both the
+    provider's item-count limit and its per-request token budget.
+
+    Returns lists of indices into ``texts`` so callers can map results back
+    in input order. A single text larger than ``max_tokens`` still gets a
+    batch of its own, since providers truncate oversized inputs.
+    """
+    sizes = []
+    for text in texts:
+        tokens = estimate_tokens(text)
+        if max_tokens_per_item:
+            tokens = min(tokens, max_tokens_per_item)
+        sizes.append(tokens)
+
+    return plan_sized_batches(sizes, max_items, max_tokens)
+
+
+def plan_sized_batches(
+    sizes: Sequence[int], max_items: int, max_size: int
+) -> List[List[int]]:
+    """
+    Greedily pack consecutive items of known ``sizes`` (tokens, bytes, ...)
+    into batches of at most ``max_items`` items and ``max_size`` in total.
+    An item larger than ``max_size`` on its own gets a batch of its own.
+    """
+    batches = []
+    current = []
+    current_size = 0
+
+    for i, size in enumerate(sizes):
+        if current and (
+            len(current) >= max_items or current_size + size > max_size
+        ):
+            batches.append(current)
+            current = []
+            current_size = 0
+
+        current.append(i)
+        current_size += size
+
+    if current:
+        batches.append(current)
+
+    return batches
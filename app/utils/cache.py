@@ -0,0 +1,104 @@
+import time
+from collections import OrderedDict
+from typing import Any, Callable, Dict, Hashable, Optional
+
+
+class LRUCache:
+    """Bounded in-memory LRU cache that keeps hit/miss/eviction counters."""
+
+    def __init__(self, max_items: int):
+        self.max_items = max_items
+        self._data: "OrderedDict[Hashable, Any]" = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def __len__(self) -> int:
+        return len(self._data)
+
+    def __contains__(self, key: Hashable) -> bool:
+        return key in self._data
+
+    def get(self, key: Hashable, default: Optional[Any] = None) -> Any:
+        if key not in self._data:
+            self.misses += 1
+            return default
+        self._data.move_to_end(key)
+        self.hits += 1
+        return self._data[key]
+
+    def put(self, key: Hashable, value: Any) -> None:
+        if key in self._data:
+            self._data.move_to_end(key)
+        self._data[key] = value
+        while len(self._data) > self.max_items:
+            self._data.popitem(last=False)
+            self.evictions += 1
+
+    def pop(self, key: Hashable, default: Optional[Any] = None) -> Any:
+        return self._data.pop(key, default)
+
+    def items(self) -> list:
+        """Snapshot of the entries, without touching recency or counters."""
+        return list(self._data.items())
+
+    def pop_where(self, predicate: Callable[[Hashable], bool]) -> int:
+        """Drop every entry whose key matches ``predicate``."""
+        keys = [key for key in self._data if predicate(key)]
+        for key in keys:
+            del self._data[key]
+        return len(keys)
+
+    def clear(self) -> None:
+        self._data.clear()
+
+    def stats(self) -> Dict[str, Any]:
+        lookups = self.hits + self.misses
+        return {
+            "size": len(self._data),
+            "max_items": self.max_items,
+            "hits": self.hits,
+            "misses": self.misses,
+            "evictions": self.evictions,
+            "hit_rate": round(self.hits / lookups, 4) if lookups else 0.0,
+        }
+
+
+class TTLCache(LRUCache):
+    """
+    ``LRUCache`` whose entries also expire ``ttl_seconds`` after they were
+    written. Expired entries are dropped lazily on lookup.
+    """
+
+    def __init__(self, max_items: int, ttl_seconds: float):
+        super().__init__(max_items)
+        self.ttl_seconds = ttl_seconds
+        self.expirations = 0
+
+    def get(self, key: Hashable, default: Optional[Any] = None) -> Any:
+        entry = super().get(key)
+        if entry is None:
+            return default
+
+        expires_at, value = entry
+        if expires_at <= time.monotonic():
+            self._data.pop(key, None)
+            self.hits -= 1
+            self.misses += 1
+            self.expirations += 1
+            return default
+        return value
+
+    def put(self, key: Hashable, value: Any) -> None:
+        super().put(key, (time.monotonic() + self.ttl_seconds, value))
+
+    def pop(self, key: Hashable, default: Optional[Any] = None) -> Any:
+        entry = self._data.pop(key, None)
+        return default if entry is None else entry[1]
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            **super().stats(),
+            "ttl_seconds": self.ttl_seconds,
+            "expirations": self.expirations,
+        }
@@ -0,0 +1,93 @@
+import asyncio
+import time
+from contextlib import asynccontextmanager
+
+import httpx
+from fastapi import HTTPException
+
+OVERLOAD_STATUS_CODES = {429, 503, 504}
+
+
+def is_overload_error(exc: BaseException) -> bool:
+    if isinstance(exc, HTTPException):
+        return exc.status_code in OVERLOAD_STATUS_CODES
+    if isinstance(exc, httpx.HTTPStatusError):
+        return exc.response.status_code in OVERLOAD_STATUS_CODES
+    return isinstance(exc, (asyncio.TimeoutError, httpx.TimeoutException))
+
+
+class AIMDConcurrencyLimiter:
+    """
+    Concurrency limit that adapts with AIMD (additive increase,
+    multiplicative decrease).
+
+    Used as ``async with limiter.slot():``. Every call that succeeds within
+    ``latency_target`` seconds grows the limit by ``1 / limit``, so the limit
+    rises by about one slot per round of calls. A 429, a 503/504 or a
+    timeout multiplies the limit by ``decrease_factor``. After a decrease,
+    further decreases are ignored for ``cooldown`` seconds, so a burst of
+    failures from one overload event only backs off once.
+    """
+
+    def __init__(
+        self,
+        initial_limit: int,
+        min_limit: int,
+        max_limit: int,
+        latency_target: float,
+        decrease_factor: float = 0.5,
+        cooldown: float = 1.0,
+    ):
+        self.limit = float(initial_limit)
+        self.min_limit = min_limit
+        self.max_limit = max_limit
+        self.latency_target = latency_target
+        self.decrease_factor = decrease_factor
+        self.cooldown = cooldown
+        self.in_flight = 0
+        self.successes = 0
+        self.overloads = 0
+        self._last_decrease = 0.0
+        self._condition = asyncio.Condition()
+
+    @asynccontextmanager
+    async def slot(self):
+        async with self._condition:
+            while self.in_flight >= int(self.limit):
+                await self._condition.wait()
+            self.in_flight += 1
+
+        started = time.monotonic()
+        try:
+            yield
+        except BaseException as exc:
+            if is_overload_error(exc):
+                self.on_overload()
+            raise
+        else:
+            self.on_success(time.monotonic() - started)
+        finally:
+            async with self._condition:
+                self.in_flight -= 1
+                self._condition.notify_all()
+
+    def on_success(self, latency: float):
+        self.successes += 1
+        if latency <= self.latency_target:
+            self.limit = min(self.max_limit, self.limit + 1 / self.limit)
+
+    def on_overload(self):
+        self.overloads += 1
+        now = time.monotonic()
+        if now - self._last_decrease < self.cooldown:
+            return
+        self._last_decrease = now
+        self.limit = max(self.min_limit, self.limit * self.decrease_factor)
+
+    def stats(self):
+        return {
+            "limit": round(self.limit, 2),
+            "in_flight": self.in_flight,
+            "successes": self.successes,
+            "overloads": self.overloads,
+        }
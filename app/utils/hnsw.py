@@ -0,0 +1,146 @@
+import json
+import os
+from typing import Optional, Tuple
+
+import hnswlib
+import numpy as np
+
+SPACES = {"dotproduct": "ip", "cosine": "cosine", "euclidean": "l2"}
+
+
+class HNSWIndex:
+    """
+    Hierarchical Navigable Small World graph (Malkov & Yashunin, 2016)
+    over the rows of a namespace, backed by hnswlib.
+
+    Graph labels are row numbers, so results map straight back to the
+    namespace's rows. Retired rows are marked deleted in the graph and are
+    skipped by searches. Every score is a "larger is better" key for the
+    metric: the dot product, the cosine similarity, or the negative squared
+    euclidean distance. hnswlib releases the GIL while it inserts and
+    searches, so building a graph does not stall other requests.
+    """
+
+    def __init__(
+        self,
+        metric: str,
+        dimension: int,
+        M: int = 16,
+        ef_construction: int = 200,
+        ef_search: int = 64,
+        threads: int = 1,
+        graph_path: Optional[str] = None,
+    ):
+        self.metric = metric
+        self.dimension = dimension
+        self.M = M
+        self.ef_construction = ef_construction
+        self.ef_search = ef_search
+        self.threads = threads
+        self.deleted = np.zeros(0, dtype=bool)
+        self.n_deleted = 0
+        self.index = hnswlib.Index(space=SPACES[metric], dim=dimension)
+        if graph_path is not None:
+            self.index.load_index(graph_path)
+        else:
+            self.index.init_index(
+                max_elements=1024, ef_construction=ef_construction, M=M
+            )
+
+    def __len__(self) -> int:
+        return self.index.get_current_count()
+
+    def add(self, vectors, stop: int):
+        """Insert rows ``len(self) .. stop - 1`` of ``vectors``."""
+        start = len(self)
+        if stop <= start:
+            return
+        if stop > self.index.get_max_elements():
+            self.index.resize_index(
+                max(stop, 2 * self.index.get_max_elements())
+            )
+        self.index.add_items(
+            np.asarray(vectors[start:stop], dtype=np.float32),
+            np.arange(start, stop),
+            num_threads=self.threads,
+        )
+        self.deleted = np.concatenate(
+            [self.deleted, np.zeros(stop - start, dtype=bool)]
+        )
+
+    def retire(self, live: np.ndarray):
+        """Mark the graph's rows that are no longer ``live`` as deleted."""
+        rows = np.flatnonzero(~live[: len(self.deleted)] & ~self.deleted)
+        for row in rows.tolist():
+            try:
+                self.index.mark_deleted(row)
+            except RuntimeError:
+                # already deleted in a graph saved ahead of its meta.json
+                pass
+        self.deleted[rows] = True
+        self.n_deleted += len(rows)
+
+    def search(
+        self, query: np.ndarray, k: int, ef_search: Optional[int] = None
+    ) -> Optional[Tuple[np.ndarray, np.ndarray]]:
+        """
+        Approximate top-k as (rows, keys), best first, or None when the
+        graph cannot return ``k`` rows at this ``ef``.
+        """
+        self.index.set_ef(max(ef_search or self.ef_search, k))
+        try:
+            labels, distances = self.index.knn_query(
+                np.asarray(query, dtype=np.float32), k=k, num_threads=1
+            )
+        except RuntimeError:
+            return None
+        rows = labels[0].astype(np.int64)
+        if self.metric == "euclidean":
+            return rows, -distances[0]
+        # hnswlib reports 1 - similarity for "ip" and "cosine"
+        return rows, 1.0 - distances[0]
+
+    def save(self, path: str):
+        os.makedirs(path, exist_ok=True)
+        tmp_path = os.path.join(path, "graph.tmp.bin")
+        self.index.save_index(tmp_path)
+        os.replace(tmp_path, os.path.join(path, "graph.bin"))
+
+        meta = {
+            "metric": self.metric,
+            "dimension": self.dimension,
+            "M": self.M,
+            "ef_construction": self.ef_construction,
+            "deleted": np.flatnonzero(self.deleted).tolist(),
+        }
+        tmp_path = os.path.join(path, "meta.tmp.json")
+        with open(tmp_path, "w") as f:
+            json.dump(meta, f)
+        os.replace(tmp_path, os.path.join(path, "meta.json"))
+
+    @classmethod
+    def load(
+        cls, path: str, ef_search: int = 64, threads: int = 1
+    ) -> Optional["HNSWIndex"]:
+        meta_path = os.path.join(path, "meta.json")
+        graph_path = os.path.join(path, "graph.bin")
+        if not os.path.exists(meta_path) or not os.path.exists(graph_path):
+            return None
+
+        with open(meta_path, "r") as f:
+            meta = json.load(f)
+
+        index = cls(
+            meta["metric"],
+            meta["dimension"],
+            M=meta["M"],
+            ef_construction=meta["ef_construction"],
+            ef_search=ef_search,
+            threads=threads,
+            graph_path=graph_path,
+        )
+        deleted = [row for row in meta["deleted"] if row < len(index)]
+        index.deleted = np.zeros(len(index), dtype=bool)
+        index.deleted[deleted] = True
+        index.n_deleted = len(deleted)
+        return index
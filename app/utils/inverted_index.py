@@ -0,0 +1,286 @@
+import os
+from typing import List, Tuple
+
+import numpy as np
+
+TermFrequencies = Tuple[np.ndarray, np.ndarray]
+
+_DELTA_DTYPES = {1: np.dtype("<u1"), 2: np.dtype("<u2"), 4: np.dtype("<u4")}
+
+
+class InvertedIndex:
+    """
+    BM25 inverted index over hashed terms with compressed postings.
+
+    Each term's postings are sorted by document and cut into blocks of
+    ``block_size``. A block stores its first document id once, followed by
+    gaps to the previous document, packed at the narrowest of 1, 2 or 4
+    bytes that fits the term's largest gap. BM25 impacts are precomputed
+    at build time and quantized to one byte against the term's maximum
+    impact, which doubles as the term's score upper bound.
+
+    ``search`` is term-at-a-time MaxScore. Terms are visited from the
+    highest upper bound down. Once the bounds of the terms left can no
+    longer lift an unseen document into the top-k, only the surviving
+    candidates are looked up in the remaining lists, decoding just the
+    blocks they fall into, and candidates that cannot reach the top-k are
+    dropped after every term.
+    """
+
+    ARRAYS = (
+        "terms",
+        "term_max",
+        "term_width",
+        "posting_start",
+        "block_start",
+        "byte_start",
+        "block_first",
+        "deltas",
+        "impacts",
+    )
+
+    def __init__(self, n_docs: int, block_size: int, **arrays):
+        self.n_docs = n_docs
+        self.block_size = block_size
+        for name in self.ARRAYS:
+            setattr(self, name, arrays[name])
+
+    def __len__(self) -> int:
+        return self.n_docs
+
+    @classmethod
+    def build(
+        cls,
+        docs: List[TermFrequencies],
+        block_size: int = 128,
+        k1: float = 1.2,
+        b: float = 0.75,
+    ) -> "InvertedIndex":
+        """Build from per-document (term hashes, counts) pairs."""
+        n_docs = len(docs)
+        lengths = np.array([len(indices) for indices, _ in docs], np.int64)
+        doc_lengths = np.array(
+            [counts.sum() for _, counts in docs], dtype=np.float32
+        )
+        avgdl = max(float(doc_lengths.mean()) if n_docs else 0.0, 1.0)
+
+        term_hashes = np.concatenate(
+            [np.zeros(0, np.uint32)] + [indices for indices, _ in docs]
+        ).astype(np.uint32)
+        tf = np.concatenate(
+            [np.zeros(0, np.float32)] + [counts for _, counts in docs]
+        ).astype(np.float32)
+        doc = np.repeat(np.arange(n_docs, dtype=np.int64), lengths)
+
+        terms, term_ids, doc_freq = np.unique(
+            term_hashes, return_inverse=True, return_counts=True
+        )
+        idf = np.log1p((n_docs - doc_freq + 0.5) / (doc_freq + 0.5))
+        norms = k1 * (1.0 - b + b * doc_lengths[doc] / avgdl)
+        impact = (idf[term_ids] * tf * (k1 + 1.0) / (tf + norms)).astype(
+            np.float32
+        )
+
+        order = np.lexsort((doc, term_ids))
+        term_ids, doc, impact = term_ids[order], doc[order], impact[order]
+        n_terms, n_postings = len(terms), len(doc)
+
+        posting_start = np.zeros(n_terms + 1, dtype=np.int64)
+        np.cumsum(doc_freq, out=posting_start[1:])
+        position = np.arange(n_postings) - posting_start[term_ids]
+        is_block_start = position % block_size == 0
+
+        block_start = np.zeros(n_terms + 1, dtype=np.int64)
+        np.cumsum(-(-doc_freq // block_size), out=block_start[1:])
+        block_first = doc[is_block_start].astype(np.uint32)
+
+        gaps = np.diff(doc, prepend=0)
+        gaps[is_block_start] = 0
+        max_gap = (
+            np.maximum.reduceat(gaps, posting_start[:-1])
+            if n_terms
+            else np.zeros(0, np.int64)
+        )
+        term_width = np.select(
+            [max_gap < 1 << 8, max_gap < 1 << 16], [1, 2], 4
+        ).astype(np.uint8)
+
+        byte_start = np.zeros(n_terms + 1, dtype=np.int64)
+        np.cumsum(doc_freq * term_width, out=byte_start[1:])
+        deltas = np.zeros(byte_start[-1], dtype=np.uint8)
+        posting_width = term_width[term_ids]
+        for width, dtype in _DELTA_DTYPES.items():
+            selected = posting_width == width
+            offsets = (
+                byte_start[term_ids[selected]] + position[selected] * width
+            )
+            deltas[offsets[:, None] + np.arange(width)] = (
+                gaps[selected].astype(dtype).view(np.uint8).reshape(-1, width)
+            )
+
+        term_max = (
+            np.maximum.reduceat(impact, posting_start[:-1])
+            if n_terms
+            else np.zeros(0, np.float32)
+        )
+        scale = np.where(term_max > 0, term_max / 255.0, 1.0)
+        impacts = np.clip(np.rint(impact / scale[term_ids]), 1, 255).astype(
+            np.uint8
+        )
+
+        return cls(
+            n_docs,
+            block_size,
+            terms=terms,
+            term_max=term_max.astype(np.float32),
+            term_width=term_width,
+            posting_start=posting_start,
+            block_start=block_start,
+            byte_start=byte_start,
+            block_first=block_first,
+            deltas=deltas,
+            impacts=impacts,
+        )
+
+    def _term_deltas(self, term: int) -> np.ndarray:
+        packed = self.deltas[self.byte_start[term] : self.byte_start[term + 1]]
+        return packed.view(_DELTA_DTYPES[int(self.term_width[term])])
+
+    def _scale(self, term: int) -> float:
+        return float(self.term_max[term]) / 255.0
+
+    def _decode(self, term: int) -> Tuple[np.ndarray, np.ndarray]:
+        """All (doc ids, impacts) of ``term``."""
+        start, stop = self.posting_start[term], self.posting_start[term + 1]
+        first = self.block_first[
+            self.block_start[term] : self.block_start[term + 1]
+        ].astype(np.int64)
+        sums = np.cumsum(self._term_deltas(term), dtype=np.int64)
+        block_sizes = np.diff(
+            np.append(np.arange(0, stop - start, self.block_size), stop - start)
+        )
+        heads = sums[:: self.block_size]
+        docs = sums + np.repeat(first - heads, block_sizes)
+        return docs, self.impacts[start:stop] * self._scale(term)
+
+    def _decode_blocks(
+        self, term: int, blocks: np.ndarray
+    ) -> Tuple[np.ndarray, np.ndarray]:
+        """(doc ids, impacts) of the given blocks of ``term`` only."""
+        start, stop = self.posting_start[term], self.posting_start[term + 1]
+        positions = blocks[:, None] * self.block_size + np.arange(
+            self.block_size
+        )
+        valid = positions < stop - start
+        positions = np.where(valid, positions, 0)
+
+        gaps = self._term_deltas(term)[positions].astype(np.int64)
+        gaps[:, 0] = 0
+        first = self.block_first[self.block_start[term] + blocks]
+        docs = np.cumsum(np.where(valid, gaps, 0), axis=1) + first[:, None]
+        impacts = self.impacts[start + positions] * self._scale(term)
+        return docs[valid], impacts[valid]
+
+    @staticmethod
+    def _kth_largest(scores: np.ndarray, k: int) -> float:
+        if len(scores) < k:
+            return 0.0
+        return float(np.partition(scores, len(scores) - k)[len(scores) - k])
+
+    def search(
+        self, query_terms: np.ndarray, query_weights: np.ndarray, k: int
+    ) -> Tuple[np.ndarray, np.ndarray, Tuple[int, int]]:
+        """
+        Top-k documents for the hashed query terms, best first, as (doc
+        ids, scores, (postings decoded, postings of the query terms)).
+        """
+        query_terms = np.asarray(query_terms, dtype=np.uint32)
+        query_weights = np.asarray(query_weights, dtype=np.float32)
+        found = np.searchsorted(self.terms, query_terms)
+        found = np.minimum(found, max(len(self.terms) - 1, 0))
+        known = (
+            self.terms[found] == query_terms
+            if len(self.terms)
+            else np.zeros(len(query_terms), dtype=bool)
+        )
+        terms, weights = found[known], query_weights[known]
+        total = int(
+            (self.posting_start[terms + 1] - self.posting_start[terms]).sum()
+        )
+
+        bounds = self.term_max[terms] * weights
+        order = np.argsort(-bounds, kind="stable")
+        terms, weights, bounds = terms[order], weights[order], bounds[order]
+        remaining = np.append(np.cumsum(bounds[::-1])[::-1], 0.0)
+
+        scores = np.zeros(self.n_docs, dtype=np.float32)
+        threshold = 0.0
+        decoded = 0
+        seen = [np.zeros(0, dtype=np.int64)]
+        i = 0
+        while i < len(terms) and remaining[i] > threshold:
+            docs, impacts = self._decode(terms[i])
+            scores[docs] += impacts * weights[i]
+            threshold = max(threshold, self._kth_largest(scores[docs], k))
+            decoded += len(docs)
+            seen.append(docs)
+            i += 1
+
+        candidates = np.unique(np.concatenate(seen))
+        candidate_scores = scores[candidates]
+        keep = candidate_scores + remaining[i] >= threshold
+        candidates, candidate_scores = candidates[keep], candidate_scores[keep]
+
+        for j in range(i, len(terms)):
+            if not len(candidates):
+                break
+            term = terms[j]
+            first = self.block_first[
+                self.block_start[term] : self.block_start[term + 1]
+            ]
+            blocks = np.unique(
+                np.searchsorted(first, candidates, side="right") - 1
+            )
+            docs, impacts = self._decode_blocks(term, blocks[blocks >= 0])
+            decoded += len(docs)
+
+            positions = np.minimum(
+                np.searchsorted(docs, candidates), max(len(docs) - 1, 0)
+            )
+            if len(docs):
+                hit = docs[positions] == candidates
+                candidate_scores[hit] += impacts[positions[hit]] * weights[j]
+
+            threshold = max(threshold, self._kth_largest(candidate_scores, k))
+            keep = candidate_scores + remaining[j + 1] >= threshold
+            candidates = candidates[keep]
+            candidate_scores = candidate_scores[keep]
+
+        best = np.argsort(-candidate_scores, kind="stable")[:k]
+        return candidates[best], candidate_scores[best], (decoded, total)
+
+    def nbytes(self) -> int:
+        return int(sum(getattr(self, name).nbytes for name in self.ARRAYS))
+
+    def postings(self) -> int:
+        return int(self.posting_start[-1]) if len(self.posting_start) else 0
+
+    def save(self, path: str):
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        tmp_path = f"{path}.tmp.npz"
+        np.savez(
+            tmp_path,
+            n_docs=self.n_docs,
+            block_size=self.block_size,
+            **{name: getattr(self, name) for name in self.ARRAYS},
+        )
+        os.replace(tmp_path, path)
+
+    @classmethod
+    def load(cls, path: str) -> "InvertedIndex":
+        with np.load(path) as data:
+            return cls(
+                int(data["n_docs"]),
+                int(data["block_size"]),
+                **{name: data[name] for name in cls.ARRAYS},
+            )
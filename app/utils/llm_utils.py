@@ -3,13 +3,15 @@ from typing import Dict, List
 
 import httpx
 
-from app.config.settings import Settings
+from app.config.http_client import HTTPClientHelper
+from app.config.settings import settings
 from app.prompts import rag_generation
 
 
 class LLMUtils:
-    def __init__(self):
-        self.settings = Settings()
+    def __init__(self, http_clients: HTTPClientHelper):
+        self.http_clients = http_clients
+        self.settings = settings
         self.rag_generation = rag_generation
         self.model = "mixtral-8x7b-32768"
 
@@ -24,12 +26,16 @@ class LLMUtils:
         data = {"messages": messages, "model": model, **params}
 
         try:
-            async with httpx.AsyncClient() as client:
-                response = await client.post(
-                    self.settings.GROQ_BASE_URL, headers=headers, json=data
-                )
-                response.raise_for_status()
-                return response.json()
+            response = await self.http_clients.request(
+                "groq",
+                "POST",
+                self.settings.GROQ_BASE_URL,
+                idempotent=False,
+                headers=headers,
+                json=data,
+            )
+            response.raise_for_status()
+            return response.json()
         except httpx.HTTPError as e:
             print(f"GROQ API error: {str(e)}")
             return {"error": str(e)}
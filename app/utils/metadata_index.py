@@ -0,0 +1,207 @@
+from typing import Dict, Iterable, List, Optional
+
+import numpy as np
+
+RANGE_OPERATORS = {"$gt", "$gte", "$lt", "$lte"}
+
+
+class FilterError(ValueError):
+    """Raised for filters the index cannot evaluate."""
+
+
+class _SortedColumn:
+    """Values of one type for one field, sorted, with their rows."""
+
+    def __init__(self, values: list, rows: List[int], dtype):
+        values = np.asarray(values, dtype=dtype)
+        order = np.argsort(values, kind="stable")
+        self.values = values[order]
+        self.rows = np.asarray(rows, dtype=np.int64)[order]
+
+    def rows_for(self, operator: str, value) -> np.ndarray:
+        if operator == "$eq":
+            lo = np.searchsorted(self.values, value, side="left")
+            hi = np.searchsorted(self.values, value, side="right")
+        elif operator in ("$gt", "$gte"):
+            side = "right" if operator == "$gt" else "left"
+            lo, hi = np.searchsorted(self.values, value, side=side), None
+        else:
+            side = "left" if operator == "$lt" else "right"
+            lo, hi = 0, np.searchsorted(self.values, value, side=side)
+        return self.rows[lo:hi]
+
+
+class MetadataIndex:
+    """
+    Filter index over the metadata fields of one namespace.
+
+    Every indexed field keeps its values sorted alongside their rows, one
+    sorted array per value type (numbers and strings), which answers
+    equality and range operators with two binary searches. Fields with at
+    most ``bitmap_max_cardinality`` distinct values additionally keep one
+    packed bitmap per value, so ``$eq`` / ``$in`` / ``$nin`` on them are
+    plain bitwise ORs.
+
+    ``mask`` evaluates a Pinecone-style filter (``$eq``, ``$ne``, ``$in``,
+    ``$nin``, ``$gt``, ``$gte``, ``$lt``, ``$lte``, ``$exists``, ``$and``
+    and ``$or``) into a packed bitmap over the rows, so its cost follows
+    the number of matching rows and the bitmap size rather than a scan of
+    the metadata. List values match when any element matches. Strings
+    compare lexicographically, which orders ``created_at`` timestamps.
+    """
+
+    def __init__(
+        self,
+        metadata: List[dict],
+        fields: Iterable[str],
+        bitmap_max_cardinality: int = 256,
+    ):
+        self.n_rows = len(metadata)
+        self.fields = list(fields)
+        self.columns: Dict[str, Dict[str, _SortedColumn]] = {}
+        self.bitmaps: Dict[str, Dict] = {}
+        self.present: Dict[str, np.ndarray] = {}
+
+        for field in self.fields:
+            entries = {"num": ([], []), "str": ([], [])}
+            for row, meta in enumerate(metadata):
+                value = meta.get(field)
+                for item in value if isinstance(value, list) else [value]:
+                    kind = self._kind(item)
+                    if kind is not None:
+                        entries[kind][0].append(item)
+                        entries[kind][1].append(row)
+
+            self.columns[field] = {
+                kind: _SortedColumn(
+                    values, rows, np.float64 if kind == "num" else str
+                )
+                for kind, (values, rows) in entries.items()
+                if values
+            }
+            self.present[field] = self._bitmap(
+                np.concatenate(
+                    [np.zeros(0, np.int64)]
+                    + [column.rows for column in self.columns[field].values()]
+                )
+            )
+
+            distinct = sum(
+                len(np.unique(column.values))
+                for column in self.columns[field].values()
+            )
+            if distinct <= bitmap_max_cardinality:
+                self.bitmaps[field] = self._value_bitmaps(field)
+
+    @staticmethod
+    def _kind(value) -> Optional[str]:
+        if isinstance(value, str):
+            return "str"
+        if isinstance(value, (bool, int, float)):
+            return "num"
+        return None
+
+    def _bitmap(self, rows: np.ndarray) -> np.ndarray:
+        mask = np.zeros(self.n_rows, dtype=bool)
+        mask[rows] = True
+        return np.packbits(mask)
+
+    def _value_bitmaps(self, field: str) -> Dict:
+        bitmaps = {}
+        for column in self.columns[field].values():
+            starts = np.flatnonzero(
+                np.r_[True, column.values[1:] != column.values[:-1]]
+            )
+            stops = np.append(starts[1:], len(column.values))
+            for start, stop in zip(starts.tolist(), stops.tolist()):
+                value = column.values[start].item()
+                bitmaps[value] = self._bitmap(column.rows[start:stop])
+        return bitmaps
+
+    def _empty(self) -> np.ndarray:
+        return np.zeros((self.n_rows + 7) // 8, dtype=np.uint8)
+
+    def _full(self) -> np.ndarray:
+        return np.packbits(np.ones(self.n_rows, dtype=bool))
+
+    def _equal(self, field: str, value) -> np.ndarray:
+        kind = self._kind(value)
+        if kind is None:
+            raise FilterError(f"Unsupported filter value for {field}: {value}")
+        if field in self.bitmaps:
+            key = float(value) if kind == "num" else value
+            bitmap = self.bitmaps[field].get(key)
+            return bitmap if bitmap is not None else self._empty()
+        column = self.columns[field].get(kind)
+        if column is None:
+            return self._empty()
+        return self._bitmap(column.rows_for("$eq", value))
+
+    def _range(self, field: str, operator: str, value) -> np.ndarray:
+        kind = self._kind(value)
+        if kind is None or isinstance(value, bool):
+            raise FilterError(f"Unsupported range value for {field}: {value}")
+        column = self.columns[field].get(kind)
+        if column is None:
+            return self._empty()
+        return self._bitmap(column.rows_for(operator, value))
+
+    def _any_of(self, field: str, values) -> np.ndarray:
+        if not isinstance(values, list):
+            raise FilterError(f"$in and $nin expect a list for {field}")
+        result = self._empty()
+        for value in values:
+            result |= self._equal(field, value)
+        return result
+
+    def _field(self, field: str, condition) -> np.ndarray:
+        if field not in self.columns:
+            raise FilterError(f"Metadata field {field} is not filterable")
+        if not isinstance(condition, dict):
+            return self._equal(field, condition)
+
+        result = self._full()
+        for operator, value in condition.items():
+            if operator == "$eq":
+                bitmap = self._equal(field, value)
+            elif operator == "$ne":
+                bitmap = self.present[field] & ~self._equal(field, value)
+            elif operator == "$in":
+                bitmap = self._any_of(field, value)
+            elif operator == "$nin":
+                bitmap = self.present[field] & ~self._any_of(field, value)
+            elif operator in RANGE_OPERATORS:
+                bitmap = self._range(field, operator, value)
+            elif operator == "$exists":
+                bitmap = self.present[field] if value else ~self.present[field]
+            else:
+                raise FilterError(f"Unsupported filter operator {operator}")
+            result &= bitmap
+        return result
+
+    def _evaluate(self, filter_dict: dict) -> np.ndarray:
+        if not isinstance(filter_dict, dict):
+            raise FilterError("Filters must be objects")
+
+        result = self._full()
+        for key, condition in filter_dict.items():
+            if key in ("$and", "$or"):
+                if not isinstance(condition, list):
+                    raise FilterError(f"{key} expects a list of filters")
+                parts = [self._evaluate(part) for part in condition]
+                if key == "$and":
+                    for part in parts:
+                        result &= part
+                else:
+                    combined = self._empty()
+                    for part in parts:
+                        combined |= part
+                    result &= combined
+            else:
+                result &= self._field(key, condition)
+        return result
+
+    def mask(self, filter_dict: dict) -> np.ndarray:
+        """Boolean mask of the rows matching ``filter_dict``."""
+        bitmap = self._evaluate(filter_dict)
+        return np.unpackbits(bitmap, count=self.n_rows).view(bool)
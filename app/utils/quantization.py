@@ -0,0 +1,145 @@
+from typing import Optional
+
+import numpy as np
+
+
+class ScalarQuantizer:
+    """
+    int8 scalar quantization: each dimension is mapped linearly from its
+    trained [min, max] range onto 0..255, so a vector costs ``dim`` bytes
+    (4x smaller than float32).
+    """
+
+    kind = "sq8"
+
+    def __init__(self, offset: np.ndarray, scale: np.ndarray):
+        self.offset = offset.astype(np.float32)
+        self.scale = scale.astype(np.float32)
+
+    @classmethod
+    def train(cls, vectors: np.ndarray) -> "ScalarQuantizer":
+        low = vectors.min(axis=0)
+        high = vectors.max(axis=0)
+        scale = np.where(high > low, (high - low) / 255.0, 1.0)
+        return cls(low, scale)
+
+    def code_size(self) -> int:
+        return len(self.offset)
+
+    def encode(self, vectors: np.ndarray) -> np.ndarray:
+        codes = np.rint((vectors - self.offset) / self.scale)
+        return np.clip(codes, 0, 255).astype(np.uint8)
+
+    def dots(self, codes: np.ndarray, queries: np.ndarray) -> np.ndarray:
+        """Asymmetric dot products of float ``queries`` with coded rows."""
+        return codes.astype(np.float32) @ (queries * self.scale).T + (
+            queries @ self.offset
+        )
+
+    def params(self) -> dict:
+        return {"offset": self.offset, "scale": self.scale}
+
+    @classmethod
+    def from_params(cls, params) -> "ScalarQuantizer":
+        return cls(params["offset"], params["scale"])
+
+
+class ProductQuantizer:
+    """
+    Product quantization: vectors are split into ``n_subspaces`` equal
+    sub-vectors, each replaced by the id of its nearest of 256 k-means
+    centroids, so a vector costs ``n_subspaces`` bytes. Queries are scored
+    with asymmetric distance computation: one (subspace, centroid) lookup
+    table per query, summed over each row's codes.
+    """
+
+    kind = "pq"
+
+    def __init__(self, centroids: np.ndarray):
+        # (n_subspaces, n_centroids, subspace_dim)
+        self.centroids = centroids.astype(np.float32)
+
+    @classmethod
+    def train(
+        cls,
+        vectors: np.ndarray,
+        n_subspaces: int,
+        n_centroids: int = 256,
+        iterations: int = 15,
+        max_samples: int = 20000,
+        seed: int = 0,
+    ) -> "ProductQuantizer":
+        rng = np.random.default_rng(seed)
+        if len(vectors) > max_samples:
+            vectors = vectors[rng.choice(len(vectors), max_samples, False)]
+        n_centroids = min(n_centroids, len(vectors))
+        subspaces = vectors.reshape(len(vectors), n_subspaces, -1)
+
+        centroids = []
+        for j in range(n_subspaces):
+            points = np.ascontiguousarray(subspaces[:, j])
+            centers = points[rng.choice(len(points), n_centroids, False)]
+            for _ in range(iterations):
+                assignment = cls._nearest(points, centers)
+                counts = np.bincount(assignment, minlength=n_centroids)
+                sums = np.zeros_like(centers)
+                np.add.at(sums, assignment, points)
+                filled = counts > 0
+                centers[filled] = sums[filled] / counts[filled, None]
+            centroids.append(centers)
+        return cls(np.stack(centroids))
+
+    @staticmethod
+    def _nearest(points: np.ndarray, centers: np.ndarray) -> np.ndarray:
+        distances = (
+            np.einsum("ij,ij->i", centers, centers)[None, :]
+            - 2 * points @ centers.T
+        )
+        return distances.argmin(axis=1)
+
+    def code_size(self) -> int:
+        return self.centroids.shape[0]
+
+    def encode(self, vectors: np.ndarray) -> np.ndarray:
+        subspaces = vectors.reshape(len(vectors), self.code_size(), -1)
+        codes = np.empty((len(vectors), self.code_size()), dtype=np.uint8)
+        for j in range(self.code_size()):
+            codes[:, j] = self._nearest(subspaces[:, j], self.centroids[j])
+        return codes
+
+    def dots(self, codes: np.ndarray, queries: np.ndarray) -> np.ndarray:
+        n_subspaces = self.code_size()
+        query_subspaces = queries.reshape(len(queries), n_subspaces, -1)
+        # (queries, subspaces, centroids) lookup tables
+        tables = np.einsum("qmd,mkd->qmk", query_subspaces, self.centroids)
+        subspace_ids = np.arange(n_subspaces)
+        return np.stack(
+            [table[subspace_ids, codes].sum(axis=1) for table in tables],
+            axis=1,
+        ).astype(np.float32)
+
+    def params(self) -> dict:
+        return {"centroids": self.centroids}
+
+    @classmethod
+    def from_params(cls, params) -> "ProductQuantizer":
+        return cls(params["centroids"])
+
+
+CODECS = {codec.kind: codec for codec in (ScalarQuantizer, ProductQuantizer)}
+
+
+def train_codec(
+    kind: str, vectors: np.ndarray, pq_subvector_dims: int = 4
+) -> Optional[object]:
+    """Train the ``kind`` codec on ``vectors``; PQ falls back to SQ8 when
+    the dimension does not split into ``pq_subvector_dims`` sub-vectors."""
+    if kind == ProductQuantizer.kind:
+        if vectors.shape[1] % pq_subvector_dims == 0:
+            return ProductQuantizer.train(
+                vectors, vectors.shape[1] // pq_subvector_dims
+            )
+        kind = ScalarQuantizer.kind
+    if kind == ScalarQuantizer.kind:
+        return ScalarQuantizer.train(vectors)
+    return None
@@ -0,0 +1,39 @@
+import asyncio
+import time
+
+
+class TokenBucket:
+    """
+    Async token bucket: refills at ``rate`` tokens per second up to
+    ``capacity``. Callers await ``acquire()`` before each request, which
+    keeps a provider's traffic at or below its allowed rate instead of
+    bursting into 429s.
+    """
+
+    def __init__(self, rate: float, capacity: float):
+        self.rate = rate
+        self.capacity = max(1.0, capacity)
+        self.tokens = self.capacity
+        self.updated = time.monotonic()
+        self._lock = asyncio.Lock()
+
+    def _refill(self):
+        now = time.monotonic()
+        self.tokens = min(
+            self.capacity, self.tokens + (now - self.updated) * self.rate
+        )
+        self.updated = now
+
+    async def acquire(self, tokens: float = 1.0):
+        async with self._lock:
+            while True:
+                self._refill()
+                if self.tokens >= tokens:
+                    self.tokens -= tokens
+                    return
+                await asyncio.sleep((tokens - self.tokens) / self.rate)
+
+    def pause(self, seconds: float):
+        """Drain the bucket so that nobody sends for ``seconds`` (Retry-After)."""
+        self._refill()
+        self.tokens = min(self.tokens, -seconds * self.rate)
@@ -0,0 +1,61 @@
+import random
+from datetime import datetime, timezone
+from email.utils import parsedate_to_datetime
+from typing import Optional
+
+import httpx
+
+RETRYABLE_STATUS_CODES = {429, 500, 502, 503, 504}
+# statuses that mean a request was not processed, safe to resend any request
+NOT_PROCESSED_STATUS_CODES = {429, 503}
+# transport errors raised before a request reached the server
+NOT_SENT_ERRORS = (httpx.ConnectError, httpx.ConnectTimeout, httpx.PoolTimeout)
+
+
+class RetryPolicy:
+    """Exponential backoff with full jitter that honors ``Retry-After``."""
+
+    def __init__(
+        self,
+        max_attempts: int,
+        base_delay: float,
+        max_delay: float,
+        max_retry_after: float,
+    ):
+        self.max_attempts = max_attempts
+        self.base_delay = base_delay
+        self.max_delay = max_delay
+        self.max_retry_after = max_retry_after
+
+    def should_retry(self, attempt: int) -> bool:
+        return attempt + 1 < self.max_attempts
+
+    def backoff(self, attempt: int) -> float:
+        return random.uniform(
+            0, min(self.max_delay, self.base_delay * 2**attempt)
+        )
+
+    def retry_after(self, response: httpx.Response) -> Optional[float]:
+        value = response.headers.get("Retry-After")
+        if not value:
+            return None
+
+        try:
+            seconds = float(value)
+        except ValueError:
+            try:
+                retry_at = parsedate_to_datetime(value)
+            except (TypeError, ValueError):
+                return None
+            if retry_at.tzinfo is None:
+                retry_at = retry_at.replace(tzinfo=timezone.utc)
+            seconds = (retry_at - datetime.now(timezone.utc)).total_seconds()
+
+        return min(max(seconds, 0.0), self.max_retry_after)
+
+    def delay_for(self, attempt: int, response: httpx.Response = None):
+        if response is not None:
+            retry_after = self.retry_after(response)
+            if retry_after is not None:
+                return retry_after
+        return self.backoff(attempt)
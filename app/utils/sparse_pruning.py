@@ -0,0 +1,113 @@
+from typing import Dict, List
+
+import numpy as np
+import orjson
+
+
+def _flatten(vectors: List[dict]):
+    lengths = np.array([len(v["indices"]) for v in vectors], dtype=np.int64)
+    indices = np.concatenate(
+        [np.zeros(0, np.int64)]
+        + [np.asarray(v["indices"], dtype=np.int64) for v in vectors]
+    )
+    values = np.concatenate(
+        [np.zeros(0, np.float64)]
+        + [np.asarray(v["values"], dtype=np.float64) for v in vectors]
+    )
+    return lengths, indices, values
+
+
+def prune_sparse_vectors(
+    vectors: List[dict], top_n: int = 0, mass: float = 0.0
+) -> List[dict]:
+    """
+    Keep, per sparse vector, its ``top_n`` largest-magnitude terms and/or
+    the fewest largest terms holding ``mass`` of its total magnitude (0
+    disables either rule). Every vector is pruned in one sort over the
+    concatenated terms; kept terms stay in their original order.
+    """
+    if not top_n and not (0.0 < mass < 1.0):
+        return vectors
+    lengths, indices, values = _flatten(vectors)
+    if not len(values):
+        return vectors
+
+    segment = np.repeat(np.arange(len(vectors)), lengths)
+    magnitude = np.abs(values)
+    order = np.lexsort((-magnitude, segment))
+    starts = np.concatenate(([0], np.cumsum(lengths)[:-1]))
+    rank = np.arange(len(values)) - np.repeat(starts, lengths)
+
+    keep_sorted = np.ones(len(values), dtype=bool)
+    if top_n:
+        keep_sorted &= rank < top_n
+    if 0.0 < mass < 1.0:
+        sorted_magnitude = magnitude[order]
+        totals = np.bincount(segment, weights=magnitude, minlength=len(vectors))
+        before = np.concatenate(([0.0], np.cumsum(totals)[:-1]))
+        cumulative = np.cumsum(sorted_magnitude) - np.repeat(before, lengths)
+        # a term is kept while the terms above it hold less than ``mass``
+        keep_sorted &= cumulative - sorted_magnitude < mass * np.repeat(
+            totals, lengths
+        )
+
+    keep = np.zeros(len(values), dtype=bool)
+    keep[order[keep_sorted]] = True
+    kept = np.cumsum(np.bincount(segment[keep], minlength=len(vectors)))[:-1]
+    return [
+        {"indices": i.tolist(), "values": v.tolist()}
+        for i, v in zip(
+            np.split(indices[keep], kept), np.split(values[keep], kept)
+        )
+    ]
+
+
+def sparse_recall_at_k(
+    documents: List[dict],
+    queries: List[dict],
+    relevant: List[List[int]],
+    k: int,
+) -> float:
+    """
+    Mean recall@k of sparse dot-product retrieval of ``documents`` for
+    ``queries``, where ``relevant[i]`` holds the document rows relevant to
+    query ``i``. Documents are laid out as term-sorted postings, so each
+    query only touches the postings of its own terms.
+    """
+    lengths, terms, weights = _flatten(documents)
+    rows = np.repeat(np.arange(len(documents)), lengths)
+    order = np.argsort(terms, kind="stable")
+    terms, weights, rows = terms[order], weights[order], rows[order]
+
+    recalls = []
+    for query, relevant_rows in zip(queries, relevant):
+        if not relevant_rows:
+            continue
+        query_terms = np.asarray(query["indices"], dtype=np.int64)
+        query_weights = np.asarray(query["values"], dtype=np.float64)
+        lo = np.searchsorted(terms, query_terms, side="left")
+        hi = np.searchsorted(terms, query_terms, side="right")
+        postings = np.concatenate(
+            [np.zeros(0, np.int64)]
+            + [np.arange(a, b) for a, b in zip(lo.tolist(), hi.tolist())]
+        )
+        scores = np.bincount(
+            rows[postings],
+            weights=weights[postings] * np.repeat(query_weights, hi - lo),
+            minlength=len(documents),
+        )
+        top = np.argsort(-scores, kind="stable")[:k]
+        top = top[scores[top] > 0]
+        relevant_rows = set(relevant_rows)
+        recalls.append(
+            len(relevant_rows & set(top.tolist())) / len(relevant_rows)
+        )
+    return float(np.mean(recalls)) if recalls else 0.0
+
+
+def sparse_payload_stats(vectors: List[dict]) -> Dict:
+    """Term count and JSON-encoded size of the sparse vectors."""
+    return {
+        "terms": sum(len(v["indices"]) for v in vectors),
+        "bytes": sum(len(orjson.dumps(v)) for v in vectors),
+    }
@@ -0,0 +1,66 @@
+from typing import Sequence
+
+import numpy as np
+
+
+def as_float32_matrix(vectors) -> np.ndarray:
+    """
+    Coerce a matrix, a list of rows (lists or arrays) or an empty sequence
+    into one contiguous (n, dim) float32 array.
+    """
+    if isinstance(vectors, np.ndarray):
+        return np.ascontiguousarray(vectors, dtype=np.float32)
+    if not len(vectors):
+        return np.empty((0, 0), dtype=np.float32)
+    if isinstance(vectors[0], np.ndarray):
+        return np.ascontiguousarray(np.vstack(vectors), dtype=np.float32)
+    return np.asarray(vectors, dtype=np.float32)
+
+
+def concat_rows(matrices: Sequence[np.ndarray]) -> np.ndarray:
+    matrices = [matrix for matrix in matrices if len(matrix)]
+    if not matrices:
+        return np.empty((0, 0), dtype=np.float32)
+    return np.ascontiguousarray(np.vstack(matrices), dtype=np.float32)
+
+
+def l2_normalize(matrix: np.ndarray) -> np.ndarray:
+    norms = np.linalg.norm(matrix, axis=1, keepdims=True)
+    return np.divide(matrix, norms, out=np.zeros_like(matrix), where=norms > 0)
+
+
+def truncate_and_normalize(vectors, dimension: int) -> np.ndarray:
+    """
+    Derive lower-dimensional Matryoshka embeddings: keep the leading
+    ``dimension`` components of each vector and L2-renormalize the rows.
+    """
+    matrix = np.asarray(vectors, dtype=np.float32)
+    return l2_normalize(np.ascontiguousarray(matrix[:, :dimension]))
+
+
+def top_k(keys: np.ndarray, k: int) -> np.ndarray:
+    """
+    Indices of the ``k`` largest entries of ``keys``, best first, via
+    ``argpartition`` so only the selected entries are sorted.
+    """
+    k = min(k, len(keys))
+    if k <= 0:
+        return np.empty(0, dtype=np.int64)
+    if k < len(keys):
+        candidates = np.argpartition(keys, -k)[-k:]
+    else:
+        candidates = np.arange(len(keys))
+    return candidates[np.argsort(-keys[candidates], kind="stable")]
+
+
+def hybrid_scale(dense, sparse: dict, alpha: float):
+    """Convex combination weights for a dense + sparse hybrid query."""
+    if alpha < 0 or alpha > 1:
+        raise ValueError("Alpha must be between 0 and 1")
+    hsparse = {
+        "indices": sparse["indices"],
+        "values": np.asarray(sparse["values"], dtype=np.float32)
+        * np.float32(1 - alpha),
+    }
+    hdense = np.asarray(dense, dtype=np.float32) * np.float32(alpha)
+    return hdense, hsparse
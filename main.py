@@ -2,7 +2,14 @@ from contextlib import asynccontextmanager
 
 from fastapi import FastAPI
 
-from app.apis import file_upload, index_upsert_route, query, reranking_router
+from app.apis import (
+    file_upload,
+    index_upsert_route,
+    query,
+    reranking_router,
+    stats_router,
+)
+from app.config.container import service_container
 from app.config.database import db_helper
 
 
@@ -10,7 +17,9 @@ from app.config.database import db_helper
 async def lifespan(app: FastAPI):
     await db_helper.connect()
     db = await db_helper.get_db()
+    await service_container.startup()
     yield
+    await service_container.shutdown()
     await db_helper.disconnect()
 
 
@@ -21,6 +30,7 @@ app.include_router(query.router)
 app.include_router(file_upload.router)
 app.include_router(index_upsert_route.router)
 app.include_router(reranking_router.router)
+app.include_router(stats_router.router)
 
 
 @app.get("/")
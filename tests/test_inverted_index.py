@@ -0,0 +1,146 @@
+import numpy as np
+import pytest
+
+from app.utils.inverted_index import InvertedIndex
+
+
+def random_docs(rng, n_docs, vocabulary=2000, max_terms=40):
+    """Per-document (term hashes, counts), with Zipf-distributed terms."""
+    weights = 1.0 / np.arange(1, vocabulary + 1)
+    weights /= weights.sum()
+    hashes = rng.choice(2**32 - 1, vocabulary, replace=False).astype(np.uint32)
+    docs = []
+    for _ in range(n_docs):
+        terms = rng.choice(vocabulary, rng.integers(1, max_terms), p=weights)
+        ids, counts = np.unique(terms, return_counts=True)
+        order = np.argsort(hashes[ids])
+        docs.append((hashes[ids][order], counts[order].astype(np.float32)))
+    return docs, hashes
+
+
+def brute_force_scores(index, query_terms, query_weights):
+    """Score every document from the fully decoded posting lists."""
+    scores = np.zeros(index.n_docs, dtype=np.float64)
+    for term_hash, weight in zip(query_terms, query_weights):
+        term = np.searchsorted(index.terms, term_hash)
+        if term < len(index.terms) and index.terms[term] == term_hash:
+            docs, impacts = index._decode(term)
+            scores[docs] += impacts * weight
+    return scores
+
+
+@pytest.fixture(scope="module")
+def corpus():
+    rng = np.random.default_rng(0)
+    docs, hashes = random_docs(rng, 3000)
+    return InvertedIndex.build(docs, block_size=32), docs, hashes
+
+
+def test_decode_blocks_matches_decode(corpus):
+    index, _, _ = corpus
+    rng = np.random.default_rng(1)
+    for term in range(len(index.terms)):
+        docs, impacts = index._decode(term)
+        n_blocks = index.block_start[term + 1] - index.block_start[term]
+
+        all_docs, all_impacts = index._decode_blocks(term, np.arange(n_blocks))
+        np.testing.assert_array_equal(all_docs, docs)
+        np.testing.assert_allclose(all_impacts, impacts)
+
+        blocks = np.sort(rng.choice(n_blocks, (n_blocks + 1) // 2, False))
+        positions = (
+            blocks[:, None] * index.block_size + np.arange(index.block_size)
+        ).ravel()
+        positions = positions[positions < len(docs)]
+        some_docs, some_impacts = index._decode_blocks(term, blocks)
+        np.testing.assert_array_equal(some_docs, docs[positions])
+        np.testing.assert_allclose(some_impacts, impacts[positions])
+
+
+def test_decode_recovers_postings(corpus):
+    index, docs, _ = corpus
+    postings = {}
+    for doc_id, (terms, _) in enumerate(docs):
+        for term_hash in terms.tolist():
+            postings.setdefault(term_hash, []).append(doc_id)
+
+    for term, term_hash in enumerate(index.terms.tolist()):
+        decoded, impacts = index._decode(term)
+        np.testing.assert_array_equal(decoded, postings[term_hash])
+        assert (impacts > 0).all()
+        assert impacts.max() <= index.term_max[term] * (1 + 1e-6)
+
+
+def test_wide_gaps_round_trip():
+    # in-block gaps of < 2**8, < 2**16 and >= 2**16 pack at 1, 2 and 4
+    # bytes; the first document of a block is stored apart, not as a gap
+    n_docs = 70000
+    empty = (np.zeros(0, np.uint32), np.zeros(0, np.float32))
+    docs = [empty] * n_docs
+    layout = {1: [0, 5, 200], 2: [0, 300, 40000], 3: [1, 69998, 69999]}
+    for term, doc_ids in layout.items():
+        for doc_id in doc_ids:
+            terms, counts = docs[doc_id]
+            docs[doc_id] = (
+                np.append(terms, np.uint32(term)),
+                np.append(counts, np.float32(1)),
+            )
+    index = InvertedIndex.build(docs, block_size=2)
+
+    assert index.term_width.tolist() == [1, 2, 4]
+    for term, doc_ids in layout.items():
+        decoded, _ = index._decode(term - 1)
+        np.testing.assert_array_equal(decoded, doc_ids)
+        blocks, _ = index._decode_blocks(term - 1, np.array([1]))
+        np.testing.assert_array_equal(blocks, doc_ids[2:])
+
+
+@pytest.mark.parametrize("k", [1, 10, 100])
+def test_maxscore_top_k_matches_brute_force(corpus, k):
+    index, _, hashes = corpus
+    rng = np.random.default_rng(k)
+    for _ in range(50):
+        n_terms = rng.integers(1, 8)
+        query_terms = rng.choice(hashes, n_terms, replace=False)
+        # include a term that is not in the index
+        query_terms = np.append(query_terms, np.uint32(7))
+        query_weights = rng.uniform(0.5, 3.0, n_terms + 1)
+
+        rows, scores, (decoded, total) = index.search(
+            query_terms, query_weights, k
+        )
+        expected = brute_force_scores(index, query_terms, query_weights)
+        expected_top = np.sort(expected[expected > 0])[::-1][:k]
+
+        np.testing.assert_allclose(scores, expected_top, rtol=1e-5)
+        np.testing.assert_allclose(expected[rows], scores, rtol=1e-5)
+        assert len(set(rows.tolist())) == len(rows)
+        assert decoded <= total
+
+
+def test_maxscore_skips_postings(corpus):
+    index, _, hashes = corpus
+    # once the rare terms set the threshold, the frequent term's low
+    # upper bound leaves only the candidates' blocks to decode
+    query_terms = np.array([hashes[0], hashes[1500], hashes[1800]])
+    weights = np.array([1.0, 3.0, 3.0])
+    rows, _, (decoded, total) = index.search(query_terms, weights, 1)
+    expected = brute_force_scores(index, query_terms, weights)
+
+    assert decoded < total
+    assert expected[rows[0]] == pytest.approx(expected.max(), rel=1e-5)
+
+
+def test_save_and_load_keep_results(corpus, tmp_path):
+    index, _, hashes = corpus
+    path = str(tmp_path / "index.npz")
+    index.save(path)
+    loaded = InvertedIndex.load(path)
+
+    query_terms = hashes[[3, 40, 700]]
+    weights = np.array([1.0, 2.0, 0.5])
+    for expected, actual in zip(
+        index.search(query_terms, weights, 10),
+        loaded.search(query_terms, weights, 10),
+    ):
+        np.testing.assert_array_equal(expected, actual)
@@ -0,0 +1,212 @@
+import numpy as np
+import pytest
+
+from app.utils.metadata_index import FilterError, MetadataIndex
+
+FIELDS = ["keyword", "year", "created_at", "score"]
+KEYWORDS = ["alpha", "beta", "gamma", "delta", "epsilon"]
+
+
+def kind(value):
+    if isinstance(value, str):
+        return "str"
+    if isinstance(value, (bool, int, float)):
+        return "num"
+    return None
+
+
+def items(meta, field):
+    value = meta.get(field)
+    return [
+        v for v in (value if isinstance(value, list) else [value]) if kind(v)
+    ]
+
+
+def equal(item, value):
+    if kind(item) != kind(value):
+        return False
+    return (
+        float(item) == float(value) if kind(value) == "num" else item == value
+    )
+
+
+def compare(item, operator, value):
+    if kind(item) != kind(value):
+        return False
+    if kind(value) == "num":
+        item, value = float(item), float(value)
+    return {
+        "$gt": item > value,
+        "$gte": item >= value,
+        "$lt": item < value,
+        "$lte": item <= value,
+    }[operator]
+
+
+def brute_force(meta, filter_dict):
+    """Evaluate a Pinecone-style filter on one row's metadata."""
+    for key, condition in filter_dict.items():
+        if key == "$and":
+            ok = all(brute_force(meta, part) for part in condition)
+        elif key == "$or":
+            ok = any(brute_force(meta, part) for part in condition)
+        else:
+            values = items(meta, key)
+            if not isinstance(condition, dict):
+                condition = {"$eq": condition}
+            ok = True
+            for operator, value in condition.items():
+                if operator == "$eq":
+                    ok &= any(equal(v, value) for v in values)
+                elif operator == "$ne":
+                    ok &= bool(values) and not any(
+                        equal(v, value) for v in values
+                    )
+                elif operator == "$in":
+                    ok &= any(equal(v, x) for v in values for x in value)
+                elif operator == "$nin":
+                    ok &= bool(values) and not any(
+                        equal(v, x) for v in values for x in value
+                    )
+                elif operator == "$exists":
+                    ok &= bool(values) == value
+                else:
+                    ok &= any(compare(v, operator, value) for v in values)
+        if not ok:
+            return False
+    return True
+
+
+def random_metadata(rng, n_rows):
+    rows = []
+    for _ in range(n_rows):
+        meta = {}
+        if rng.random() < 0.9:
+            meta["keyword"] = (
+                list(rng.choice(KEYWORDS, rng.integers(1, 3), replace=False))
+                if rng.random() < 0.3
+                else str(rng.choice(KEYWORDS))
+            )
+        if rng.random() < 0.8:
+            meta["year"] = int(rng.integers(1990, 2030))
+        if rng.random() < 0.8:
+            meta["created_at"] = (
+                f"2024-{rng.integers(1, 13):02d}-{rng.integers(1, 29):02d}"
+            )
+        if rng.random() < 0.7:
+            meta["score"] = (
+                str(rng.choice(["n/a", "high"]))
+                if rng.random() < 0.1
+                else round(float(rng.uniform(0, 1)), 2)
+            )
+        rows.append(meta)
+    return rows
+
+
+def random_condition(rng):
+    field = str(rng.choice(FIELDS))
+    if field == "keyword":
+        values = [str(v) for v in rng.choice(KEYWORDS, 2, replace=False)]
+        value = values[0]
+    elif field == "year":
+        values = [int(v) for v in rng.integers(1990, 2030, 2)]
+        value = values[0]
+    elif field == "created_at":
+        values = [f"2024-{m:02d}-15" for m in rng.integers(1, 13, 2)]
+        value = values[0]
+    else:
+        values = [round(float(v), 2) for v in rng.uniform(0, 1, 2)]
+        value = values[0]
+
+    operator = str(
+        rng.choice(
+            [
+                "$eq",
+                "$ne",
+                "$in",
+                "$nin",
+                "$gt",
+                "$gte",
+                "$lt",
+                "$lte",
+                "$exists",
+            ]
+        )
+    )
+    if operator in ("$in", "$nin"):
+        return {field: {operator: values}}
+    if operator == "$exists":
+        return {field: {operator: bool(rng.random() < 0.5)}}
+    if operator == "$eq" and rng.random() < 0.5:
+        return {field: value}
+    return {field: {operator: value}}
+
+
+def random_filter(rng, depth=0):
+    if depth < 2 and rng.random() < 0.4:
+        parts = [
+            random_filter(rng, depth + 1) for _ in range(rng.integers(1, 4))
+        ]
+        return {str(rng.choice(["$and", "$or"])): parts}
+    filter_dict = random_condition(rng)
+    if rng.random() < 0.3:
+        filter_dict.update(random_condition(rng))
+    return filter_dict
+
+
+@pytest.fixture(scope="module")
+def metadata():
+    return random_metadata(np.random.default_rng(0), 1000)
+
+
+@pytest.mark.parametrize("bitmap_max_cardinality", [0, 256, 100000])
+def test_masks_match_brute_force(metadata, bitmap_max_cardinality):
+    index = MetadataIndex(metadata, FIELDS, bitmap_max_cardinality)
+    rng = np.random.default_rng(bitmap_max_cardinality)
+    for _ in range(300):
+        filter_dict = random_filter(rng)
+        expected = np.array(
+            [brute_force(meta, filter_dict) for meta in metadata]
+        )
+        np.testing.assert_array_equal(
+            index.mask(filter_dict), expected, err_msg=str(filter_dict)
+        )
+
+
+def test_bitmaps_only_for_low_cardinality_fields(metadata):
+    index = MetadataIndex(metadata, FIELDS, bitmap_max_cardinality=10)
+    assert set(index.bitmaps) == {"keyword"}
+
+
+def test_list_values_match_any_element():
+    index = MetadataIndex(
+        [{"keyword": ["a", "b"]}, {"keyword": "b"}, {"keyword": "c"}, {}],
+        ["keyword"],
+    )
+
+    def rows(filter_dict):
+        return np.flatnonzero(index.mask(filter_dict)).tolist()
+
+    assert rows({"keyword": "a"}) == [0]
+    assert rows({"keyword": "b"}) == [0, 1]
+    assert rows({"keyword": {"$ne": "b"}}) == [2]
+    assert rows({"keyword": {"$nin": ["a", "c"]}}) == [1]
+    assert rows({"keyword": {"$exists": False}}) == [3]
+
+
+@pytest.mark.parametrize(
+    "filter_dict",
+    [
+        {"unknown": "x"},
+        {"keyword": {"$regex": "a"}},
+        {"keyword": {"$in": "alpha"}},
+        {"year": {"$gt": True}},
+        {"year": {"$eq": {"nested": 1}}},
+        {"$or": {"keyword": "alpha"}},
+        {"$and": ["keyword"]},
+    ],
+)
+def test_unsupported_filters_raise(metadata, filter_dict):
+    index = MetadataIndex(metadata, FIELDS)
+    with pytest.raises(FilterError):
+        index.mask(filter_dict)
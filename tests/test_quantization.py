@@ -0,0 +1,91 @@
+import numpy as np
+import pytest
+
+from app.utils.quantization import (
+    CODECS,
+    ProductQuantizer,
+    ScalarQuantizer,
+    train_codec,
+)
+
+
+def clustered(rng, n, dim, n_clusters=64, spread=0.3):
+    centers = rng.standard_normal((n_clusters, dim))
+    points = centers[rng.integers(0, n_clusters, n)]
+    return (points + spread * rng.standard_normal((n, dim))).astype(np.float32)
+
+
+def recall_at_k(codec, vectors, queries, k, candidates):
+    """Recall@k of exact rerank over the codec's best ``candidates`` rows."""
+    exact = vectors @ queries.T
+    approx = codec.dots(codec.encode(vectors), queries)
+    hits = 0
+    for j in range(len(queries)):
+        truth = set(np.argsort(-exact[:, j])[:k].tolist())
+        shortlist = np.argsort(-approx[:, j])[:candidates]
+        reranked = shortlist[np.argsort(-exact[shortlist, j])[:k]]
+        hits += len(truth & set(reranked.tolist()))
+    return hits / (k * len(queries))
+
+
+@pytest.fixture
+def data():
+    points = clustered(np.random.default_rng(0), 5050, 64)
+    return points[:5000], points[5000:]
+
+
+def test_sq8_dots_match_decoded_vectors(data):
+    vectors, queries = data
+    codec = ScalarQuantizer.train(vectors)
+    codes = codec.encode(vectors)
+    decoded = codes.astype(np.float32) * codec.scale + codec.offset
+
+    assert codes.dtype == np.uint8 and codes.shape == vectors.shape
+    assert np.abs(decoded - vectors).max() <= codec.scale.max() / 2 + 1e-5
+    np.testing.assert_allclose(
+        codec.dots(codes, queries), decoded @ queries.T, rtol=1e-4, atol=1e-3
+    )
+
+
+def test_pq_dots_match_decoded_vectors(data):
+    vectors, queries = data
+    codec = ProductQuantizer.train(vectors, n_subspaces=16, iterations=5)
+    codes = codec.encode(vectors)
+    decoded = np.concatenate(
+        [codec.centroids[j, codes[:, j]] for j in range(codec.code_size())],
+        axis=1,
+    )
+
+    assert codes.shape == (len(vectors), 16)
+    np.testing.assert_allclose(
+        codec.dots(codes, queries), decoded @ queries.T, rtol=1e-4, atol=1e-3
+    )
+
+
+@pytest.mark.parametrize("kind, min_recall", [("sq8", 0.99), ("pq", 0.95)])
+def test_reranked_recall_against_exact_search(data, kind, min_recall):
+    vectors, queries = data
+    codec = train_codec(kind, vectors, pq_subvector_dims=4)
+
+    assert codec.kind == kind
+    assert recall_at_k(codec, vectors, queries, 10, 80) >= min_recall
+
+
+def test_codec_params_round_trip(data):
+    vectors, queries = data
+    for kind in CODECS:
+        codec = train_codec(kind, vectors)
+        restored = CODECS[kind].from_params(codec.params())
+        codes = codec.encode(vectors)
+
+        np.testing.assert_array_equal(restored.encode(vectors), codes)
+        np.testing.assert_allclose(
+            restored.dots(codes, queries), codec.dots(codes, queries)
+        )
+
+
+def test_pq_falls_back_to_sq8_when_dimension_does_not_split():
+    vectors = np.random.default_rng(0).standard_normal((100, 30))
+
+    assert train_codec("pq", vectors, pq_subvector_dims=4).kind == "sq8"
+    assert train_codec("none", vectors) is None
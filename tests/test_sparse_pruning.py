@@ -0,0 +1,99 @@
+import numpy as np
+import orjson
+import pytest
+
+from app.utils.sparse_pruning import (
+    prune_sparse_vectors,
+    sparse_payload_stats,
+    sparse_recall_at_k,
+)
+
+
+def random_vectors(rng, n, vocabulary=500, max_terms=60):
+    vectors = []
+    for _ in range(n):
+        n_terms = int(rng.integers(0, max_terms))
+        indices = np.sort(rng.choice(vocabulary, n_terms, replace=False))
+        values = rng.uniform(-1, 2, n_terms)
+        vectors.append({"indices": indices.tolist(), "values": values.tolist()})
+    return vectors
+
+
+def brute_force_prune(vector, top_n, mass):
+    """Positions kept by pruning one vector, in their original order."""
+    magnitude = np.abs(vector["values"])
+    ranked = sorted(range(len(magnitude)), key=lambda i: (-magnitude[i], i))
+    keep = set(ranked)
+    if top_n:
+        keep &= set(ranked[:top_n])
+    if 0.0 < mass < 1.0:
+        total, above, kept = magnitude.sum(), 0.0, set()
+        for i in ranked:
+            if above < mass * total:
+                kept.add(i)
+            above += magnitude[i]
+        keep &= kept
+    return sorted(keep)
+
+
+@pytest.fixture(scope="module")
+def vectors():
+    return random_vectors(np.random.default_rng(0), 300)
+
+
+@pytest.mark.parametrize(
+    "top_n, mass", [(5, 0.0), (0, 0.5), (0, 0.9), (10, 0.7), (100, 0.0)]
+)
+def test_pruning_matches_brute_force(vectors, top_n, mass):
+    pruned = prune_sparse_vectors(vectors, top_n, mass)
+
+    assert len(pruned) == len(vectors)
+    for vector, result in zip(vectors, pruned):
+        positions = brute_force_prune(vector, top_n, mass)
+        assert result["indices"] == [vector["indices"][i] for i in positions]
+        np.testing.assert_allclose(
+            result["values"], [vector["values"][i] for i in positions]
+        )
+
+
+def test_disabled_pruning_returns_the_input(vectors):
+    assert prune_sparse_vectors(vectors) is vectors
+    assert prune_sparse_vectors(vectors, 0, 1.0) is vectors
+    empty = [{"indices": [], "values": []}]
+    assert prune_sparse_vectors(empty, 3) is empty
+
+
+def test_recall_at_k_matches_brute_force(vectors):
+    rng = np.random.default_rng(1)
+    queries = random_vectors(rng, 40, max_terms=8)
+    relevant = [
+        rng.choice(len(vectors), rng.integers(0, 4), replace=False).tolist()
+        for _ in queries
+    ]
+    dense = np.zeros((len(vectors), 500))
+    for row, vector in enumerate(vectors):
+        dense[row, vector["indices"]] = vector["values"]
+
+    for k in (1, 10, 50):
+        recalls = []
+        for query, relevant_rows in zip(queries, relevant):
+            if not relevant_rows:
+                continue
+            scores = dense[:, query["indices"]] @ np.asarray(query["values"])
+            top = np.argsort(-scores, kind="stable")[:k]
+            top = set(top[scores[top] > 0].tolist())
+            recalls.append(len(top & set(relevant_rows)) / len(relevant_rows))
+
+        assert sparse_recall_at_k(
+            vectors, queries, relevant, k
+        ) == pytest.approx(np.mean(recalls))
+
+
+def test_payload_stats(vectors):
+    stats = sparse_payload_stats(vectors)
+
+    assert stats["terms"] == sum(len(v["indices"]) for v in vectors)
+    assert stats["bytes"] == sum(len(orjson.dumps(v)) for v in vectors)
+    pruned = sparse_payload_stats(prune_sparse_vectors(vectors, 5))
+    assert pruned["terms"] < stats["terms"]
+    assert pruned["bytes"] < stats["bytes"]